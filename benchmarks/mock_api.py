@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter, sleep
+from typing import Any, Dict, Iterator, Union
+
+import re
+
+import pyarrow
+from railib import api
+
+# Functions of `railib.api` called by `rai_python_harness`
+PATCHED_FUNCTIONS = ["exec", "exec_v1", "install_model", "load_csv", "load_json"]
+
+# Outputs of the cells of a batched query, see `query_utils.combine_query_sources`
+_CELL_OUTPUT = re.compile(r"^def output:(\w+) = ", re.MULTILINE)
+
+
+@dataclass
+class MockAPI:
+    """Local stand-in for the parts of `railib.api` used by the harness.
+
+    Each call sleeps for `latency` seconds, plus the time needed to send the
+    request's source, `inputs`, and data at `throughput` bytes per second (if
+    set), then returns a response of the same shape as RAI Cloud's holding
+    `response_rows` rows (per cell, for batched queries). The time during which at least one call is in flight
+    is accumulated in `busy_seconds`, so the harness' own overhead is the
+    wall-clock time of a run less `busy_seconds`.
+    """
+
+    latency: float = 0.0
+    throughput: Union[None, float] = None
+    response_rows: int = 100
+    calls: Dict[str, int] = field(
+        init=False, default_factory=lambda: {name: 0 for name in PATCHED_FUNCTIONS}
+    )
+    busy_seconds: float = field(init=False, default=0.0)
+    _in_flight: int = field(init=False, default=0)
+    _busy_since: float = field(init=False, default=0.0)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __post_init__(self) -> None:
+        # Built once, so building responses is not counted as harness overhead
+        self._columns = [
+            list(range(self.response_rows)),
+            [float(i) for i in range(self.response_rows)],
+        ]
+        self._table = pyarrow.table({"v1": self._columns[0], "v2": self._columns[1]})
+
+    @contextmanager
+    def patch(self) -> Iterator[MockAPI]:
+        """Replace the functions in `PATCHED_FUNCTIONS` for the body of the `with` block"""
+        originals = {name: getattr(api, name) for name in PATCHED_FUNCTIONS}
+        for name in PATCHED_FUNCTIONS:
+            setattr(api, name, getattr(self, name))
+
+        try:
+            yield self
+        finally:
+            for name, function in originals.items():
+                setattr(api, name, function)
+
+    def exec(
+        self,
+        ctx: api.Context,
+        database: str,
+        engine: str,
+        command: str,
+        inputs: dict = None,
+        readonly: bool = True,
+        **kwargs,
+    ) -> api.TransactionAsyncResponse:
+        self._wait("exec", command, *(inputs or {}).values())
+        # Batched queries output a relation per cell, e.g. `/:output/:harness_cell_2/...`
+        prefixes = [f"/:output/:{name}" for name in _CELL_OUTPUT.findall(command)]
+        return api.TransactionAsyncResponse(
+            {"id": "mock", "state": "COMPLETED"},
+            None,
+            [
+                {
+                    "relationId": f"{prefix}/Int64/Float64",
+                    "table": self._table,
+                }
+                for prefix in (prefixes or ["/:output"])
+            ],
+            [],
+        )
+
+    def exec_v1(
+        self,
+        ctx: api.Context,
+        database: str,
+        engine: str,
+        command: str,
+        inputs: dict = None,
+        readonly: bool = True,
+    ) -> dict:
+        self._wait("exec_v1", command, *(inputs or {}).values())
+        return self._v1_response(1)
+
+    def install_model(
+        self, ctx: api.Context, database: str, engine: str, models: dict
+    ) -> dict:
+        self._wait("install_model", *models.values())
+        return self._v1_response(len(models))
+
+    def load_csv(
+        self,
+        ctx: api.Context,
+        database: str,
+        engine: str,
+        relation: str,
+        data: Any,
+        syntax: dict = {},
+    ) -> dict:
+        self._wait("load_csv", data)
+        return self._v1_response(1)
+
+    def load_json(
+        self, ctx: api.Context, database: str, engine: str, relation: str, data: Any
+    ) -> dict:
+        self._wait("load_json", data)
+        return self._v1_response(1)
+
+    def _v1_response(self, actions: int) -> dict:
+        return {
+            "actions": [{"name": f"action{i}", "result": {}} for i in range(actions)],
+            "output": [
+                {
+                    "rel_key": {
+                        "name": "output",
+                        "keys": ["Int64"],
+                        "values": ["Float64"],
+                    },
+                    "columns": self._columns,
+                }
+            ],
+            "problems": [],
+            "aborted": False,
+        }
+
+    def _wait(self, name: str, *payload: Any) -> None:
+        """Sleep for as long as RAI Cloud would take to receive `payload`"""
+        seconds = self.latency
+        if self.throughput:
+            # Characters, rather than encoded bytes, to avoid copying large data
+            seconds += (
+                sum(
+                    len(part) if isinstance(part, (str, bytes)) else len(str(part))
+                    for part in payload
+                )
+                / self.throughput
+            )
+
+        with self._lock:
+            self.calls[name] += 1
+            if self._in_flight == 0:
+                self._busy_since = perf_counter()
+            self._in_flight += 1
+
+        try:
+            sleep(seconds)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self.busy_seconds += perf_counter() - self._busy_since
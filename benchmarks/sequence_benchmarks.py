@@ -0,0 +1,289 @@
+"""Benchmark `Schema`, `Sequence.exec`, and `log_result` against a local mock of
+`railib.api` (see `mock_api.MockAPI`), so no RAI Cloud account is needed.
+
+Each scenario runs a synthetic sequence of `--cells` cells, the first of which
+loads a CSV file of `--data-mb` megabytes, in a fresh Python process so peak
+RSS is measured per scenario. For example, from the repository root:
+
+    poetry run python benchmarks/sequence_benchmarks.py --cells 10 1000 --data-mb 1 1024
+    poetry run python benchmarks/sequence_benchmarks.py --output bench.json
+    poetry run python benchmarks/sequence_benchmarks.py --baseline bench.json
+
+With `--baseline`, the script exits non-zero when a scenario's overhead per
+cell or cells/sec is more than `--tolerance` worse than in the baseline.
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser, Namespace
+from json import dumps, loads
+from pathlib import Path
+from resource import RUSAGE_SELF, getrusage
+from subprocess import run
+from sys import executable, platform
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import List
+
+MB = 1024**2
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cells", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument(
+        "--data-mb",
+        type=float,
+        nargs="+",
+        default=[256],
+        help="Size of the CSV file loaded by the first cell",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to each SDK call"
+    )
+    parser.add_argument(
+        "--throughput-mb",
+        type=float,
+        default=None,
+        help="Upload throughput in MB/s (default unlimited)",
+    )
+    parser.add_argument("--response-rows", type=int, default=100)
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument(
+        "--chunk-mb",
+        type=float,
+        default=None,
+        help="Loads the CSV file with `chunked = true`, sets `Sequence.chunk_bytes`",
+    )
+    parser.add_argument(
+        "--prefetch-depth", type=int, default=0, help="Sets `Sequence.prefetch_depth`"
+    )
+    parser.add_argument(
+        "--batch-installs", action="store_true", help="Sets `Sequence.batch_installs`"
+    )
+    parser.add_argument(
+        "--batch-queries", action="store_true", help="Sets `Sequence.batch_queries`"
+    )
+    parser.add_argument(
+        "--background-logging",
+        action="store_true",
+        help="Sets `SequenceLogger.background`",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare to earlier `--output`")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    # Internal, runs a single scenario and prints its results as JSON
+    parser.add_argument("--scenario", nargs=2, type=float, help="CELLS DATA_MB")
+    return parser.parse_args()
+
+
+def write_csv(file_path: Path, size: int) -> None:
+    """Write a CSV file of (about) `size` bytes"""
+    rows = "".join(f"{i},{i * 0.5},name_{i}\n" for i in range(10000))
+    block = rows * max(1, (8 * MB) // len(rows))
+
+    with open(file_path, "w") as f:
+        f.write("id,value,name\n")
+        written = 0
+        while written < size:
+            part = block[: size - written]
+            f.write(part)
+            written += len(part)
+
+
+def write_project(
+    project_dir: Path, cells: int, data_bytes: int, chunked: bool = False
+) -> Path:
+    """Write a sequence of `cells` cells, a DATA cell (loaded in chunks if
+    `chunked`) then an INSTALL cell followed by QUERY cells, returning the path
+    of its TOML file"""
+    (project_dir / "data").mkdir()
+    (project_dir / "rel").mkdir()
+
+    write_csv(Path(project_dir / "data" / "bench.csv"), data_bytes)
+    Path(project_dir / "rel" / "model.rel").write_text(
+        "def bench_total = sum[bench:value]\n"
+    )
+
+    entries = [
+        '[[queries]]\nname = "bench"\ntype = "data"\nfile_path = "bench.csv"\nindex = 0\n'
+        + ("chunked = true\n" if chunked else "")
+    ]
+    if cells > 1:
+        entries.append(
+            '[[queries]]\nname = "model"\ntype = "install"\nfile_path = "model.rel"\nindex = 1\n'
+        )
+
+    for index in range(2, cells):
+        Path(project_dir / "rel" / f"query_{index}.rel").write_text(
+            f"def output = bench_total, {index}\n"
+        )
+        entries.append(
+            f'[[queries]]\nname = "query_{index}"\ntype = "query"\nfile_path = "query_{index}.rel"\nindex = {index}\n'
+        )
+
+    toml_path = Path(project_dir / "bench.toml")
+    toml_path.write_text(
+        'data_dir = "data/"\nsource_dir = "rel/"\n\n' + "\n".join(entries)
+    )
+    return toml_path
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process, in MB"""
+    max_rss = getrusage(RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return max_rss / MB if platform == "darwin" else max_rss / 1024
+
+
+def run_scenario(args: Namespace, cells: int, data_mb: float) -> dict:
+    """Run a single scenario in this process"""
+    from mock_api import MockAPI
+
+    from rai_python_harness.schema import Schema
+    from rai_python_harness.sequence import Sequence
+    from rai_python_harness.sequence_logger import SequenceLogger
+
+    mock = MockAPI(
+        latency=args.latency,
+        throughput=args.throughput_mb * MB if args.throughput_mb else None,
+        response_rows=args.response_rows,
+    )
+
+    with TemporaryDirectory() as tmp_dir:
+        project_dir = Path(tmp_dir) / "project"
+        log_dir = Path(tmp_dir) / "logs"
+        project_dir.mkdir()
+        log_dir.mkdir()
+        toml_path = write_project(
+            project_dir, cells, int(data_mb * MB), args.chunk_mb is not None
+        )
+        rss_before = peak_rss_mb()
+
+        with mock.patch():
+            start = perf_counter()
+            sequence = Sequence(
+                None,
+                Schema(toml_path),
+                SequenceLogger(log_dir, background=args.background_logging),
+                max_workers=args.max_workers,
+                chunk_bytes=int((args.chunk_mb or 64) * MB),
+                prefetch_depth=args.prefetch_depth,
+                batch_installs=args.batch_installs,
+                batch_queries=args.batch_queries,
+            )
+            sequence.database = "bench"
+            sequence.engine = "bench"
+            sequence.exec()
+            seconds = perf_counter() - start
+            sequence.sequence_logger.close()
+
+    overhead = seconds - mock.busy_seconds
+    return {
+        "cells": cells,
+        "data_mb": data_mb,
+        "seconds": seconds,
+        "remote_seconds": mock.busy_seconds,
+        "overhead_seconds": overhead,
+        "overhead_ms_per_cell": overhead / cells * 1000,
+        "cells_per_second": cells / seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_mb": rss_before,
+        "calls": mock.calls,
+    }
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Return a description of each scenario in `results` that regressed from `baseline`"""
+    earlier = {(r["cells"], r["data_mb"]): r for r in baseline}
+    regressions = []
+
+    for result in results:
+        base = earlier.get((result["cells"], result["data_mb"]))
+        if not base:
+            continue
+
+        if result["overhead_ms_per_cell"] > base["overhead_ms_per_cell"] * (
+            1 + tolerance
+        ):
+            regressions.append(
+                f"{result['cells']} cells, {result['data_mb']} MB: overhead {base['overhead_ms_per_cell']:.3f} => {result['overhead_ms_per_cell']:.3f} ms/cell"
+            )
+        if result["cells_per_second"] < base["cells_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{result['cells']} cells, {result['data_mb']} MB: {base['cells_per_second']:.1f} => {result['cells_per_second']:.1f} cells/sec"
+            )
+
+    return regressions
+
+
+def main() -> None:
+    args = parse_args()
+
+    if args.scenario:
+        cells, data_mb = args.scenario
+        print(dumps(run_scenario(args, int(cells), data_mb)))
+        return
+
+    # Arguments shared by every scenario
+    passthrough = [
+        "--latency",
+        str(args.latency),
+        "--response-rows",
+        str(args.response_rows),
+        "--max-workers",
+        str(args.max_workers),
+        "--prefetch-depth",
+        str(args.prefetch_depth),
+    ]
+    if args.throughput_mb:
+        passthrough += ["--throughput-mb", str(args.throughput_mb)]
+    if args.chunk_mb:
+        passthrough += ["--chunk-mb", str(args.chunk_mb)]
+    for flag in ["background_logging", "batch_installs", "batch_queries"]:
+        if getattr(args, flag):
+            passthrough += [f"--{flag.replace('_', '-')}"]
+
+    print(
+        f"{'cells':>8} {'data MB':>9} {'seconds':>9} {'remote s':>9} {'overhead s':>11} {'ms/cell':>9} {'cells/s':>9} {'peak RSS MB':>12}"
+    )
+
+    results = []
+    for data_mb in args.data_mb:
+        for cells in args.cells:
+            process = run(
+                [
+                    executable,
+                    __file__,
+                    "--scenario",
+                    str(cells),
+                    str(data_mb),
+                    *passthrough,
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode != 0:
+                exit(
+                    f"Scenario ({cells} cells, {data_mb} MB) failed:\n{process.stderr}"
+                )
+
+            result = loads(process.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(
+                f"{cells:>8} {data_mb:>9} {result['seconds']:>9.3f} {result['remote_seconds']:>9.3f} {result['overhead_seconds']:>11.3f} {result['overhead_ms_per_cell']:>9.3f} {result['cells_per_second']:>9.1f} {result['peak_rss_mb']:>12.1f}"
+            )
+
+    if args.output:
+        args.output.write_text(dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
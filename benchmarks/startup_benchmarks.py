@@ -0,0 +1,155 @@
+"""Benchmark the startup time of `rai-harness validate` and `rai-harness plan`,
+and of importing `rai_python_harness.sequence`.
+
+Each scenario runs `--repeat` times, each in a fresh Python process, against a
+synthetic sequence of `--cells` cells (see `sequence_benchmarks.write_project`).
+For example, from the repository root:
+
+    poetry run python benchmarks/startup_benchmarks.py --output startup.json
+    poetry run python benchmarks/startup_benchmarks.py --baseline startup.json
+
+Scenarios report the median wall-clock time of the whole process and of the
+harness code alone (imports included), and which of the RAI SDK, `pandas`, and
+`pyarrow` were imported. The script exits non-zero when any scenario imports
+one of them, or, with `--baseline`, when a scenario's median harness time is
+more than `--tolerance` worse than in the baseline.
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser, Namespace
+from json import dumps, loads
+from pathlib import Path
+from statistics import median
+from subprocess import run
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import List
+
+from sequence_benchmarks import write_project
+
+# Modules `validate` and `plan` must not import
+HEAVY_MODULES = ["railib", "pandas", "pyarrow"]
+
+# Run in a fresh process, with `{toml_path}` and `{timing_store}` filled in
+SCENARIOS = {
+    "import sequence": "import rai_python_harness.sequence",
+    "validate": "from rai_python_harness.cli import main\n"
+    "main(['validate', {toml_path!r}])",
+    "plan": "from rai_python_harness.cli import main\n"
+    "main(['plan', '--timing-store', {timing_store!r}, '--log-dir', {log_dir!r}, {toml_path!r}])",
+}
+
+# Wraps each scenario, printing its timing and the heavy modules it imported
+HARNESS = """
+import sys
+from json import dumps
+from time import perf_counter
+
+start = perf_counter()
+{scenario}
+seconds = perf_counter() - start
+print(dumps({{"seconds": seconds, "heavy_modules": [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cells", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare to earlier `--output`")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args()
+
+
+def run_scenario(name: str, code: str, repeat: int) -> dict:
+    """Run a single scenario `repeat` times"""
+    wall_seconds, harness_seconds = [], []
+
+    for _ in range(repeat):
+        start = perf_counter()
+        process = run(
+            [executable, "-c", HARNESS.format(scenario=code, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+        )
+        wall_seconds.append(perf_counter() - start)
+
+        if process.returncode != 0:
+            exit(f"Scenario '{name}' failed:\n{process.stderr}")
+
+        result = loads(process.stdout.strip().splitlines()[-1])
+        harness_seconds.append(result["seconds"])
+
+    return {
+        "scenario": name,
+        "wall_ms": median(wall_seconds) * 1000,
+        "harness_ms": median(harness_seconds) * 1000,
+        "heavy_modules": result["heavy_modules"],
+    }
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Return a description of each scenario in `results` that regressed from `baseline`"""
+    earlier = {r["scenario"]: r for r in baseline}
+    regressions = []
+
+    for result in results:
+        base = earlier.get(result["scenario"])
+        if base and result["harness_ms"] > base["harness_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}: {base['harness_ms']:.1f} => {result['harness_ms']:.1f} ms"
+            )
+
+    return regressions
+
+
+def main() -> None:
+    args = parse_args()
+
+    print(f"{'scenario':<16} {'wall ms':>9} {'harness ms':>11}  heavy modules")
+
+    results = []
+    with TemporaryDirectory() as tmp_dir:
+        project_dir = Path(tmp_dir) / "project"
+        project_dir.mkdir()
+        toml_path = write_project(project_dir, args.cells, 1024)
+
+        for name, scenario in SCENARIOS.items():
+            result = run_scenario(
+                name,
+                scenario.format(
+                    toml_path=str(toml_path),
+                    timing_store=str(Path(tmp_dir) / "timings.db"),
+                    log_dir=tmp_dir,
+                ),
+                args.repeat,
+            )
+            results.append(result)
+            print(
+                f"{name:<16} {result['wall_ms']:>9.1f} {result['harness_ms']:>11.1f}  {', '.join(result['heavy_modules']) or '-'}"
+            )
+
+    if args.output:
+        args.output.write_text(dumps(results, indent=2))
+
+    regressions = [
+        f"{result['scenario']}: imports {', '.join(result['heavy_modules'])}"
+        for result in results
+        if result["heavy_modules"]
+    ]
+    if args.baseline:
+        regressions += compare(
+            results, loads(args.baseline.read_text()), args.tolerance
+        )
+
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if regressions:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from json import JSONDecodeError, dumps, loads
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Tuple, Union
+
+CHECKPOINT_FILE_NAME = "checkpoint.jsonl"
+
+
+@dataclass
+class Checkpoint:
+    """Manifest of the cells completed by `Sequence.exec`, stored as JSON lines at
+    `manifest_path`. Several `Sequence`s may share one log directory, so
+    entries are keyed on the TOML file of the sequence and the cell's `index`.
+
+    Entries are only ever appended, the last entry for a cell wins.
+    """
+
+    manifest_path: Path
+    entries: Dict[Tuple[str, int], dict] = field(init=False, default_factory=dict)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __post_init__(self) -> None:
+        try:
+            with open(self.manifest_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = loads(line)
+                    except JSONDecodeError:
+                        # Line left incomplete by an interrupted run
+                        continue
+
+                    self.entries[(entry["toml_path"], entry["index"])] = entry
+        except FileNotFoundError:
+            pass
+
+    def get(self, toml_path: Path, index: int) -> Union[None, dict]:
+        """Return the entry for cell `index` of the sequence in `toml_path`, if any"""
+        return self.entries.get((self._key(toml_path), index))
+
+    def record(self, toml_path: Path, entry: dict) -> None:
+        """Append `entry`, which must have an `index`, for the sequence in `toml_path`"""
+        entry = {**entry, "toml_path": self._key(toml_path)}
+
+        with self._lock:
+            self.entries[(entry["toml_path"], entry["index"])] = entry
+
+            with open(self.manifest_path, "a") as f:
+                f.write(dumps(entry) + "\n")
+
+    @staticmethod
+    def _key(toml_path: Path) -> str:
+        return str(toml_path.resolve())
@@ -0,0 +1,261 @@
+"""Command-line entry point, `rai-harness`.
+
+    rai-harness validate tests/project/*.toml
+    rai-harness plan --timing-store timings.db --max-workers 4 tests/project/test_queries.toml
+    rai-harness run --database my-db --engine my-engine tests/project/data_load.toml tests/project/test_queries.toml
+
+Several TOML files are run (or planned) one after another, as phases sharing a
+log directory. `validate` and `plan` never import the RAI SDK (or `pandas` and
+`pyarrow`), so are quick to start, and only `run` needs RAI Cloud credentials.
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser, Namespace
+from json import dumps
+from pathlib import Path
+from typing import List
+
+from rai_python_harness.validation import valid_schema_or_exit
+
+
+def parse_args(argv: List[str] = None) -> Namespace:
+    parser = ArgumentParser(prog="rai-harness", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    validate = commands.add_parser("validate", help="Validate TOML files")
+    validate.add_argument("toml_paths", type=Path, nargs="+", metavar="TOML")
+
+    plan = commands.add_parser(
+        "plan", help="Predict run times from recorded durations, running nothing"
+    )
+    run = commands.add_parser("run", help="Execute TOML files in order")
+
+    for command in [plan, run]:
+        command.add_argument("toml_paths", type=Path, nargs="+", metavar="TOML")
+        command.add_argument(
+            "--log-dir", type=Path, default=Path.cwd(), help="Default is cwd"
+        )
+        command.add_argument("--max-workers", type=int, default=1)
+        command.add_argument(
+            "--timing-store",
+            type=Path,
+            help="SQLite file of cell durations, see `timing_store.TimingStore`",
+        )
+        # Batching changes the transactions run, so `plan` must match `run`
+        command.add_argument("--batch-installs", action="store_true")
+        command.add_argument("--batch-queries", action="store_true")
+        command.add_argument("--max-batch-size", type=int)
+
+    run.add_argument("--database", required=True)
+    run.add_argument("--engine", required=True, help="Primary engine")
+    run.add_argument("--config", default="~/.rai/config", help="RAI config file")
+    run.add_argument("--profile", default="default", help="Profile in `--config`")
+    run.add_argument(
+        "--engine-pool", nargs="+", help="Further engines for readonly queries"
+    )
+    run.add_argument("--engine-policy", default="least_loaded")
+    run.add_argument(
+        "--result-cache", type=Path, help="Directory of cached query results"
+    )
+    run.add_argument(
+        "--resume-from", type=Path, help="Log directory of an earlier run to resume"
+    )
+    run.add_argument(
+        "--chunk-bytes",
+        type=int,
+        default=64 * 1024**2,
+        help="Size of the chunks of DATA queries with `chunked = true`",
+    )
+    run.add_argument(
+        "--delta-snapshots",
+        type=Path,
+        help="Directory of data file snapshots, loads only changed rows",
+    )
+    run.add_argument("--delta-max-change-ratio", type=float, default=0.2)
+    run.add_argument(
+        "--infer-csv-types",
+        action="store_true",
+        help="Load CSV files with column types inferred from a sample of rows",
+    )
+    run.add_argument("--csv-sample-rows", type=int, default=10000)
+    run.add_argument(
+        "--cache-csv-schemas",
+        action="store_true",
+        help="Keep inferred column types in the log directory, see `csv_schema.cached_csv_schema`",
+    )
+    run.add_argument("--max-uploads", type=int, default=2)
+    run.add_argument("--prefetch-depth", type=int, default=0)
+    run.add_argument("--result-compression")
+    run.add_argument("--result-format")
+    run.add_argument(
+        "--result-memory-bytes",
+        type=int,
+        help="Spill larger responses to disk, see `result_spill.spilled_exec`",
+    )
+    run.add_argument("--result-spill-dir", type=Path)
+    run.add_argument("--metrics-textfile", type=Path)
+    run.add_argument(
+        "--http-pool-size",
+        type=int,
+        help="Idle keep-alive connections kept per host, see `transport.ConnectionPool`",
+    )
+    run.add_argument(
+        "--upload-compression",
+        choices=["gzip", "zstd"],
+        help="Compress request bodies, see `transport.ConnectionPool`",
+    )
+    run.add_argument("--upload-compression-min-bytes", type=int, default=64 * 1024)
+    run.add_argument(
+        "--max-attempts",
+        type=int,
+        help="Retry transient errors, see `retry.RetryPolicy` (writes only when `idempotent`)",
+    )
+    run.add_argument(
+        "--timeout-multiplier",
+        type=float,
+        help="Time out readonly calls after this multiple of their recorded duration",
+    )
+    run.add_argument(
+        "--hedge-percentile",
+        type=float,
+        help="Hedge readonly queries slower than this percentile",
+    )
+    run.add_argument(
+        "--background-logging",
+        action="store_true",
+        help="Sets `SequenceLogger.background`",
+    )
+    run.add_argument(
+        "--structured-logging",
+        action="store_true",
+        help="Sets `SequenceLogger.structured`",
+    )
+
+    return parser.parse_args(argv)
+
+
+def validate(args: Namespace) -> None:
+    """Validate every TOML file, exiting on the first with errors"""
+    for toml_path in args.toml_paths:
+        schema = valid_schema_or_exit(toml_path)
+        print(f"'{toml_path}' is valid, {len(schema['queries'])} queries")
+
+
+def plan(args: Namespace) -> None:
+    """Print the `Sequence.plan` of every TOML file, as JSON"""
+    from rai_python_harness.schema import Schema
+    from rai_python_harness.sequence import Sequence
+    from rai_python_harness.sequence_logger import SequenceLogger
+    from rai_python_harness.timing_store import TimingStore
+
+    if not args.timing_store:
+        exit("EXECUTION STOPPED: `--timing-store` must be set to plan a run")
+
+    timing_store = TimingStore(args.timing_store)
+    sequence_logger = SequenceLogger(args.log_dir)
+    try:
+        for toml_path in args.toml_paths:
+            sequence = Sequence(
+                None,
+                Schema(toml_path),
+                sequence_logger,
+                max_workers=args.max_workers,
+                batch_installs=args.batch_installs,
+                batch_queries=args.batch_queries,
+                max_batch_size=args.max_batch_size,
+                timing_store=timing_store,
+            )
+            print(dumps({"toml_path": str(toml_path), **sequence.plan()}))
+    finally:
+        sequence_logger.close()
+        timing_store.close()
+
+
+def run(args: Namespace) -> None:
+    """Execute every TOML file in order, against `--database` on `--engine`"""
+    from railib import api, config
+
+    from rai_python_harness.delta_load import DeltaSnapshots
+    from rai_python_harness.result_cache import ResultCache
+    from rai_python_harness.retry import RetryPolicy
+    from rai_python_harness.schema import Schema
+    from rai_python_harness.sequence import Sequence
+    from rai_python_harness.sequence_logger import SequenceLogger
+    from rai_python_harness.timing_store import TimingStore
+
+    # Validate every file before running any of them
+    schemas = [Schema(toml_path) for toml_path in args.toml_paths]
+
+    context = api.Context(**config.read(fname=args.config, profile=args.profile))
+    timing_store = TimingStore(args.timing_store) if args.timing_store else None
+    result_cache = ResultCache(args.result_cache) if args.result_cache else None
+    delta_snapshots = (
+        DeltaSnapshots(args.delta_snapshots) if args.delta_snapshots else None
+    )
+    retry_policies = None
+    if args.max_attempts or args.timeout_multiplier or args.hedge_percentile:
+        policy = RetryPolicy(
+            max_attempts=args.max_attempts or 1,
+            timeout_multiplier=args.timeout_multiplier,
+            hedge_percentile=args.hedge_percentile,
+        )
+        retry_policies = {
+            cell_type: policy for cell_type in ["DATA", "INSTALL", "QUERY", "UPDATE"]
+        }
+
+    sequence_logger = SequenceLogger(
+        args.log_dir,
+        background=args.background_logging,
+        structured=args.structured_logging,
+    )
+
+    try:
+        for schema in schemas:
+            sequence = Sequence(
+                context,
+                schema,
+                sequence_logger,
+                max_workers=args.max_workers,
+                batch_installs=args.batch_installs,
+                batch_queries=args.batch_queries,
+                max_batch_size=args.max_batch_size,
+                result_cache=result_cache,
+                resume_from=args.resume_from,
+                chunk_bytes=args.chunk_bytes,
+                max_uploads=args.max_uploads,
+                result_compression=args.result_compression,
+                result_format=args.result_format,
+                result_memory_bytes=args.result_memory_bytes,
+                result_spill_dir=args.result_spill_dir,
+                metrics_textfile=args.metrics_textfile,
+                prefetch_depth=args.prefetch_depth,
+                engine_pool=args.engine_pool,
+                engine_policy=args.engine_policy,
+                timing_store=timing_store,
+                http_pool_size=args.http_pool_size,
+                upload_compression=args.upload_compression,
+                upload_compression_min_bytes=args.upload_compression_min_bytes,
+                retry_policies=retry_policies,
+                delta_snapshots=delta_snapshots,
+                delta_max_change_ratio=args.delta_max_change_ratio,
+                infer_csv_types=args.infer_csv_types,
+                csv_sample_rows=args.csv_sample_rows,
+                cache_csv_schemas=args.cache_csv_schemas,
+            )
+            sequence.database = args.database
+            sequence.engine = args.engine
+            sequence.exec()
+    finally:
+        sequence_logger.close()
+        if timing_store:
+            timing_store.close()
+
+
+def main(argv: List[str] = None) -> None:
+    args = parse_args(argv)
+    {"validate": validate, "plan": plan, "run": run}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
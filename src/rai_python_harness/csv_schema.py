@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from json import JSONDecodeError, dumps, loads
+from pathlib import Path
+from typing import Dict, Union
+
+import re
+
+from rai_python_harness.utils import content_hash
+
+# Directory, within a log directory, of cached schemas (see `Sequence.cache_csv_schemas`)
+CSV_SCHEMAS_DIR_NAME = "csv_schemas"
+
+# Suffix of the files caching the schema inferred for a CSV file, see `cached_csv_schema`
+SCHEMA_SUFFIX = ".schema.json"
+
+# Column names usable as Rel symbols, e.g. `:X1`
+_SYMBOL = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def infer_csv_schema(data_path: Path, sample_rows: int = 10000) -> Dict[str, str]:
+    """Return the Rel type of each column of the CSV file at `data_path`, from its
+    first `sample_rows` rows: "int" when every (non-empty) value is an integer,
+    "float" when every value is a number, and "string" otherwise. Columns with
+    zero-padded values (e.g. ZIP codes, "02134") are strings, so their leading
+    zeros are kept."""
+    from pandas import read_csv, to_numeric
+
+    sample = read_csv(
+        data_path, nrows=sample_rows, dtype=str, keep_default_na=False
+    ).apply(lambda column: column.str.strip())
+
+    schema = {}
+    for name, values in sample.items():
+        values = values[values != ""]
+
+        if values.empty or values.str.fullmatch(r"[+-]?0\d+(\.\d*)?").any():
+            schema[name] = "string"
+        elif values.str.fullmatch(r"[+-]?\d+").all():
+            schema[name] = "int"
+        elif to_numeric(values, errors="coerce").notna().all():
+            schema[name] = "float"
+        else:
+            schema[name] = "string"
+
+    return schema
+
+
+def cached_csv_schema(
+    data_path: Path, cache_dir: Path, sample_rows: int = 10000
+) -> Dict[str, str]:
+    """Return the schema of the CSV file at `data_path` cached in `cache_dir` (see
+    `schema_cache_path`), inferring and caching it when there is none, or when
+    its columns no longer match the file's. Cached types may be edited by hand."""
+    cache_path = schema_cache_path(data_path, cache_dir)
+
+    with open(data_path, "r", newline="") as f:
+        header = f.readline()
+
+    try:
+        cached = loads(cache_path.read_text())
+        if cached.get("header") == header.rstrip("\r\n"):
+            return cached["schema"]
+    except (FileNotFoundError, JSONDecodeError, AttributeError):
+        pass
+
+    schema = infer_csv_schema(data_path, sample_rows)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(
+        dumps(
+            {
+                "file": str(data_path.resolve()),
+                "header": header.rstrip("\r\n"),
+                "schema": schema,
+            },
+            indent=2,
+        )
+    )
+    return schema
+
+
+def schema_cache_path(data_path: Path, cache_dir: Path) -> Path:
+    """Return the path, in `cache_dir`, of the cached schema of the CSV file at
+    `data_path`: its name and a hash of its (resolved) path, e.g.
+    `sales-0123456789ab.schema.json`"""
+    path_hash = content_hash(str(data_path.resolve()))[:12]
+    return Path(cache_dir / f"{data_path.stem}-{path_hash}{SCHEMA_SUFFIX}")
+
+
+def schema_config(schema: Union[None, Dict[str, str]], config: str = "config") -> str:
+    """Return the Rel definition of `schema` for the `load_csv` configuration
+    `config`, or an empty string when `schema` is empty or has a column name
+    that is not a Rel symbol (every column is then loaded as a string)"""
+    if not schema or not all(_SYMBOL.match(name) for name in schema):
+        return ""
+
+    columns = ";\n".join(f'    :{name}, "{type}"' for name, type in schema.items())
+    return f"def {config}:schema = {{\n{columns}\n}}\n"
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import re
+
+# Characters that change the state of the JSON scanner in `json_array_chunks`
+_JSON_SPECIAL_CHARS = re.compile(r'[\[\]{}",\\]')
+
+
+def csv_rows(file_path: Path) -> Iterator[str]:
+    """Yield the header row, then every other row, of the CSV file at `file_path`.
+
+    Rows may span several lines within a quoted field, so a line only ends a
+    row when the number of quote characters read so far is even.
+    """
+    with open(file_path, "r", newline="") as f:
+        header = f.readline()
+        if not header:
+            return
+
+        yield header
+        lines: List[str] = []
+        in_quotes = False
+
+        for line in f:
+            lines.append(line)
+
+            if line.count('"') % 2 == 1:
+                in_quotes = not in_quotes
+
+            if not in_quotes:
+                yield "".join(lines)
+                lines = []
+
+        if lines:
+            yield "".join(lines)
+
+
+def csv_chunks(file_path: Path, chunk_bytes: int) -> Iterator[str]:
+    """Yield the CSV file at `file_path` in chunks of (about) `chunk_bytes`, split
+    on row boundaries (see `csv_rows`). Each chunk starts with the header row
+    of the file.
+    """
+    rows = csv_rows(file_path)
+    header = next(rows, "")
+    lines: List[str] = []
+    size = 0
+
+    for row in rows:
+        lines.append(row)
+        size += len(row)
+
+        if size >= chunk_bytes:
+            yield header + "".join(lines)
+            lines, size = [], 0
+
+    if lines:
+        yield header + "".join(lines)
+
+
+def json_array_chunks(
+    file_path: Path, chunk_bytes: int, block_size: int = 1024**2
+) -> Iterator[Tuple[int, str]]:
+    """Yield the JSON array in the file at `file_path` as smaller JSON arrays of
+    (about) `chunk_bytes`, split on element boundaries. Each chunk is yielded
+    with the number of elements preceding it.
+
+    Raises `ValueError` if the file does not hold a JSON array.
+    """
+    elements: List[str] = []
+    element: List[str] = []
+    size = 0
+    offset = 0
+
+    depth = 0
+    in_string = False
+    # Position, within the current block, of a character following a backslash
+    escaped_position = -1
+    started = False
+    finished = False
+
+    with open(file_path, "r") as f:
+        for block in iter(lambda: f.read(block_size), ""):
+            start = 0
+
+            if not started:
+                stripped = block.lstrip()
+                if not stripped:
+                    continue
+                if stripped[0] != "[":
+                    raise ValueError(f"'{file_path}' does not hold a JSON array")
+
+                start = len(block) - len(stripped) + 1
+                started = True
+
+            # Element text since the last split point within `block`
+            mark = start
+
+            for match in _JSON_SPECIAL_CHARS.finditer(block, start):
+                char = match.group()
+                position = match.start()
+
+                if position == escaped_position:
+                    # Character escaped by the preceding backslash
+                    continue
+
+                if in_string:
+                    if char == "\\":
+                        escaped_position = position + 1
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char in "[{":
+                    depth += 1
+                elif char in "}]" and depth > 0:
+                    depth -= 1
+                elif depth == 0:
+                    # End of a top-level element (`]` also ends the array)
+                    element.append(block[mark:position])
+                    text = "".join(element).strip()
+                    element = []
+                    mark = position + 1
+
+                    if text:
+                        elements.append(text)
+                        size += len(text)
+
+                    if size >= chunk_bytes:
+                        yield offset, "[" + ",".join(elements) + "]"
+                        offset += len(elements)
+                        elements, size = [], 0
+
+                    if char == "]":
+                        finished = True
+                        break
+
+            if finished:
+                break
+
+            element.append(block[mark:])
+            escaped_position = 0 if escaped_position == len(block) else -1
+
+    if not finished:
+        raise ValueError(f"'{file_path}' does not hold a complete JSON array")
+
+    if elements:
+        yield offset, "[" + ",".join(elements) + "]"
+
+
+def json_array_elements(file_path: Path) -> Iterator[str]:
+    """Yield the text of each element of the JSON array in the file at `file_path`.
+
+    Raises `ValueError` if the file does not hold a JSON array.
+    """
+    for _, chunk in json_array_chunks(file_path, 1):
+        # Each chunk of (at least) one byte holds a single element
+        yield chunk[1:-1]
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from hashlib import sha256
+from json import dumps, loads
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+from rai_python_harness.csv_schema import schema_config
+from rai_python_harness.data_chunks import csv_rows, json_array_elements
+from rai_python_harness.utils import content_hash
+
+# Column prepended to the rows of CSV files loaded by delta, holding their keys
+KEY_COLUMN = "__harness_row_key__"
+
+
+def keyed_rows(data_path: Path, file_type: str) -> Iterator[Tuple[str, str]]:
+    """Yield the key and text of each row of the CSV file, or element of the JSON
+    array, at `data_path` (the header row of a CSV file is skipped). Keys hash
+    the text (of JSON elements, re-encoded without whitespace and with sorted
+    keys, so formatting changes nothing), numbered so that repeated rows get
+    keys of their own."""
+    if file_type == ".csv":
+        rows = csv_rows(data_path)
+        next(rows, None)
+        texts = ((row.rstrip("\r\n"),) * 2 for row in rows)
+    else:
+        texts = (
+            (
+                element.strip(),
+                dumps(loads(element), sort_keys=True, separators=(",", ":")),
+            )
+            for element in json_array_elements(data_path)
+        )
+
+    occurrences = Counter()
+    for text, canonical in texts:
+        digest = sha256(canonical.encode("utf-8")).hexdigest()[:32]
+        occurrences[digest] += 1
+        yield f"{digest}-{occurrences[digest]}", text
+
+
+def diff(old_keys: Iterable[str], new_keys: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+    """Return the keys inserted into, and deleted from, `old_keys` to give `new_keys`"""
+    old, new = set(old_keys), set(new_keys)
+    return new - old, old - new
+
+
+def delta_command(
+    name: str,
+    file_type: str,
+    full_reload: bool,
+    schema: Union[None, Dict[str, str]] = None,
+) -> str:
+    """Return the Rel command loading the rows in the `data` input into `name`, keyed
+    by row, and deleting the rows keyed in the `deleted` input (a JSON array).
+    With `full_reload`, every row of `name` is deleted instead.
+
+    CSV rows are loaded as `name(:column, key, value)`, and JSON elements as
+    `name(key, x...)`, where `x...` is the element as `load_json` loads it.
+    CSV columns are typed by `schema` (see `csv_schema.infer_csv_schema`).
+    """
+    command = "def config:data = data\n"
+
+    if full_reload:
+        command += f"def delete:{name} = {name}\n"
+    else:
+        command += (
+            "def deleted_config:data = deleted\n"
+            "def deleted_key(k) = load_json[deleted_config](:[], i, k) from i\n"
+        )
+
+    if file_type == ".csv":
+        if schema:
+            command += schema_config({KEY_COLUMN: "string", **schema})
+        if not full_reload:
+            command += f"def delete:{name}(col, key, v) = {name}(col, key, v) and deleted_key(key)\n"
+        command += (
+            "def rows = load_csv[config]\n"
+            f"def insert:{name}(col, key, v) = rows(col, pos, v) and "
+            f"rows(:{KEY_COLUMN}, pos, key) and col != :{KEY_COLUMN} from pos"
+        )
+    else:
+        if not full_reload:
+            command += f"def delete:{name}(key, x...) = {name}(key, x...) and deleted_key(key)\n"
+        command += (
+            "def rows = load_json[config]\n"
+            f"def insert:{name}(key, x...) = rows(:[], i, :key, key) and "
+            "rows(:[], i, :value, x...) from i"
+        )
+
+    return command
+
+
+def delta_data(
+    data_path: Path, file_type: str, keys: Union[None, Set[str]] = None
+) -> str:
+    """Return the rows of the file at `data_path` with `keys` (every row if `None`),
+    each with its key, as the `data` input of `delta_command`"""
+    rows = (
+        (key, text)
+        for key, text in keyed_rows(data_path, file_type)
+        if keys is None or key in keys
+    )
+
+    if file_type == ".csv":
+        header = next(csv_rows(data_path), "").rstrip("\r\n")
+        return f"{KEY_COLUMN},{header}\n" + "".join(
+            f"{key},{text}\n" for key, text in rows
+        )
+
+    return (
+        "["
+        + ",".join(f'{{"key": {dumps(key)}, "value": {text}}}' for key, text in rows)
+        + "]"
+    )
+
+
+@dataclass
+class DeltaSnapshots:
+    """Hash and row keys (see `keyed_rows`) of the last version of each data file
+    loaded into each relation of each database, in `snapshot_dir`.
+
+    Like `ResultCache`, snapshots can not see changes made to a database by
+    anything else. `clear()` them when a database is recreated or its
+    relations are modified elsewhere.
+    """
+
+    snapshot_dir: Path
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __post_init__(self) -> None:
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    def clear(self) -> None:
+        """Remove every snapshot"""
+        with self._lock:
+            for snapshot in self.snapshot_dir.glob("*.snapshot"):
+                snapshot.unlink(missing_ok=True)
+
+    def get(
+        self, database: str, relation: str, data_path: Path
+    ) -> Tuple[Union[None, str], List[str]]:
+        """Return the file hash and row keys of the last load of `data_path` into
+        `relation`, or `(None, [])` if there is none"""
+        with self._lock:
+            try:
+                with open(self._path(database, relation, data_path), "r") as f:
+                    lines = f.read().splitlines()
+            except FileNotFoundError:
+                return None, []
+
+        return (lines[0], lines[1:]) if lines else (None, [])
+
+    def put(
+        self,
+        database: str,
+        relation: str,
+        data_path: Path,
+        file_hash: str,
+        keys: List[str],
+    ) -> None:
+        """Record that the file with `file_hash` and row `keys` was loaded"""
+        snapshot = self._path(database, relation, data_path)
+        partial = snapshot.with_suffix(".partial")
+
+        with self._lock:
+            with open(partial, "w") as f:
+                f.write("\n".join([file_hash, *keys]))
+
+            partial.replace(snapshot)
+
+    def _path(self, database: str, relation: str, data_path: Path) -> Path:
+        key = content_hash(database, relation, str(data_path.resolve()))
+        return Path(self.snapshot_dir / f"{key}.snapshot")
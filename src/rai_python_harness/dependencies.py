@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from heapq import heapify, heappop, heappush
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+# Query types that modify the state of the database
+WRITE_TYPES = ["DATA", "INSTALL", "UPDATE"]
+
+
+def is_write_cell(cell: dict) -> bool:
+    """Return whether or not `cell` modifies the state of the database"""
+    return cell["type"].upper() in WRITE_TYPES
+
+
+def cell_dependencies(queries: List[dict]) -> Dict[int, Set[int]]:
+    """Return a mapping from the `index` of each cell in `queries` to the set of
+    indices it depends on.
+
+    Cells listing `depends_on` use those indices as given. Otherwise, readonly
+    cells depend on every earlier write, and writes depend on every earlier cell.
+    Dependencies are expressed through the "frontier" of earlier cells, so
+    transitively implied edges are omitted.
+    """
+    dependencies = {}
+
+    # Earlier cells no later cell depends on (yet)
+    frontier = set()
+    # Earlier writes no later write depends on (yet)
+    write_frontier = set()
+
+    for cell in sorted(queries, key=lambda qry: qry["index"]):
+        if "depends_on" in cell:
+            deps = set(cell["depends_on"])
+        elif is_write_cell(cell):
+            deps = set(frontier)
+        else:
+            deps = set(write_frontier)
+
+        dependencies[cell["index"]] = deps
+
+        frontier -= deps
+        frontier.add(cell["index"])
+
+        if is_write_cell(cell):
+            write_frontier -= deps
+            write_frontier.add(cell["index"])
+
+    return dependencies
+
+
+def group_dependencies(
+    dependencies: Dict[int, Set[int]], groups: List[List[int]]
+) -> Dict[int, Set[int]]:
+    """Collapse each group of indices in `dependencies` into the first index of the
+    group, which then depends on everything the members of its group depend on."""
+    leaders = {index: group[0] for group in groups for index in group}
+
+    grouped = {}
+    for group in groups:
+        deps = {leaders[dep] for index in group for dep in dependencies[index]}
+        deps.discard(group[0])
+        grouped[group[0]] = deps
+
+    return grouped
+
+
+def critical_path_lengths(
+    dependencies: Dict[int, Set[int]], durations: Dict[int, float]
+) -> Dict[int, float]:
+    """Return, for each index of `dependencies`, the length of the longest chain of
+    dependents starting at that index (including itself), by `durations`"""
+    dependents = _dependents(dependencies)
+    lengths = {}
+
+    # Dependents have higher indices, so visit highest index first
+    for index in sorted(dependencies, reverse=True):
+        lengths[index] = durations.get(index, 0.0) + max(
+            (lengths[dependent] for dependent in dependents[index]), default=0.0
+        )
+
+    return lengths
+
+
+def simulate_schedule(
+    dependencies: Dict[int, Set[int]],
+    durations: Dict[int, float],
+    max_workers: int,
+    priorities: Dict[int, float] = None,
+) -> float:
+    """Return the time `run_dependency_graph` would take to run every index of
+    `dependencies`, were each to take exactly its `durations`"""
+    remaining = {index: set(deps) for index, deps in dependencies.items()}
+    dependents = _dependents(dependencies)
+
+    ready = [
+        _ready_key(index, priorities) for index, deps in remaining.items() if not deps
+    ]
+    heapify(ready)
+
+    # Finish time and index of each running cell
+    running: List[Tuple[float, int]] = []
+    now = 0.0
+
+    while ready or running:
+        while ready and len(running) < max_workers:
+            index = heappop(ready)[1]
+            heappush(running, (now + durations.get(index, 0.0), index))
+
+        now, index = heappop(running)
+        for dependent in dependents[index]:
+            remaining[dependent].discard(index)
+            if not remaining[dependent]:
+                heappush(ready, _ready_key(dependent, priorities))
+
+    return now
+
+
+def _dependents(dependencies: Dict[int, Set[int]]) -> Dict[int, Set[int]]:
+    """Invert `dependencies`, mapping each index to the indices that depend on it"""
+    dependents = {index: set() for index in dependencies}
+    for index, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].add(index)
+
+    return dependents
+
+
+def _ready_key(index: int, priorities: Dict[int, float] = None) -> Tuple[float, int]:
+    """Order ready indices by highest priority, then lowest index"""
+    return (-(priorities or {}).get(index, 0.0), index)
+
+
+def run_dependency_graph(
+    dependencies: Dict[int, Set[int]],
+    run_cell: Callable[[int], Any],
+    max_workers: int,
+    on_complete: Callable[[int], None] = None,
+    priorities: Dict[int, float] = None,
+) -> None:
+    """Call `run_cell` on each index of `dependencies` using a pool of (at most)
+    `max_workers` threads, starting an index once everything it depends on has
+    completed. `on_complete` is called, from the calling thread, as each index finishes.
+
+    Of the indices ready to start, those with the highest `priorities` (e.g.
+    `critical_path_lengths`) start first, then the lowest index.
+
+    No further cells are started after a cell raises; cells already running are
+    allowed to finish, then the exception is re-raised.
+    """
+    remaining = {index: set(deps) for index, deps in dependencies.items()}
+    dependents = _dependents(dependencies)
+
+    ready = [
+        _ready_key(index, priorities) for index, deps in remaining.items() if not deps
+    ]
+    heapify(ready)
+
+    running: Dict[Future, int] = {}
+    error = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+
+        def submit_ready() -> None:
+            while ready and len(running) < max_workers:
+                index = heappop(ready)[1]
+                running[pool.submit(run_cell, index)] = index
+
+        submit_ready()
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in sorted(done, key=lambda fut: running[fut]):
+                index = running.pop(future)
+
+                try:
+                    future.result()
+                except BaseException as exc:
+                    error = error or exc
+                    continue
+
+                if on_complete:
+                    on_complete(index)
+
+                for dependent in dependents[index]:
+                    remaining[dependent].discard(index)
+                    if not remaining[dependent]:
+                        heappush(ready, _ready_key(dependent, priorities))
+
+            if error is None:
+                submit_ready()
+
+    if error is not None:
+        raise error
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterator, List
+
+# Supported `EnginePool.policy`s
+ENGINE_POLICIES = ["least_loaded", "least_recently_used"]
+
+
+@dataclass
+class EnginePool:
+    """Hands out engines for transactions. Writes always run on the primary
+    engine, `engines[0]`, while readonly transactions run on any engine chosen by
+    `policy`: the engine with the fewest transactions in flight
+    ("least_loaded", ties broken by least recent use), or the engine used
+    least recently ("least_recently_used").
+    """
+
+    engines: List[str]
+    policy: str = "least_loaded"
+    _in_flight: Dict[str, int] = field(init=False)
+    _last_used: Dict[str, float] = field(init=False)
+    _busy_seconds: Dict[str, float] = field(init=False)
+    _transactions: Dict[str, int] = field(init=False)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __post_init__(self) -> None:
+        self._in_flight = {engine: 0 for engine in self.engines}
+        self._last_used = {engine: 0.0 for engine in self.engines}
+        self._busy_seconds = {engine: 0.0 for engine in self.engines}
+        self._transactions = {engine: 0 for engine in self.engines}
+
+    @contextmanager
+    def acquire(self, readonly: bool = False) -> Iterator[str]:
+        """Return the engine to run a transaction on for the body of the `with` block"""
+        with self._lock:
+            if not readonly:
+                engine = self.engines[0]
+            elif self.policy == "least_recently_used":
+                engine = min(self.engines, key=lambda e: self._last_used[e])
+            else:
+                engine = min(
+                    self.engines, key=lambda e: (self._in_flight[e], self._last_used[e])
+                )
+
+            self._in_flight[engine] += 1
+            self._transactions[engine] += 1
+            self._last_used[engine] = perf_counter()
+
+        start = perf_counter()
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                self._in_flight[engine] -= 1
+                self._busy_seconds[engine] += perf_counter() - start
+
+    def utilization(self, seconds: float) -> Dict[str, dict]:
+        """Return the number of transactions run on each engine, the time spent in
+        them, and that time as a fraction of `seconds` (e.g. the length of a run).
+        Transactions in flight at once on an engine are each counted in full."""
+        with self._lock:
+            return {
+                engine: {
+                    "transactions": self._transactions[engine],
+                    "busy_seconds": self._busy_seconds[engine],
+                    "utilization": (
+                        self._busy_seconds[engine] / seconds if seconds > 0 else 0.0
+                    ),
+                }
+                for engine in self.engines
+            }
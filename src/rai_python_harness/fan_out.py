@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
+
+import re
+
+from rai_python_harness.file_cache import FileCache
+from rai_python_harness.schema import Schema
+from rai_python_harness.sequence import Sequence
+from rai_python_harness.sequence_logger import SequenceLogger
+
+if TYPE_CHECKING:
+    from railib import api
+
+
+def target_dir_name(database: str, engine: str) -> str:
+    """Return the name of the log sub-directory of a (database, engine) target"""
+    return re.sub(r"[^\w.-]+", "_", f"{database}__{engine}")
+
+
+@dataclass
+class FanOut:
+    """Runs the sequence in `schema` against each (database, engine) pair in
+    `targets`, up to `max_concurrency` targets at a time.
+
+    Each target gets its own `Sequence`, created with `sequence_options`, and its
+    own `SequenceLogger`, created with `logger_options`, writing to a
+    sub-directory of `log_dir` (see `target_dir_name`). A summary is written
+    to a log in `log_dir` itself. Targets share `schema` and a `FileCache`, so
+    source and `inputs` files are read once for all of them.
+    """
+
+    context: api.Context
+    schema: Schema
+    log_dir: Path
+    targets: List[Tuple[str, str]]
+    max_concurrency: int = 4
+    sequence_options: dict = field(default_factory=dict)
+    logger_options: dict = field(default_factory=dict)
+    sequence_logger: SequenceLogger = field(init=False)
+    file_cache: FileCache = field(init=False, default_factory=FileCache)
+
+    def __post_init__(self) -> None:
+        if len(set(self.targets)) != len(self.targets):
+            exit(
+                "EXECUTION STOPPED: `targets` must not repeat a (database, engine) pair"
+            )
+
+        dir_names = [target_dir_name(*target) for target in self.targets]
+        if len(set(dir_names)) != len(dir_names):
+            exit(
+                "EXECUTION STOPPED: `targets` must not map two (database, engine) pairs to the same log directory, see `target_dir_name`"
+            )
+
+        self.sequence_logger = SequenceLogger(self.log_dir, **self.logger_options)
+
+    def exec(self) -> Dict[Tuple[str, str], Union[None, BaseException]]:
+        """Execute the sequence against every target, returning the exception raised
+        by each target (`None` on success). A failed target does not stop the others."""
+        self.sequence_logger.info(
+            f"Running '{self.schema.toml_path}' against {len(self.targets)} targets, (up to) {self.max_concurrency} at a time"
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {
+                target: pool.submit(self._exec_target, *target)
+                for target in self.targets
+            }
+
+        errors = {}
+        for (database, engine), future in futures.items():
+            errors[(database, engine)] = future.exception()
+
+            if errors[(database, engine)] is None:
+                self.sequence_logger.info(
+                    f"{database} ({engine}): completed in {future.result():.3f}s"
+                )
+            else:
+                self.sequence_logger.err(
+                    f"{database} ({engine}): failed with {errors[(database, engine)]!r}",
+                    exc_info=False,
+                )
+
+        self.file_cache.clear()
+        return errors
+
+    def _exec_target(self, database: str, engine: str) -> float:
+        """Execute the sequence against a single target, returning its run time in seconds"""
+        target_log_dir = Path(self.log_dir / target_dir_name(database, engine))
+        target_log_dir.mkdir(exist_ok=True)
+        sequence_logger = SequenceLogger(target_log_dir, **self.logger_options)
+
+        sequence = Sequence(
+            self.context,
+            self.schema,
+            sequence_logger,
+            file_cache=self.file_cache,
+            **self.sequence_options,
+        )
+        sequence.database = database
+        sequence.engine = engine
+
+        start = perf_counter()
+        try:
+            sequence.exec()
+        finally:
+            sequence_logger.close()
+
+        return perf_counter() - start
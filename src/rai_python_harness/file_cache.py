@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Tuple
+
+from rai_python_harness.utils import file_hash, open_file
+
+
+@dataclass
+class FileCache:
+    """Contents and hashes of the files read by several `Sequence`s, e.g. the same
+    sequence run against several databases by `FanOut`. Each file is read (and
+    hashed) once, by whichever `Sequence` asks first, while the others wait.
+
+    Entries are held until `clear()`, so files are assumed not to change while
+    the cache is in use.
+    """
+
+    _entries: Dict[Tuple[str, Path], Future] = field(init=False, default_factory=dict)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def clear(self) -> None:
+        """Forget every file"""
+        with self._lock:
+            self._entries = {}
+
+    def hash(self, file_path: Path) -> str:
+        """Return `utils.file_hash(file_path)`"""
+        return self._get("hash", file_path, file_hash)
+
+    def read(self, file_path: Path) -> str:
+        """Return `utils.open_file(file_path)`, raising `FileNotFoundError` (and friends) as it would"""
+        return self._get("read", file_path, open_file)
+
+    def _get(self, kind: str, file_path: Path, load: Callable[[Path], str]) -> str:
+        with self._lock:
+            future = self._entries.get((kind, file_path))
+            owner = future is None
+            if owner:
+                future = self._entries[(kind, file_path)] = Future()
+
+        if owner:
+            try:
+                future.set_result(load(file_path))
+            except Exception as exc:
+                future.set_exception(exc)
+
+        return future.result()
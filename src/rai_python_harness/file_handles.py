@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from mmap import ACCESS_READ, mmap
+from os import fstat
+from pathlib import Path
+from threading import Lock
+from typing import Dict
+
+from rai_python_harness.utils import buffer_hash, decode_text, file_hash, open_file
+
+
+class _Handle:
+    """A file mapped into memory, with its hash and contents once computed"""
+
+    def __init__(self, file_path: Path) -> None:
+        with open(file_path, "rb") as f:
+            # The mapping keeps a descriptor of its own
+            self._mapping = (
+                mmap(f.fileno(), 0, access=ACCESS_READ)
+                if fstat(f.fileno()).st_size
+                else None
+            )
+
+        self.buffer = memoryview(self._mapping if self._mapping else b"")
+        self.hash: str = None
+        self.text: str = None
+        self.closed = False
+        self.lock = Lock()
+
+    def close(self) -> None:
+        self.closed = True
+        self.text = None
+        self.buffer.release()
+        if self._mapping:
+            self._mapping.close()
+
+
+@dataclass
+class FileHandles:
+    """Files used by the cells of a run, each mapped into memory (see
+    `utils.mapped_file`) the first time it is hashed or read, and served from
+    that mapping (and the contents decoded from it) from then on.
+
+    `references` holds the number of cells using each file. A file's mapping and
+    contents are released once the last of them has called `release`. Files
+    not in `references` are hashed and read directly, as `utils.file_hash`
+    and `utils.open_file` would.
+    """
+
+    references: Dict[Path, int]
+    _handles: Dict[Path, _Handle] = field(init=False, default_factory=dict)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def close(self) -> None:
+        """Release every file, whatever its references"""
+        with self._lock:
+            handles, self._handles = self._handles, {}
+
+        for handle in handles.values():
+            with handle.lock:
+                handle.close()
+
+    def hash(self, file_path: Path) -> str:
+        """Return `utils.file_hash(file_path)`"""
+        handle = self._handle(file_path)
+        if handle is None:
+            return file_hash(file_path)
+
+        with handle.lock:
+            if handle.closed:
+                # Released since, e.g. by `close`
+                return file_hash(file_path)
+            if handle.hash is None:
+                handle.hash = buffer_hash(handle.buffer)
+
+            return handle.hash
+
+    def read(self, file_path: Path) -> str:
+        """Return `utils.open_file(file_path)`, raising `FileNotFoundError` (and friends) as it would"""
+        try:
+            handle = self._handle(file_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File Not Found at '{file_path}'")
+
+        if handle is None:
+            return open_file(file_path)
+
+        with handle.lock:
+            if handle.closed:
+                return open_file(file_path)
+            if handle.text is None:
+                handle.text = decode_text(handle.buffer)
+
+            return handle.text
+
+    def release(self, file_path: Path) -> None:
+        """Record that a cell using the file at `file_path` has finished"""
+        with self._lock:
+            if file_path not in self.references:
+                return
+
+            self.references[file_path] -= 1
+            if self.references[file_path] > 0:
+                return
+
+            del self.references[file_path]
+            handle = self._handles.pop(file_path, None)
+
+        if handle:
+            with handle.lock:
+                handle.close()
+
+    def _handle(self, file_path: Path) -> _Handle:
+        """Return the handle of `file_path`, mapping it if needed, or `None` if
+        `file_path` is not referenced"""
+        with self._lock:
+            if self.references.get(file_path, 0) <= 0:
+                return None
+
+            # Mapped while holding the lock, so each file is mapped once
+            if file_path not in self._handles:
+                self._handles[file_path] = _Handle(file_path)
+
+            return self._handles[file_path]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from copy import copy
+from json import dumps
+from logging import FileHandler, Formatter, Handler, LogRecord, getLogger
+from logging.handlers import QueueHandler, QueueListener
+from queue import Empty, SimpleQueue
+from typing import Any
+
+
+class JsonLinesFormatter(Formatter):
+    """Formats each record as a single line of JSON holding its time, level,
+    message, traceback (if any), and the `fields` passed to `SequenceLogger`,
+    e.g. a cell's `index`, `type`, and timings."""
+
+    def format(self, record: LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            **(getattr(record, "fields", None) or {}),
+        }
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+
+        return dumps(entry, default=str)
+
+
+class BatchFileHandler(FileHandler):
+    """`FileHandler` that leaves flushing to its owner (see `BatchQueueListener`)
+    rather than flushing the file after every record"""
+
+    def emit(self, record: LogRecord) -> None:
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class RecordQueueHandler(QueueHandler):
+    """`QueueHandler` that keeps `fields` and tracebacks apart from the message,
+    so they can still be formatted separately on the other side of the queue"""
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        record = copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = Formatter().formatException(record.exc_info)
+            # Tracebacks can not be pickled, nor outlive their frames
+            record.exc_info = None
+
+        return record
+
+
+class BatchQueueListener(QueueListener):
+    """Writes records from a `SimpleQueue` to `handlers` on a background thread,
+    flushing every `batch_size` records or after `flush_interval` seconds
+    without a record. Records are also passed to the handlers of the root
+    logger, as they would be by propagation."""
+
+    def __init__(
+        self,
+        queue: SimpleQueue,
+        *handlers: Handler,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+    ) -> None:
+        super().__init__(queue, *handlers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._unflushed = 0
+
+    def dequeue(self, block: bool) -> Any:
+        while True:
+            try:
+                return self.queue.get(block, self.flush_interval)
+            except Empty:
+                if not block:
+                    raise
+
+                self.flush()
+
+    def flush(self) -> None:
+        """Flush every handler"""
+        for handler in self.handlers:
+            handler.flush()
+
+        self._unflushed = 0
+
+    def handle(self, record: LogRecord) -> None:
+        super().handle(record)
+
+        for handler in getLogger().handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+        self._unflushed += 1
+        if self._unflushed >= self.batch_size:
+            self.flush()
+
+    def stop(self) -> None:
+        """Write every queued record, then stop the background thread"""
+        super().stop()
+        self.flush()
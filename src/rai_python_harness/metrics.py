@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from json import JSONDecodeError, dumps, loads
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterator, List, Union
+
+METRICS_FILE_NAME = "metrics.jsonl"
+PROMETHEUS_FILE_NAME = "metrics.prom"
+
+# Phases of a cell, in the order they run
+PHASES = ["read", "prepare", "remote", "serialize", "write"]
+
+
+@dataclass
+class CellMetrics:
+    """Timings (in seconds) and sizes (in bytes) of a single cell.
+
+    `read` covers reading source and `inputs` files, `prepare` everything done
+    locally before calling the SDK, `remote` the SDK calls themselves, and
+    `serialize`/`write` encoding and writing the result file(s). Cells in a
+    batch (see `batch_size`) each report the `remote` time of the whole batch.
+    `attempts` counts the calls made when retried, and `hedged` whether or not
+    a hedged call was made (see `retry.RetryPolicy`).
+    """
+
+    index: int
+    name: str
+    type: str
+    phases: Dict[str, float] = field(
+        default_factory=lambda: {phase: 0.0 for phase in PHASES}
+    )
+    bytes_read: int = 0
+    bytes_uploaded: int = 0
+    result_bytes: int = 0
+    batch_size: int = 1
+    engine: str = None
+    cached: bool = False
+    succeeded: bool = False
+    attempts: int = 1
+    hedged: bool = False
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Add `seconds` to the time spent in `phase`"""
+        self.phases[phase] += seconds
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Add the time spent in the body of the `with` block to `phase`"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, perf_counter() - start)
+
+    def seconds(self) -> float:
+        """Return the time spent in every phase"""
+        return sum(self.phases.values())
+
+    def summary(self) -> str:
+        """Return a one-line summary of the metrics, for the log file"""
+        phases = ", ".join(f"{phase} {self.phases[phase]:.3f}s" for phase in PHASES)
+        return f"{phases}; {self.bytes_uploaded} bytes uploaded, {self.result_bytes} bytes of results"
+
+
+def payload_bytes(source: Union[None, str], inputs: Union[None, dict]) -> int:
+    """Return the (UTF-8 encoded) size of a transaction's source and `inputs`"""
+    return sum(
+        len(str(value).encode("utf-8"))
+        for value in [source, *(inputs or {}).values()]
+        if value is not None
+    )
+
+
+@dataclass
+class MetricsRecorder:
+    """Appends the `CellMetrics` of each completed cell, and a record for each
+    `Sequence.exec`, as JSON lines to `metrics_path`. Like `Checkpoint`,
+    records are keyed on the TOML file of the sequence, so several `Sequence`s
+    may share one log directory.
+    """
+
+    metrics_path: Path
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def record_cell(self, toml_path: Path, metrics: CellMetrics) -> None:
+        """Append the metrics of a completed cell of the sequence in `toml_path`"""
+        remote = metrics.phases["remote"]
+        self._append(
+            {
+                "kind": "cell",
+                "toml_path": str(toml_path.resolve()),
+                **asdict(metrics),
+                "seconds": metrics.seconds(),
+                "upload_bytes_per_second": (
+                    metrics.bytes_uploaded / remote if remote > 0 else None
+                ),
+            }
+        )
+
+    def record_sequence(self, toml_path: Path, seconds: float, cells: int) -> None:
+        """Append the wall-clock time and number of cells run by `Sequence.exec`"""
+        self._append(
+            {
+                "kind": "sequence",
+                "toml_path": str(toml_path.resolve()),
+                "seconds": seconds,
+                "cells": cells,
+                "cells_per_second": cells / seconds if seconds > 0 else None,
+            }
+        )
+
+    def records(self) -> List[dict]:
+        """Return every record in `metrics_path`, the last record for a cell (or sequence) wins"""
+        records = {}
+        try:
+            with open(self.metrics_path, "r") as f:
+                for line in f:
+                    try:
+                        record = loads(line)
+                    except JSONDecodeError:
+                        # Line left incomplete by an interrupted run
+                        continue
+
+                    records[
+                        (record["kind"], record["toml_path"], record.get("index"))
+                    ] = record
+        except FileNotFoundError:
+            pass
+
+        return list(records.values())
+
+    def write_prometheus(self, textfile_path: Path) -> None:
+        """Write every record in `metrics_path` to `textfile_path` in the Prometheus
+        text format, e.g. for node exporter's textfile collector. The file is
+        replaced atomically, so it is never read half-written."""
+        partial = Path(textfile_path.parent / f".{textfile_path.name}.partial")
+
+        with self._lock:
+            with open(partial, "w") as f:
+                f.write(prometheus_text(self.records()))
+
+            partial.replace(textfile_path)
+
+    def _append(self, record: dict) -> None:
+        with self._lock:
+            with open(self.metrics_path, "a") as f:
+                f.write(dumps(record) + "\n")
+
+
+def _label_value(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: object) -> str:
+    return ",".join(f'{key}="{_label_value(value)}"' for key, value in labels.items())
+
+
+def prometheus_text(records: List[dict]) -> str:
+    """Render metrics records (see `MetricsRecorder`) in the Prometheus text format"""
+    families = {
+        "rai_harness_cell_phase_seconds": "Time spent by a cell in each phase",
+        "rai_harness_cell_bytes_read": "Bytes of source and inputs files read by a cell",
+        "rai_harness_cell_bytes_uploaded": "Bytes of source and inputs sent by a cell",
+        "rai_harness_cell_result_bytes": "Bytes of result files written by a cell",
+        "rai_harness_cell_cached": "Whether or not a cell's result came from the result cache",
+        "rai_harness_cell_succeeded": "Whether or not a cell's transaction succeeded",
+        "rai_harness_cell_attempts": "Number of times a cell's transaction was attempted",
+        "rai_harness_sequence_seconds": "Wall-clock time of a sequence",
+        "rai_harness_sequence_cells": "Number of cells run by a sequence",
+    }
+    samples = {name: [] for name in families}
+
+    for record in records:
+        if record["kind"] == "sequence":
+            labels = _labels(toml_path=record["toml_path"])
+            samples["rai_harness_sequence_seconds"].append((labels, record["seconds"]))
+            samples["rai_harness_sequence_cells"].append((labels, record["cells"]))
+            continue
+
+        cell = dict(
+            toml_path=record["toml_path"],
+            index=record["index"],
+            name=record["name"],
+            type=record["type"],
+        )
+        for phase, seconds in record["phases"].items():
+            samples["rai_harness_cell_phase_seconds"].append(
+                (_labels(**cell, phase=phase), seconds)
+            )
+
+        labels = _labels(**cell)
+        samples["rai_harness_cell_bytes_read"].append((labels, record["bytes_read"]))
+        samples["rai_harness_cell_bytes_uploaded"].append(
+            (labels, record["bytes_uploaded"])
+        )
+        samples["rai_harness_cell_result_bytes"].append(
+            (labels, record["result_bytes"])
+        )
+        samples["rai_harness_cell_cached"].append((labels, int(record["cached"])))
+        samples["rai_harness_cell_succeeded"].append((labels, int(record["succeeded"])))
+        samples["rai_harness_cell_attempts"].append((labels, record.get("attempts", 1)))
+
+    lines = []
+    for name, help_text in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples[name])
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterable, List
+
+from rai_python_harness.utils import open_file
+
+
+@dataclass
+class Prefetcher:
+    """Reads files on a pool of `max_workers` background threads ahead of the
+    cells that use them, holding (at most) `max_bytes` of file contents at once.
+
+    `references` holds the number of cells using each file. A file is read once,
+    however many cells use it, and its contents are released when the last of
+    them has called `get`. Files are read with `read`.
+    """
+
+    references: Dict[Path, int]
+    max_bytes: int = 256 * 1024**2
+    max_workers: int = 2
+    read: Callable[[Path], str] = open_file
+    _entries: Dict[Path, Future] = field(init=False, default_factory=dict)
+    _sizes: Dict[Path, int] = field(init=False, default_factory=dict)
+    _used_bytes: int = field(init=False, default=0)
+    _lock: Lock = field(init=False, default_factory=Lock)
+    _pool: ThreadPoolExecutor = field(init=False)
+    # Checks sizes and starts reads in order, off the calling thread
+    _planner: ThreadPoolExecutor = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="prefetch"
+        )
+        self._planner = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="prefetch-planner"
+        )
+
+    def close(self) -> None:
+        """Cancel pending reads and release every file's contents"""
+        with self._lock:
+            for future in self._entries.values():
+                future.cancel()
+
+            self._entries, self._sizes, self._used_bytes = {}, {}, 0
+
+        self._planner.shutdown(wait=False)
+        self._pool.shutdown(wait=False)
+
+    def get(self, file_path: Path) -> str:
+        """Return the contents of the file at `file_path`, waiting on its read if it
+        was prefetched and reading it now otherwise. Raises `FileNotFoundError`
+        (and friends) as `read` would."""
+        with self._lock:
+            future = self._entries.get(file_path)
+
+            if file_path in self.references:
+                self.references[file_path] -= 1
+
+                if self.references[file_path] <= 0 and future:
+                    # Last use, release contents
+                    del self._entries[file_path]
+                    self._used_bytes -= self._sizes.pop(file_path)
+
+        return future.result() if future else self.read(file_path)
+
+    def prefetch(self, file_paths: Iterable[Path]) -> None:
+        """Start reading each file in `file_paths` not read (or being read) already,
+        in order, stopping at the first file that does not fit in `max_bytes`.
+        Returns immediately, files are checked and read in the background."""
+        self._planner.submit(self._plan, list(file_paths))
+
+    def _plan(self, file_paths: List[Path]) -> None:
+        for file_path in file_paths:
+            with self._lock:
+                if file_path in self._entries or self.references.get(file_path, 0) <= 0:
+                    continue
+
+            if not file_path.is_file():
+                # e.g. an `inputs` value that is not a file name
+                continue
+
+            size = file_path.stat().st_size
+
+            with self._lock:
+                if file_path in self._entries:
+                    continue
+                if self._used_bytes + size > self.max_bytes:
+                    return
+
+                self._used_bytes += size
+                self._sizes[file_path] = size
+                self._entries[file_path] = self._pool.submit(self.read, file_path)
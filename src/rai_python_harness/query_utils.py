@@ -1,12 +1,39 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from json import dumps
 from pathlib import Path
-from railib import api
-from typing import Union
+from threading import BoundedSemaphore
+from typing import TYPE_CHECKING, Dict, List, Union
 
+if TYPE_CHECKING:
+    # The SDK (and `pyarrow`) are slow to import, so are only imported once a
+    # remote call is made, e.g. in `data_query`
+    from railib import api
+
+from rai_python_harness.csv_schema import schema_config
+from rai_python_harness.data_chunks import csv_chunks, json_array_chunks
+from rai_python_harness.delta_load import (
+    DeltaSnapshots,
+    delta_command,
+    delta_data,
+    diff,
+    keyed_rows,
+)
+from rai_python_harness.metrics import CellMetrics, payload_bytes
+from rai_python_harness.result_writer import (
+    COMPRESSION_SUFFIXES,
+    relation_tables,
+    write_columnar,
+    write_json,
+)
 from rai_python_harness.sequence_logger import SequenceLogger
-from rai_python_harness.utils import write_file
+from rai_python_harness.utils import (
+    cell_has_inputs,
+    file_hash,
+    model_name,
+    open_file,
+)
 
 
 def data_query(
@@ -18,7 +45,13 @@ def data_query(
     name: str,
     logger: SequenceLogger,
     file_type: Union[None, str] = None,
+    schema: Union[None, Dict[str, str]] = None,
 ):
+    """Run `source` with `inputs`, or load the file `source` into the relation
+    `name`. With `schema` (see `csv_schema.infer_csv_schema`), the columns of
+    a CSV file are loaded with those types rather than as strings."""
+    from railib import api
+
     result = None
     print(f"file_type: {file_type}")
 
@@ -37,7 +70,19 @@ def data_query(
         load_fn = None
 
         if file_type:
-            if file_type == ".csv":
+            if file_type == ".csv" and schema:
+                logger.info("CSV file with schema, using `load_csv`...")
+                return api.exec_v1(
+                    context,
+                    database,
+                    engine,
+                    "def config:data = data\n"
+                    + schema_config(schema)
+                    + f"def insert:{name} = load_csv[config]",
+                    inputs={"data": source},
+                    readonly=False,
+                )
+            elif file_type == ".csv":
                 logger.info("CSV file, using `api.load_csv`...")
                 load_fn = api.load_csv
             elif file_type == ".json":
@@ -58,28 +103,422 @@ def data_query(
     return result
 
 
-def log_result(result, index: int, query_name: str, logger: SequenceLogger):
+def cell_namespace(index: int) -> str:
+    """Return the name of the module wrapping the cell at `index` in a batched query"""
+    return f"harness_cell_{index}"
+
+
+def combine_query_sources(sources: dict) -> str:
+    """Return a single Rel program running each source in `sources`, a `dict` from
+    namespace to Rel source, inside its own module. Each module's `output`
+    is exposed as `output:<namespace>`."""
+    return "\n\n".join(
+        f"module {namespace}\n{source}\nend\n\n"
+        f"def output:{namespace} = {namespace}:output"
+        for namespace, source in sources.items()
+    )
+
+
+def chunked_data_query(
+    context: api.Context,
+    database: str,
+    engine: str,
+    data_path: Path,
+    name: str,
+    logger: SequenceLogger,
+    file_type: str,
+    chunk_bytes: int,
+    max_uploads: int = 2,
+    schema: Union[None, Dict[str, str]] = None,
+) -> dict:
+    """Load the CSV or JSON file at `data_path` into the relation `name` in chunks of
+    (about) `chunk_bytes`, with up to `max_uploads` chunks in flight at once, so
+    (at most) `max_uploads + 1` chunks are held in memory.
+
+    Chunks of a CSV file are keyed on their ordinal, i.e. loaded as
+    `name(:column, chunk, pos, value)`, since the file positions of each chunk
+    start from zero. Elements of a JSON array keep their index in the file.
+    CSV columns are typed by `schema`, as in `data_query`.
+    """
+    from railib import api
+
+    if file_type == ".csv":
+        logger.info(f"CSV file, loading in chunks of {chunk_bytes} bytes...")
+        chunks = (
+            (
+                "def config:data = data\n"
+                + schema_config(schema)
+                + f"def insert:{name}(col, chunk, pos, v) = "
+                f"load_csv[config](col, pos, v) and chunk = {ordinal}",
+                chunk,
+            )
+            for ordinal, chunk in enumerate(csv_chunks(data_path, chunk_bytes))
+        )
+    else:
+        logger.info(f"JSON file, loading in chunks of {chunk_bytes} bytes...")
+        chunks = (
+            (
+                "def config:data = data\n"
+                f"def insert:{name}(:[], i, x...) = "
+                f"load_json[config](:[], j, x...) and i = j + {offset}",
+                chunk,
+            )
+            for offset, chunk in json_array_chunks(data_path, chunk_bytes)
+        )
+
+    in_flight = BoundedSemaphore(max_uploads)
+
+    def load_chunk(command: str, chunk: str) -> dict:
+        try:
+            return api.exec_v1(
+                context,
+                database,
+                engine,
+                command,
+                inputs={"data": chunk},
+                readonly=False,
+            )
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=max_uploads) as pool:
+        futures = []
+        for command, chunk in chunks:
+            # Wait for an upload to finish before reading the next chunk
+            in_flight.acquire()
+
+            # Stop reading once an upload has failed
+            if any(future.done() and future.exception() for future in futures):
+                in_flight.release()
+                break
+
+            futures.append(pool.submit(load_chunk, command, chunk))
+
+        results = [future.result() for future in futures]
+
+    logger.info(f"Loaded {len(results)} chunk(s)")
+
+    return combine_load_results(results, "chunks")
+
+
+def combine_load_results(results: Union[list, dict], key: str) -> dict:
+    """Return a single result record for several load transactions, with `results`
+    under `key`. The record is aborted if any transaction was, and holds the
+    problems of every transaction."""
+    values = list(results.values()) if isinstance(results, dict) else results
+
+    return {
+        "aborted": any(result.get("aborted") for result in values),
+        "problems": [
+            problem for result in values for problem in result.get("problems", [])
+        ],
+        key: results,
+    }
+
+
+def group_adjacent_cells(
+    queries: List[dict], batch_types: List[str], max_group_size: int = None
+) -> List[List[dict]]:
+    """Group runs of adjacent cells in `queries` whose type is in `batch_types`,
+    with (at most) `max_group_size` cells per group. All other cells, and cells
+    with `inputs`, are returned in a group of their own.
+
+    A run of INSTALL cells is split where a model name would repeat, as models
+    are bundled into a `dict` keyed on name.
+    """
+    groups = []
+    model_names = set()
+
+    for qry in queries:
+        query_type_uppercase = qry["type"].upper()
+        name = model_name(Path(qry["file_path"]))
+        batchable = query_type_uppercase in batch_types and not cell_has_inputs(qry)
+
+        if (
+            batchable
+            and groups
+            and groups[-1][-1]["type"].upper() == query_type_uppercase
+            and not cell_has_inputs(groups[-1][-1])
+            and (max_group_size is None or len(groups[-1]) < max_group_size)
+            and not (query_type_uppercase == "INSTALL" and name in model_names)
+        ):
+            groups[-1].append(qry)
+        else:
+            groups.append([qry])
+            model_names = set()
+
+        model_names.add(name)
+
+    return groups
+
+
+def log_result(
+    result,
+    index: int,
+    query_name: str,
+    logger: SequenceLogger,
+    compression: str = None,
+    result_format: str = "json",
+    metrics: CellMetrics = None,
+) -> Union[None, Path]:
+    """Write `result` to `{index}-{query_name}.json` in the log directory, with a
+    `.gz` or `.zst` suffix when `compression` is set, returning the path written
+    (if any). The result is serialized incrementally, see `result_writer.write_json`.
+
+    When `result_format` is "parquet" or "feather", each output relation is
+    written to a file of its own (see `result_writer.write_columnar`).
+
+    Serialization and write times, and the size of the files written, are
+    recorded in `metrics`, if given.
+    """
+    result_path = Path(
+        logger.log_output_dir
+        / f"{index}-{query_name}.json{COMPRESSION_SUFFIXES[compression]}"
+    )
+
     try:
-        _result = dumps(result)
-        _ext = "json"
-        logger.info("QUERY RETURNED")
-    except:
-        _result = f"{result}"
-        _ext = "txt"
+        if result_format != "json" and next(relation_tables(result), None):
+            table_paths = write_columnar(
+                result, result_path, result_format, compression, metrics
+            )
+            logger.info(
+                f"QUERY RETURNED {len(table_paths)} relation(s) as {result_format}"
+            )
+        else:
+            table_paths = []
+            write_json(result, result_path, compression, metrics=metrics)
+            logger.info("QUERY RETURNED")
+    except (TypeError, ValueError):
         logger.err("ERROR: Response could not be serialized into JSON")
+        result_path.unlink(missing_ok=True)
+        return None
+
+    # TODO: Update to reflect changes in SDK return packet
+    # if len(result["problems"]) > 0:
+    #     logger.warn("PROBLEMS")
+    #     logger.warn(
+    #         f"`result['problems']` non-empty (length {len(result['problems'])})"
+    #     )
+    # else:
+    #     logger.info("SUCCESS")
+
+    if metrics:
+        metrics.result_bytes = sum(
+            path.stat().st_size for path in [result_path, *table_paths]
+        )
+
+    return result_path
+
 
-    if _result:
-        write_file(
-            Path(logger.log_output_dir / f"{index}-{query_name}.{_ext}"), _result
+def sharded_data_query(
+    context: api.Context,
+    database: str,
+    engine: str,
+    shard_paths: List[Path],
+    name: str,
+    logger: SequenceLogger,
+    file_type: str,
+    max_workers: int = 2,
+    schema: Union[None, Dict[str, str]] = None,
+) -> dict:
+    """Load each CSV or JSON file in `shard_paths` into the relation `name`, using
+    up to `max_workers` concurrent transactions.
+
+    Shards are keyed on their file name, i.e. CSV shards are loaded as
+    `name(:column, shard, pos, value)` and JSON shards as `name(shard, ...)`,
+    since the file positions (or array indices) of each shard overlap. CSV
+    columns are typed by `schema`, as in `data_query`.
+    """
+    from railib import api
+
+    if file_type == ".csv":
+        # Escape the braces of the schema from `command.format`
+        command = (
+            "def config:data = data\n"
+            + schema_config(schema).replace("{", "{{").replace("}", "}}")
+            + f"def insert:{name}(col, shard, pos, v) = "
+            "load_csv[config](col, pos, v) and shard = {shard}"
         )
-        # TODO: Update to reflect changes in SDK return packet
-        # if len(result["problems"]) > 0:
-        #     logger.warn("PROBLEMS")
-        #     logger.warn(
-        #         f"`result['problems']` non-empty (length {len(result['problems'])})"
-        #     )
-        # else:
-        #     logger.info("SUCCESS")
     else:
-        logger.err("ERROR")
-        logger.err("`result` is empty")
+        command = (
+            "def config:data = data\n"
+            f"def insert:{name}(shard, x...) = "
+            "load_json[config](x...) and shard = {shard}"
+        )
+
+    def load_shard(shard_path: Path) -> dict:
+        return api.exec_v1(
+            context,
+            database,
+            engine,
+            command.format(shard=dumps(shard_path.name)),
+            inputs={"data": open_file(shard_path)},
+            readonly=False,
+        )
+
+    logger.info(f"Loading {len(shard_paths)} shard(s) into '{name}'...")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = {}
+        for shard_path, result in zip(shard_paths, pool.map(load_shard, shard_paths)):
+            status = "ABORTED" if result.get("aborted") else "loaded"
+            logger.info(f"Shard '{shard_path}' {status}")
+            results[shard_path.name] = result
+
+    return combine_load_results(results, "shards")
+
+
+def delta_data_query(
+    context: api.Context,
+    database: str,
+    engine: str,
+    data_path: Path,
+    name: str,
+    logger: SequenceLogger,
+    file_type: str,
+    snapshots: DeltaSnapshots,
+    max_change_ratio: float = 0.2,
+    schema: Union[None, Dict[str, str]] = None,
+) -> dict:
+    """Load the rows (or elements) of the CSV or JSON file at `data_path` inserted
+    or deleted since it was last loaded into the relation `name`, according to
+    `snapshots`, in a single transaction (see `delta_load.delta_command`).
+
+    The relation is reloaded in full when there is no snapshot, or when the
+    number of rows inserted and deleted is more than `max_change_ratio` of the
+    rows last loaded. Nothing is uploaded when the file is unchanged. The
+    result holds the number of rows inserted and deleted, and bytes uploaded,
+    under `delta`. CSV columns are typed by `schema`, as in `data_query`.
+    """
+    from railib import api
+
+    current_hash = file_hash(data_path)
+    last_hash, last_keys = snapshots.get(database, name, data_path)
+
+    if current_hash == last_hash:
+        logger.info(f"'{data_path}' unchanged since it was last loaded, skipping...")
+        return {
+            "aborted": False,
+            "problems": [],
+            "delta": {
+                "inserted": 0,
+                "deleted": 0,
+                "full_reload": False,
+                "bytes_uploaded": 0,
+            },
+        }
+
+    keys = [key for key, _ in keyed_rows(data_path, file_type)]
+    inserted, deleted = diff(last_keys, keys)
+    change_ratio = (len(inserted) + len(deleted)) / max(len(last_keys), 1)
+    full_reload = last_hash is None or change_ratio > max_change_ratio
+
+    if full_reload:
+        logger.info(
+            f"Reloading all {len(keys)} row(s) of '{data_path}' "
+            + (
+                "(not loaded before)"
+                if last_hash is None
+                else f"({change_ratio:.1%} changed, more than {max_change_ratio:.1%})"
+            )
+        )
+        inputs = {"data": delta_data(data_path, file_type)}
+    else:
+        logger.info(
+            f"Loading {len(inserted)} inserted and {len(deleted)} deleted row(s) of '{data_path}' ({change_ratio:.1%} changed)"
+        )
+        inputs = {
+            "data": delta_data(data_path, file_type, inserted),
+            "deleted": dumps(sorted(deleted)),
+        }
+
+    result = api.exec_v1(
+        context,
+        database,
+        engine,
+        delta_command(name, file_type, full_reload, schema),
+        inputs=inputs,
+        readonly=False,
+    )
+
+    if transaction_succeeded(result):
+        snapshots.put(database, name, data_path, current_hash, keys)
+
+    return {
+        **result,
+        "delta": {
+            "inserted": len(keys) if full_reload else len(inserted),
+            "deleted": len(deleted),
+            "full_reload": full_reload,
+            "bytes_uploaded": payload_bytes(None, inputs),
+        },
+    }
+
+
+def split_install_result(result: dict, position: int) -> dict:
+    """Return the part of an `api.install_model` response for the model at `position`.
+
+    `api.install_model` runs one labeled action per model, so every key of
+    `result` is kept except `actions`, which is narrowed to the single action
+    `action{position}`. Problems are reported for the transaction as a whole.
+    """
+    if not isinstance(result, dict) or "actions" not in result:
+        return result
+
+    return {
+        **result,
+        "actions": [
+            action
+            for action in result["actions"]
+            if action.get("name") == f"action{position}"
+        ],
+    }
+
+
+def split_query_result(result, namespace: str):
+    """Return the part of a batched `api.exec` response produced by the module
+    `namespace` (see `combine_query_sources`), with `output:<namespace>`
+    renamed to `output`. Transaction, metadata, and problems are shared by
+    every part of the batch.
+
+    The namespace is matched in relation ids with or without the colon of a
+    symbol, i.e. as `/:output/:<namespace>/...` or `/:output/<namespace>/...`."""
+    from railib import api
+
+    def cell_relation_id(relation_id: str) -> Union[None, str]:
+        for prefix in [f"/:output/:{namespace}", f"/:output/{namespace}"]:
+            if relation_id == prefix or relation_id.startswith(f"{prefix}/"):
+                return "/:output" + relation_id[len(prefix) :]
+        return None
+
+    if isinstance(result, api.TransactionAsyncResponse):
+        return api.TransactionAsyncResponse(
+            result.transaction,
+            result.metadata,
+            [
+                {**rel, "relationId": cell_relation_id(rel["relationId"])}
+                for rel in (result.results or [])
+                if cell_relation_id(rel["relationId"]) is not None
+            ],
+            result.problems,
+        )
+
+    return result
+
+
+def transaction_succeeded(result) -> bool:
+    """Return whether or not an `api.exec` response completed without errors"""
+    from railib import api
+
+    if isinstance(result, api.TransactionAsyncResponse):
+        transaction, problems = result.transaction, result.problems
+    elif isinstance(result, dict):
+        transaction, problems = result, result.get("problems")
+    else:
+        return False
+
+    if (transaction or {}).get("state") == "ABORTED" or (transaction or {}).get(
+        "aborted"
+    ):
+        return False
+
+    return not any(problem.get("is_error") for problem in (problems or []))
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from json import dumps, loads
+from mmap import ACCESS_READ, mmap
+from os import utime
+from pathlib import Path
+from threading import Lock
+from typing import IO, Any, Dict, Union
+from uuid import uuid4
+
+from rai_python_harness.result_spill import ARROW_STREAM, parse_results
+from rai_python_harness.utils import content_hash
+
+# Suffix of cache entries, see `ResultCache.put`
+ENTRY_SUFFIX = ".multipart"
+
+# File of the fingerprints of each database, see `ResultCache.database_fingerprint`
+FINGERPRINTS_FILE_NAME = "fingerprints.json"
+
+
+@dataclass
+class ResultCache:
+    """On-disk cache of readonly query results, keyed by `ResultCache.key`.
+
+    Each entry is stored as a "multipart/form-data" document laid out as the
+    transaction responses of RAI Cloud, relations as Arrow streams and
+    everything else as JSON (or, for metadata, protocol buffers), so reading
+    an entry never runs code from the cache directory. Unreadable entries are
+    removed and treated as misses.
+
+    Entries are evicted least recently used first once the cache holds more
+    than `max_bytes`. The cache also tracks a fingerprint of the writes made to
+    each database by the `Sequence`s using it, kept in the cache directory so
+    it outlives the process, as writes made by anything else cannot be seen.
+    `clear()` the cache when they may have happened.
+    """
+
+    cache_dir: Path
+    max_bytes: int = 1024**3
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __post_init__(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache"""
+        with self._lock:
+            for entry in self.cache_dir.glob(f"*{ENTRY_SUFFIX}"):
+                entry.unlink(missing_ok=True)
+
+    def database_fingerprint(self, database: str) -> str:
+        """Return the fingerprint of the writes made to `database` so far"""
+        with self._lock:
+            return self._fingerprints().get(database, "")
+
+    def get(self, key: str) -> Union[None, Any]:
+        """Return the result cached under `key`, or `None` on a miss"""
+        entry = Path(self.cache_dir / f"{key}{ENTRY_SUFFIX}")
+
+        with self._lock:
+            try:
+                result = _read_entry(entry)
+            except FileNotFoundError:
+                return None
+            except Exception:
+                # Truncated, corrupt, or written by an incompatible version
+                entry.unlink(missing_ok=True)
+                return None
+
+            # Mark entry as most recently used
+            utime(entry)
+
+        return result
+
+    @staticmethod
+    def key(
+        database: str, source: str, inputs: Union[None, dict], fingerprint: str
+    ) -> str:
+        """Return the cache key for `source` run with `inputs` against `database`
+        in the state identified by `fingerprint`"""
+        return content_hash(database, source, inputs, fingerprint)
+
+    def put(self, key: str, result: Any) -> None:
+        """Cache `result`, an `api.exec` response, under `key`, then evict
+        entries beyond `max_bytes`"""
+        entry = Path(self.cache_dir / f"{key}{ENTRY_SUFFIX}")
+        partial = Path(self.cache_dir / f"{key}.partial")
+
+        with self._lock:
+            try:
+                with open(partial, "wb") as f:
+                    _write_entry(result, f)
+            except (AttributeError, TypeError, ValueError):
+                # Result can not be cached
+                partial.unlink(missing_ok=True)
+                return
+
+            partial.replace(entry)
+            self._evict()
+
+    def set_database_fingerprint(self, database: str, fingerprint: str) -> None:
+        """Record the fingerprint of the writes made to `database` so far"""
+        fingerprints_path = Path(self.cache_dir / FINGERPRINTS_FILE_NAME)
+        partial = Path(self.cache_dir / f"{FINGERPRINTS_FILE_NAME}.partial")
+
+        with self._lock:
+            fingerprints = self._fingerprints()
+            fingerprints[database] = fingerprint
+            partial.write_text(dumps(fingerprints, indent=2, sort_keys=True))
+            partial.replace(fingerprints_path)
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in `max_bytes`"""
+        entries = [
+            (entry, entry.stat()) for entry in self.cache_dir.glob(f"*{ENTRY_SUFFIX}")
+        ]
+        total_bytes = sum(stat.st_size for _, stat in entries)
+
+        for entry, stat in sorted(entries, key=lambda e: e[1].st_mtime):
+            if total_bytes <= self.max_bytes:
+                break
+
+            entry.unlink(missing_ok=True)
+            total_bytes -= stat.st_size
+
+    def _fingerprints(self) -> Dict[str, str]:
+        """Return the recorded fingerprint of each database"""
+        try:
+            fingerprints = loads(
+                Path(self.cache_dir / FINGERPRINTS_FILE_NAME).read_text()
+            )
+        except (FileNotFoundError, ValueError):
+            return {}
+
+        return fingerprints if isinstance(fingerprints, dict) else {}
+
+
+def _write_entry(result: Any, f: IO[bytes]) -> None:
+    """Write `result`, an `api.exec` response, to `f` as a "multipart/form-data"
+    document, raising `TypeError` for anything else"""
+    from pyarrow import ipc
+    from railib import api
+
+    if not isinstance(result, api.TransactionAsyncResponse):
+        raise TypeError(f"Results of type '{type(result).__name__}' can not be cached")
+
+    delimiter = b"--" + uuid4().hex.encode("utf-8")
+
+    def part(name: str, content_type: str) -> None:
+        f.write(delimiter + b"\r\n")
+        f.write(
+            f'Content-Disposition: form-data; name="{name}"\r\nContent-Type: {content_type}\r\n\r\n'.encode(
+                "utf-8"
+            )
+        )
+
+    part("transaction", "application/json")
+    f.write(dumps(result.transaction).encode("utf-8") + b"\r\n")
+    part("problems", "application/json")
+    f.write(dumps(result.problems).encode("utf-8") + b"\r\n")
+
+    if result.metadata is not None:
+        part("metadata.proto", "application/x-protobuf")
+        f.write(result.metadata.SerializeToString() + b"\r\n")
+
+    for relation in result.results or []:
+        table = relation["table"]
+        part(relation["relationId"], ARROW_STREAM)
+        with ipc.new_stream(f, table.schema) as writer:
+            writer.write_table(table)
+        f.write(b"\r\n")
+
+    f.write(delimiter + b"--\r\n")
+
+
+def _read_entry(entry: Path) -> Any:
+    """Return the `api.exec` response written to `entry` by `_write_entry`.
+    Relations are read from a memory map of `entry`, without copying them."""
+    from railib import api
+    from railib.pb.message_pb2 import MetadataInfo
+
+    with open(entry, "rb") as f:
+        body = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+    # Each entry starts with its own delimiter
+    boundary = body[2 : body.find(b"\r\n")].decode("utf-8")
+    parts = parse_results(body, f'multipart/form-data; boundary="{boundary}"')
+
+    metadata = None
+    if "metadata.proto" in parts:
+        metadata = MetadataInfo()
+        metadata.ParseFromString(parts["metadata.proto"])
+
+    return api.TransactionAsyncResponse(
+        loads(parts["transaction"]),
+        metadata,
+        parts["results"],
+        loads(parts["problems"]),
+    )
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from io import BytesIO
+from json import loads
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from tempfile import TemporaryFile
+from time import sleep
+from typing import IO, TYPE_CHECKING, List, Tuple, Union
+
+import re
+
+if TYPE_CHECKING:
+    from railib import api
+
+# Content type of the parts of a response holding a relation, as an Arrow stream
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def spool(
+    response: IO[bytes],
+    memory_bytes: int,
+    spill_dir: Path = None,
+    chunk_size: int = 1024**2,
+) -> Union[bytes, mmap]:
+    """Return the body of `response`, read `chunk_size` bytes at a time. Bodies of
+    up to `memory_bytes` are returned as `bytes`; larger bodies are written to
+    a temporary file (in `spill_dir`, default the system's) as they are read,
+    and returned memory-mapped from it, so they are paged in from disk as
+    they are used instead of being held in memory."""
+    body: IO[bytes] = BytesIO()
+
+    for chunk in iter(lambda: response.read(chunk_size), b""):
+        if isinstance(body, BytesIO) and body.tell() + len(chunk) > memory_bytes:
+            # Over the ceiling, move what was read so far to disk
+            spilled = TemporaryFile(dir=spill_dir)
+            spilled.write(body.getbuffer())
+            body = spilled
+
+        body.write(chunk)
+
+    if isinstance(body, BytesIO):
+        return body.getvalue()
+
+    body.flush()
+    with body:
+        # The mapping outlives the (already deleted) file
+        return mmap(body.fileno(), 0, access=ACCESS_READ)
+
+
+def multipart_parts(
+    body: Union[bytes, mmap], content_type: str
+) -> List[Tuple[str, str, int, int]]:
+    """Return the name, content type, and start and end offsets within `body` of
+    each part of a "multipart/form-data" response, without copying them"""
+    boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1)
+    delimiter = b"--" + boundary.encode("utf-8")
+
+    parts = []
+    position = body.find(delimiter)
+    while position != -1:
+        start = position + len(delimiter)
+        if body[start : start + 2] == b"--":
+            # Closing delimiter
+            break
+
+        headers_end = body.find(b"\r\n\r\n", start)
+        headers = {}
+        for line in body[start:headers_end].decode("utf-8").splitlines():
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        position = body.find(b"\r\n" + delimiter, headers_end + 4)
+        name = re.search(r'name="([^"]+)"', headers.get("content-disposition", ""))
+        parts.append(
+            (
+                name.group(1) if name else None,
+                headers.get("content-type", ""),
+                headers_end + 4,
+                position if position != -1 else len(body),
+            )
+        )
+        if position != -1:
+            position += 2
+
+    return parts
+
+
+def parse_results(body: Union[bytes, mmap], content_type: str) -> dict:
+    """Return the parts of a multipart transaction response, by name. Relations are
+    `pyarrow.Table`s built on `body` itself, with no copy of their data, and
+    listed under `results` as `api.exec` would; other parts are `bytes`."""
+    # Dependency of the RAI SDK, imported only when needed
+    from pyarrow import BufferReader, Table, ipc, py_buffer
+
+    buffer = py_buffer(body)
+    parts = {"results": []}
+
+    for name, part_type, start, end in multipart_parts(body, content_type):
+        if part_type == ARROW_STREAM:
+            with ipc.open_stream(
+                BufferReader(buffer.slice(start, end - start))
+            ) as reader:
+                table = Table.from_batches(list(reader), schema=reader.schema)
+            parts["results"].append({"relationId": name, "table": table})
+        else:
+            parts[name] = bytes(body[start:end])
+
+    return parts
+
+
+def spilled_exec(
+    context: api.Context,
+    database: str,
+    engine: str,
+    command: str,
+    inputs: dict = None,
+    readonly: bool = True,
+    memory_bytes: int = 256 * 1024**2,
+    spill_dir: Path = None,
+) -> api.TransactionAsyncResponse:
+    """Run `command` as `api.exec` would, but read the response holding its
+    results through `spool`, so (at most) `memory_bytes` of a response are
+    held in memory and larger responses are spilled to disk. Results are
+    `pyarrow.Table`s built on the response as is (see `parse_results`), so
+    they are only paged in as result files are written, batch by batch."""
+    from railib import api, rest
+    from railib.pb.message_pb2 import MetadataInfo
+
+    url = f"{context.scheme}://{context.host}:{context.port}{api.PATH_TRANSACTIONS}"
+    data = api.TransactionAsync(database, engine, readonly=readonly).data
+    data["query"] = command
+    if inputs is not None:
+        # As `api.TransactionAsync.run`
+        data["v1_inputs"] = [
+            api._query_action_input(key, value) for key, value in inputs.items()
+        ]
+
+    with rest.post(context, url, data) as response:
+        content_type = response.headers.get("content-type", "")
+        body = spool(response, memory_bytes, spill_dir)
+
+    if "multipart/form-data" in content_type.lower():
+        # Completed within the request, results included
+        parts = parse_results(body, content_type)
+        metadata = MetadataInfo()
+        metadata.ParseFromString(parts["metadata.proto"])
+        return api.TransactionAsyncResponse(
+            loads(parts["transaction"]),
+            metadata,
+            parts["results"],
+            loads(parts["problems"]),
+        )
+
+    # Running asynchronously, poll for completion as `api.exec` does
+    txn = api.get_transaction(context, loads(body)["id"])
+    while not api.is_txn_term_state(txn["state"]):
+        sleep(1)
+        txn = api.get_transaction(context, txn["id"])
+
+    with rest.get(context, f"{url}/{txn['id']}/results") as response:
+        content_type = response.headers.get("content-type", "")
+        body = spool(response, memory_bytes, spill_dir)
+
+    return api.TransactionAsyncResponse(
+        txn,
+        api.get_transaction_metadata(context, txn["id"]),
+        parse_results(body, content_type)["results"],
+        api.get_transaction_problems(context, txn["id"]),
+    )
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from gzip import GzipFile
+from io import TextIOWrapper
+from json import JSONEncoder
+from pathlib import Path
+from time import perf_counter
+from typing import IO, Any, Callable, Iterator, List, Tuple
+
+import re
+
+from rai_python_harness.metrics import CellMetrics
+
+# File name suffix of each supported `compression`
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+# Supported `result_format`s, "json" writes the whole response as one JSON file
+RESULT_FORMATS = ["json", "parquet", "feather"]
+
+
+class LazyList(list):
+    """`list` whose items are produced on iteration, so `json` can serialize them
+    one at a time instead of holding every item in memory."""
+
+    def __init__(self, length: int, items: Callable[[], Iterator]) -> None:
+        super().__init__()
+        self._length = length
+        self._items = items
+
+    def __iter__(self) -> Iterator:
+        return self._items()
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def open_compressed(file_path: Path, compression: str = None) -> IO[str]:
+    """Open `file_path` for writing text, compressed with `compression` ("gzip", "zstd", or `None`)"""
+    if compression is None:
+        return open(file_path, "w", encoding="utf-8")
+    elif compression == "gzip":
+        return TextIOWrapper(GzipFile(file_path, "wb"), encoding="utf-8")
+    elif compression == "zstd":
+        # Optional dependency
+        from zstandard import ZstdCompressor
+
+        return TextIOWrapper(
+            ZstdCompressor().stream_writer(open(file_path, "wb")), encoding="utf-8"
+        )
+    else:
+        raise ValueError(f"Compression '{compression}' not supported")
+
+
+def to_json(obj: Any) -> Any:
+    """`default` hook for `json.JSONEncoder`, converting objects returned by the
+    RAI SDK into JSON serializable values. Anything else is written as a string."""
+    # `pyarrow.Table`, written batch-by-batch
+    if hasattr(obj, "to_batches") and hasattr(obj, "column_names"):
+        return {
+            "columns": obj.column_names,
+            "rows": LazyList(
+                obj.num_rows,
+                lambda: (
+                    row
+                    for batch in obj.to_batches()
+                    for row in zip(*(column.to_pylist() for column in batch.columns))
+                ),
+            ),
+        }
+
+    # Protocol buffer messages, e.g. transaction metadata
+    if hasattr(obj, "DESCRIPTOR") and hasattr(obj, "SerializeToString"):
+        from google.protobuf.json_format import MessageToDict
+
+        return MessageToDict(obj)
+
+    # Response objects, e.g. `api.TransactionAsyncResponse`
+    if hasattr(obj, "__dict__"):
+        return vars(obj)
+
+    return str(obj)
+
+
+def write_json(
+    result: Any,
+    file_path: Path,
+    compression: str = None,
+    chunk_size: int = 64 * 1024,
+    metrics: CellMetrics = None,
+) -> None:
+    """Serialize `result` as JSON to `file_path` incrementally, buffering (about)
+    `chunk_size` characters at a time. Time spent encoding and writing
+    (including compression) is added to `metrics`, if given."""
+    encoder = JSONEncoder(default=to_json)
+    serializing = writing = 0.0
+
+    with open_compressed(file_path, compression) as f:
+        buffer = []
+        buffered = 0
+        mark = perf_counter()
+
+        for part in encoder.iterencode(result):
+            buffer.append(part)
+            buffered += len(part)
+
+            if buffered >= chunk_size:
+                text = "".join(buffer)
+                written = perf_counter()
+                f.write(text)
+                buffer, buffered = [], 0
+
+                serializing += written - mark
+                mark = perf_counter()
+                writing += mark - written
+
+        text = "".join(buffer)
+        serializing += perf_counter() - mark
+        mark = perf_counter()
+        f.write(text)
+
+    writing += perf_counter() - mark
+
+    if metrics:
+        metrics.add("serialize", serializing)
+        metrics.add("write", writing)
+
+
+def relation_tables(result: Any) -> Iterator[Tuple[str, Any]]:
+    """Yield the relation id and table of each output relation of an SDK response.
+    Tables are `pyarrow.Table`s for `api.exec` and `pandas.DataFrame`s for the
+    (v1) `dict` responses of `api.exec_v1` and friends."""
+    if hasattr(result, "results"):
+        for relation in result.results or []:
+            yield relation["relationId"], relation["table"]
+    elif isinstance(result, dict):
+        for relation in result.get("output") or []:
+            # Dependency of `rai_python_harness`, imported only when needed
+            from pandas import DataFrame
+
+            rel_key = relation["rel_key"]
+            yield "/".join(
+                [f"/:{rel_key['name']}", *rel_key["keys"], *rel_key["values"]]
+            ), DataFrame(
+                {f"v{i + 1}": column for i, column in enumerate(relation["columns"])}
+            )
+
+
+def write_columnar(
+    result: Any,
+    file_path: Path,
+    result_format: str,
+    compression: str = None,
+    metrics: CellMetrics = None,
+) -> List[Path]:
+    """Write each output relation of `result` to its own `result_format` ("parquet"
+    or "feather") file named after `file_path` and the relation id. The rest of
+    the response is written as JSON to `file_path`, with each relation's table
+    replaced by the path of its file. Returns the paths of the relation files."""
+    # Dependency of the RAI SDK, imported only when needed
+    from pyarrow import Table, feather, parquet
+
+    table_paths = {}
+    # e.g. `4-feature_X_as_floats.json` => `4-feature_X_as_floats`
+    stem = file_path.name.split(".")[0]
+
+    for relation_id, table in relation_tables(result):
+        # e.g. `/:output/Int64/Float64` => `_output_Int64_Float64`
+        relation_suffix = re.sub(r"[^\w]+", "_", relation_id)
+        table_path = Path(file_path.parent / f"{stem}{relation_suffix}.{result_format}")
+
+        start = perf_counter()
+        if not isinstance(table, Table):
+            table = Table.from_pandas(table, preserve_index=False)
+
+        written = perf_counter()
+        if result_format == "parquet":
+            parquet.write_table(table, str(table_path))
+        else:
+            feather.write_feather(table, str(table_path))
+
+        if metrics:
+            metrics.add("serialize", written - start)
+            metrics.add("write", perf_counter() - written)
+
+        table_paths[relation_id] = str(table_path)
+
+    if hasattr(result, "results"):
+        summary = {
+            **vars(result),
+            "results": [
+                {"relationId": relation_id, "path": path}
+                for relation_id, path in table_paths.items()
+            ],
+        }
+    else:
+        summary = {
+            **result,
+            "output": [
+                {"relationId": relation_id, "path": path}
+                for relation_id, path in table_paths.items()
+            ],
+        }
+
+    write_json(summary, file_path, compression, metrics=metrics)
+
+    return [Path(path) for path in table_paths.values()]
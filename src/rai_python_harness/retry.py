@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from random import uniform
+from socket import timeout as SocketTimeout
+from threading import Lock, Thread
+from time import monotonic, sleep
+from typing import Any, Callable, Deque, Dict, List
+from urllib.error import HTTPError, URLError
+
+# HTTP status codes worth retrying
+TRANSIENT_STATUS_CODES = [408, 429, 500, 502, 503, 504]
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Return whether or not `exc` may succeed if the request is made again"""
+    if isinstance(exc, HTTPError):
+        return exc.code in TRANSIENT_STATUS_CODES
+
+    return isinstance(exc, (URLError, ConnectionError, TimeoutError, SocketTimeout))
+
+
+@dataclass
+class RetryPolicy:
+    """How the remote calls of a type of cell are retried.
+
+    Calls failing with a transient error (see `is_transient`) are made up to
+    `max_attempts` times, waiting a random time of up to `base_delay * 2**n`
+    seconds (capped at `max_delay`) before the `n`th retry ("full jitter").
+
+    With `timeout_multiplier`, calls of readonly cells time out after
+    `timeout_multiplier` times the time the cell's remote calls have taken
+    (see `timing_store.TimingStore`), or `min_timeout` seconds if longer.
+    Writes, and cells without recorded durations, never time out.
+
+    With `hedge_percentile`, a second, identical call is made when a readonly
+    QUERY cell has taken longer than that percentile of recent QUERY calls,
+    and whichever call responds first is used.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    timeout_multiplier: float = None
+    min_timeout: float = 60.0
+    hedge_percentile: float = None
+
+    def delay(self, attempt: int) -> float:
+        """Return the seconds to wait before retrying after failed `attempt` (from zero)"""
+        return uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def timeout(self, estimate: float) -> float:
+        """Return the timeout of a call estimated to take `estimate` seconds, or `None`"""
+        if self.timeout_multiplier is None or estimate is None:
+            return None
+
+        return max(self.min_timeout, self.timeout_multiplier * estimate)
+
+
+@dataclass
+class LatencyTracker:
+    """Durations of the last `window` remote calls of each type of cell"""
+
+    window: int = 100
+    # Fewer samples give no percentile, so no hedging
+    min_samples: int = 10
+    _samples: Dict[str, Deque[float]] = field(init=False, default_factory=dict)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def percentile(self, kind: str, percentile: float) -> float:
+        """Return the `percentile`th percentile of the durations of `kind`, or `None`"""
+        with self._lock:
+            samples = sorted(self._samples.get(kind, []))
+
+        if len(samples) < self.min_samples:
+            return None
+
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+    def record(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=self.window)).append(seconds)
+
+
+def _start(call: Callable[[], Any]) -> Future:
+    """Run `call` on a daemon thread, so an abandoned call never holds up exit"""
+    future = Future()
+
+    def run() -> None:
+        try:
+            future.set_result(call())
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    Thread(target=run, daemon=True).start()
+    return future
+
+
+def first_response(
+    call: Callable[[], Any],
+    timeout: float = None,
+    hedge_after: float = None,
+    on_hedge: Callable[[], None] = None,
+) -> Any:
+    """Return the result of `call`, raising `TimeoutError` after `timeout` seconds.
+    When `call` has not returned after `hedge_after` seconds, `call` is made a
+    second time, and the first successful result is returned. Abandoned calls
+    run to completion in the background, their results ignored."""
+    if timeout is None and hedge_after is None:
+        return call()
+
+    start = monotonic()
+    futures: List[Future] = [_start(call)]
+
+    while True:
+        for future in futures:
+            if future.done() and future.exception() is None:
+                return future.result()
+
+        pending = [future for future in futures if not future.done()]
+        if not pending:
+            # Every call failed, report the last
+            return futures[-1].result()
+
+        if timeout is not None and monotonic() >= start + timeout:
+            raise TimeoutError(f"No response within {timeout:.1f}s")
+
+        hedge_due = hedge_after is not None and len(futures) == 1
+        if hedge_due and monotonic() >= start + hedge_after:
+            if on_hedge:
+                on_hedge()
+            futures.append(_start(call))
+            continue
+
+        deadlines = [start + timeout] if timeout is not None else []
+        if hedge_due:
+            deadlines.append(start + hedge_after)
+
+        wait(
+            pending,
+            timeout=max(0.0, min(deadlines) - monotonic()) if deadlines else None,
+            return_when=FIRST_COMPLETED,
+        )
+
+
+def call_with_retries(
+    call: Callable[[], Any],
+    policy: RetryPolicy,
+    timeout: float = None,
+    hedge_after: float = None,
+    on_retry: Callable[[int, BaseException, float], None] = None,
+    on_hedge: Callable[[], None] = None,
+) -> Any:
+    """Return the result of `call`, made as `first_response` would, retrying
+    transient errors as `policy` allows. `on_retry` is called with the number
+    of the next attempt, the error, and the delay before each retry."""
+    attempt = 0
+    while True:
+        try:
+            return first_response(call, timeout, hedge_after, on_hedge)
+        except Exception as exc:
+            if attempt + 1 >= policy.max_attempts or not is_transient(exc):
+                raise
+
+            delay = policy.delay(attempt)
+            attempt += 1
+            if on_retry:
+                on_retry(attempt + 1, exc, delay)
+            sleep(delay)
@@ -29,3 +29,7 @@ class Schema:
             return self.schema[f"{name}"]
         else:
             raise KeyError(f"'{name}' does not exist")
+
+    def get_or(self, name, default: Any = None) -> Any:
+        """Return value associated with 'name' from the dictionary `self.schema`, or `default`."""
+        return self.schema.get(f"{name}", default)
@@ -1,15 +1,76 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from collections import Counter
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from railib import api
-from typing import Any
+from statistics import median
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Set, Tuple, Union
 
-from rai_python_harness.query_utils import data_query, log_result
+if TYPE_CHECKING:
+    # The SDK (and `pyarrow`) are slow to import, so are only imported once a
+    # remote call is made, e.g. in `_exec_cell`
+    from railib import api
+
+from rai_python_harness.checkpoint import CHECKPOINT_FILE_NAME, Checkpoint
+from rai_python_harness.csv_schema import (
+    CSV_SCHEMAS_DIR_NAME,
+    cached_csv_schema,
+    infer_csv_schema,
+    schema_config,
+)
+from rai_python_harness.delta_load import DeltaSnapshots
+from rai_python_harness.dependencies import (
+    cell_dependencies,
+    critical_path_lengths,
+    group_dependencies,
+    is_write_cell,
+    run_dependency_graph,
+    simulate_schedule,
+)
+from rai_python_harness.metrics import (
+    METRICS_FILE_NAME,
+    PROMETHEUS_FILE_NAME,
+    CellMetrics,
+    MetricsRecorder,
+    payload_bytes,
+)
+from rai_python_harness.engine_pool import ENGINE_POLICIES, EnginePool
+from rai_python_harness.file_cache import FileCache
+from rai_python_harness.file_handles import FileHandles
+from rai_python_harness.prefetch import Prefetcher
+from rai_python_harness.query_utils import (
+    cell_namespace,
+    chunked_data_query,
+    combine_query_sources,
+    data_query,
+    delta_data_query,
+    group_adjacent_cells,
+    log_result,
+    sharded_data_query,
+    split_install_result,
+    split_query_result,
+    transaction_succeeded,
+)
+from rai_python_harness.result_cache import ResultCache
+from rai_python_harness.result_spill import spilled_exec
+from rai_python_harness.result_writer import COMPRESSION_SUFFIXES, RESULT_FORMATS
+from rai_python_harness.retry import LatencyTracker, RetryPolicy, call_with_retries
 from rai_python_harness.schema import Schema
-from rai_python_harness.sequence_logger import SequenceLogger
+from rai_python_harness.sequence_logger import BufferedLogger, SequenceLogger
+from rai_python_harness.timing_store import TimingStore
+from rai_python_harness.transport import UPLOAD_CODECS, ConnectionPool, install_pool
 
-from rai_python_harness.utils import cell_has_inputs, open_file, sanitize_query_name
+from rai_python_harness.utils import (
+    cell_has_inputs,
+    content_hash,
+    file_hash,
+    is_glob_pattern,
+    is_installed,
+    model_name,
+    open_file,
+    sanitize_query_name,
+)
 
 
 @dataclass
@@ -19,11 +80,61 @@ class Sequence:
     sequence_logger: SequenceLogger
     database: str = None
     engine: str = None
+    max_workers: int = 1
+    batch_installs: bool = False
+    batch_queries: bool = False
+    max_batch_size: int = None
+    result_cache: ResultCache = None
+    resume_from: Path = None
+    chunk_bytes: int = 64 * 1024**2
+    max_uploads: int = 2
+    result_compression: str = None
+    result_format: str = None
+    metrics_textfile: Path = None
+    prefetch_depth: int = 0
+    prefetch_bytes: int = 256 * 1024**2
+    file_cache: FileCache = None
+    engine_pool: List[str] = None
+    engine_policy: str = "least_loaded"
+    timing_store: TimingStore = None
+    http_pool_size: int = None
+    upload_compression: str = None
+    upload_compression_min_bytes: int = 64 * 1024
+    retry_policies: Dict[str, RetryPolicy] = None
+    delta_snapshots: DeltaSnapshots = None
+    delta_max_change_ratio: float = 0.2
+    infer_csv_types: bool = False
+    csv_sample_rows: int = 10000
+    cache_csv_schemas: bool = False
+    result_memory_bytes: int = None
+    result_spill_dir: Path = None
     # Non-initialized variables are bound "in post" to accommodate CLI args
     # _engine: str = field(init=False)
     # _database: str = field(init=False)
     _data_dir: Path = field(init=False)
     _source_dir: Path = field(init=False)
+    # Hashes of the DATA, INSTALL, and UPDATE cells that succeeded (or were
+    # skipped as unchanged) in `exec`, by index
+    _write_hashes: Dict[int, str] = field(init=False, default_factory=dict)
+    _write_indices: List[int] = field(init=False, default_factory=list)
+    _base_fingerprint: str = field(init=False, default="")
+    # Hashes of each cell's source and `inputs` (see `_hashes`), by index
+    _cell_hashes: Dict[int, dict] = field(init=False, default_factory=dict)
+    _checkpoint: Checkpoint = field(init=False, default=None)
+    # Indices of cells unchanged since the checkpoint in `resume_from`
+    _skipped: Set[int] = field(init=False, default_factory=set)
+    # Metrics of cells in progress, by index
+    _metrics: Dict[int, CellMetrics] = field(init=False, default_factory=dict)
+    _metrics_recorder: MetricsRecorder = field(init=False, default=None)
+    _prefetcher: Prefetcher = field(init=False, default=None)
+    _handles: FileHandles = field(init=False, default=None)
+    _engines: EnginePool = field(init=False, default=None)
+    _http_pool: ConnectionPool = field(init=False, default=None)
+    # Durations of remote calls, by cell type, for hedging
+    _latencies: LatencyTracker = field(init=False, default_factory=LatencyTracker)
+    # Cells in `index` order, and the position of each index within them
+    _ordered_cells: List[dict] = field(init=False, default_factory=list)
+    _positions: Dict[int, int] = field(init=False, default_factory=dict)
 
     def __post_init__(self):
         # Bind variables to CLI args (highest rank) or contents of TOML file (default)
@@ -36,6 +147,42 @@ class Sequence:
             self.schema.toml_path.parent / self.schema.get("source_dir")
         ).absolute()
 
+        if self.result_compression not in COMPRESSION_SUFFIXES:
+            exit(
+                f"EXECUTION STOPPED: Result compression '{self.result_compression}' not supported, must be one of {list(COMPRESSION_SUFFIXES)}"
+            )
+
+        if self.result_compression == "zstd" and not is_installed("zstandard"):
+            exit(
+                "EXECUTION STOPPED: Result compression 'zstd' requires the `zstandard` package, `pip install zstandard`"
+            )
+
+        if self.upload_compression not in [None, *UPLOAD_CODECS]:
+            exit(
+                f"EXECUTION STOPPED: Upload compression '{self.upload_compression}' not supported, must be one of {[None, *UPLOAD_CODECS]}"
+            )
+
+        if self.upload_compression == "zstd" and not is_installed("zstandard"):
+            exit(
+                "EXECUTION STOPPED: Upload compression 'zstd' requires the `zstandard` package, `pip install zstandard`"
+            )
+
+        if self.engine_policy not in ENGINE_POLICIES:
+            exit(
+                f"EXECUTION STOPPED: Engine policy '{self.engine_policy}' not supported, must be one of {ENGINE_POLICIES}"
+            )
+
+        if self.retry_policies:
+            self.retry_policies = {
+                cell_type.upper(): policy
+                for cell_type, policy in self.retry_policies.items()
+            }
+
+        if self.result_format and self.result_format not in RESULT_FORMATS:
+            exit(
+                f"EXECUTION STOPPED: Result format '{self.result_format}' not supported, must be one of {RESULT_FORMATS}"
+            )
+
     @property
     def database(self) -> str:
         return self._database
@@ -69,94 +216,1119 @@ class Sequence:
         self._source_dir = path
 
     def exec(self) -> None:
-        """Execute each cell in `schema.query` using `schema.get("engine")` in the database `schema.get("database")`."""
+        """Execute each cell in `schema.query` using `schema.get("engine")` in the database `schema.get("database")`.
+
+        When `max_workers` is greater than one (1), cells are dispatched to a pool of
+        worker threads as soon as every cell they depend on has completed (see
+        `dependencies.cell_dependencies`). Log entries are written cell-by-cell in `index` order.
+
+        Each completed cell is recorded in a `Checkpoint` in the log directory. When
+        `resume_from` is set, cells whose source and `inputs` are unchanged since
+        the checkpoint in that directory are skipped, as long as every cell they
+        depend on is skipped too.
+
+        Timings and sizes of each completed cell (see `metrics.CellMetrics`) are
+        appended to `metrics.jsonl` in the log directory, and written in the
+        Prometheus text format to `metrics_textfile` (default `metrics.prom` in
+        the log directory) once every cell has run.
+
+        When `prefetch_depth` is greater than zero (0), the source and `inputs`
+        files of the next `prefetch_depth` cells are read on background threads
+        as each cell starts, holding at most `prefetch_bytes` of files at once.
+
+        Unless `file_cache` is set, each file used by the cells to run is mapped
+        into memory once, hashed and read from that mapping however many cells
+        use it, and released once the last of them has completed (see
+        `file_handles.FileHandles`).
+
+        Readonly QUERY cells run on `engine` or any engine in `engine_pool`, chosen
+        by `engine_policy` (see `engine_pool.EnginePool`), while writes always
+        run on `engine`. Each engine's utilization is logged at the end of the run.
+
+        When `http_pool_size` is set, SDK requests go through a keep-alive
+        `transport.ConnectionPool` shared by every `Sequence` in the process,
+        keeping up to `http_pool_size` idle connections per host. The pool's
+        settings are logged at the start of the run, and its statistics at the end.
+
+        When `upload_compression` is set, the pool is installed (with up to 10
+        idle connections per host unless `http_pool_size` is set), and request
+        bodies of at least `upload_compression_min_bytes` are compressed with
+        that codec. The compression ratio and estimated upload time saved are
+        logged at the end of the run. The pool is process-wide, so a `Sequence`
+        setting either option (re)sets the compression of every request sent
+        from then on, by any `Sequence`, while one setting neither leaves it as is.
+
+        Remote calls of cells whose type has a policy in `retry_policies` are
+        retried, timed out, and hedged as that `retry.RetryPolicy` allows. Writes
+        (DATA, INSTALL, and UPDATE cells) are only retried when marked `idempotent`,
+        and never time out, so an abandoned write never overlaps its retry.
+
+        When `delta_snapshots` is set, DATA cells loading a CSV or JSON file
+        (without `inputs`) upload only the rows changed since their last load,
+        see `query_utils.delta_data_query`.
+
+        When `infer_csv_types` is set, the column types of each CSV file loaded by
+        a DATA cell (without `inputs`) are inferred from its first
+        `csv_sample_rows` rows (see `csv_schema.infer_csv_schema`), and the file
+        is loaded with those types rather than as strings. With
+        `cache_csv_schemas`, inferred types are kept in the `csv_schemas`
+        directory of the log directory.
 
-        # Iterate 'queries' array and dispatch queries entry-by-entry
-        for qry in self.schema.get("queries"):
-            # Generate a 'sanitized' name for query
-            query_name = sanitize_query_name(qry)
+        When `result_memory_bytes` is set, QUERY and UPDATE cells hold at most
+        that much of a response in memory, spilling larger responses to a
+        temporary file in `result_spill_dir` from which their results are read
+        batch by batch as they are written (see `result_spill.spilled_exec`).
+        """
 
+        self._write_hashes = {}
+        self._write_indices = sorted(
+            qry["index"] for qry in self.schema.get("queries") if is_write_cell(qry)
+        )
+
+        self._cell_hashes = {}
+        self._metrics = {}
+        self._metrics_recorder = MetricsRecorder(
+            Path(self.log_dir() / METRICS_FILE_NAME)
+        )
+        self._checkpoint = Checkpoint(Path(self.log_dir() / CHECKPOINT_FILE_NAME))
+        self._skipped = self._resumable_cells() if self.resume_from else set()
+        if self.result_cache:
+            self._base_fingerprint = self.result_cache.database_fingerprint(
+                self.database
+            )
+
+        self._ordered_cells = sorted(
+            self.schema.get("queries"), key=lambda qry: qry["index"]
+        )
+        self._positions = {
+            qry["index"]: position for position, qry in enumerate(self._ordered_cells)
+        }
+        # Number of cells (left to run) using each file
+        references = Counter(
+            file_path
+            for qry in self._ordered_cells
+            if qry["index"] not in self._skipped
+            for file_path in self._cell_files(qry)
+        )
+        if not self.file_cache:
+            self._handles = FileHandles(Counter(references))
+
+        if self.prefetch_depth > 0:
+            self._prefetcher = Prefetcher(
+                Counter(references),
+                self.prefetch_bytes,
+                read=self.file_cache.read if self.file_cache else self._handles.read,
+            )
+            self._prefetcher.prefetch(
+                file_path
+                for qry in self._ordered_cells[: self.prefetch_depth]
+                for file_path in self._cell_files(qry)
+            )
+
+        # `engine` first, as the primary
+        self._engines = EnginePool(
+            list(dict.fromkeys([self.engine, *(self.engine_pool or [])])),
+            self.engine_policy,
+        )
+
+        if self.http_pool_size or self.upload_compression:
+            self._http_pool = install_pool(
+                self.http_pool_size or 10,
+                compression=self.upload_compression,
+                compression_min_bytes=self.upload_compression_min_bytes,
+            )
             self.sequence_logger.info(
-                f"{qry['index']}: {query_name} ({qry['type'].upper()})"
+                f"HTTP connection pool: up to {self._http_pool.pool_size} idle connection(s) per host, timeout {self._http_pool.timeout or 'none'}, upload compression {self._http_pool.compression or 'none'}",
+                fields={
+                    "pool_size": self._http_pool.pool_size,
+                    "timeout": self._http_pool.timeout,
+                    "compression": self._http_pool.compression,
+                    "compression_min_bytes": self._http_pool.compression_min_bytes,
+                },
             )
 
-            # Assign path for source file
-            if qry["type"] == "data" and ("inputs" not in qry):
-                source_path = Path(self.data_dir / qry["file_path"])
+        start = perf_counter()
+        try:
+            if self.max_workers > 1:
+                self._exec_parallel()
             else:
-                source_path = Path(self.source_dir / qry["file_path"])
+                # Iterate 'queries' array and dispatch queries group-by-group
+                for group in self._cell_groups():
+                    self._exec_group(group, [self.sequence_logger] * len(group))
+        finally:
+            if self._prefetcher:
+                self._prefetcher.close()
+                self._prefetcher = None
+
+            if self._handles:
+                self._handles.close()
+                self._handles = None
+
+            # Unchanged unless a write succeeded, so reruns of readonly cells hit
+            if self.result_cache and set(self._write_hashes) - self._skipped:
+                self.result_cache.set_database_fingerprint(
+                    self.database, self._fingerprint(sorted(self._write_hashes))
+                )
+
+            if self.engine_pool:
+                for engine, usage in self._engines.utilization(
+                    perf_counter() - start
+                ).items():
+                    self.sequence_logger.info(
+                        f"Engine '{engine}': {usage['transactions']} transaction(s), busy {usage['busy_seconds']:.3f}s ({usage['utilization']:.0%} of run)",
+                        fields={"engine": engine, **usage},
+                    )
+
+            if self._http_pool:
+                # Totals for the process, the pool is shared
+                stats = self._http_pool.stats()
+                self.sequence_logger.info(
+                    f"HTTP connection pool: {stats['requests']} request(s), {stats['opened']} connection(s) opened, {stats['reused']} reused ({stats['reuse_ratio']:.0%}), {stats['stale']} stale",
+                    fields=stats,
+                )
+
+            if self._http_pool and self._http_pool.compression:
+                stats = self._http_pool.upload_stats()
+                self.sequence_logger.info(
+                    f"Upload compression ({self._http_pool.compression}): {stats['compressed']} request(s), {stats['bytes_before']} bytes compressed to {stats['bytes_after']} ({stats['ratio']:.1%}) in {stats['compress_seconds']:.3f}s, about {stats['seconds_saved']:.3f}s of upload saved",
+                    fields=stats,
+                )
+
+            self._metrics_recorder.record_sequence(
+                self.schema.toml_path,
+                perf_counter() - start,
+                len(self.schema.get("queries")) - len(self._skipped),
+            )
+            self._metrics_recorder.write_prometheus(
+                self.metrics_textfile or Path(self.log_dir() / PROMETHEUS_FILE_NAME)
+            )
+
+    def _resumable_cells(self) -> Set[int]:
+        """Return the indices of cells that can be skipped when resuming from `resume_from`"""
+        resume = Checkpoint(Path(self.resume_from / CHECKPOINT_FILE_NAME))
+        queries = self.schema.get("queries")
+        dependencies = cell_dependencies(queries)
+
+        skipped = set()
+        for qry in sorted(queries, key=lambda qry: qry["index"]):
+            entry = resume.get(self.schema.toml_path, qry["index"])
+            if not entry or not dependencies[qry["index"]] <= skipped:
+                continue
 
-            self.sequence_logger.info(f"Attempting to load '{source_path}'")
             try:
-                source = open_file(source_path)
+                unchanged = entry["hashes"] == self._hashes(qry)
             except FileNotFoundError:
-                self.sequence_logger.err(f"'{source_path}' not found, exiting")
-                exit()
+                unchanged = False
 
-            inputs = None
+            if unchanged:
+                skipped.add(qry["index"])
+                # Carry entry forward, so the next run may resume from this one
+                self._checkpoint.record(self.schema.toml_path, entry)
+
+                if is_write_cell(qry):
+                    self._write_hashes[qry["index"]] = content_hash(
+                        qry["type"].upper(), entry["hashes"]
+                    )
+
+        self.sequence_logger.info(
+            f"Resuming from '{self.resume_from}', skipping {len(skipped)} unchanged cell(s)"
+        )
+        return skipped
+
+    def _hashes(self, qry: dict) -> dict:
+        """Return the hashes of the source file and each `inputs` value of a cell"""
+        if qry["index"] not in self._cell_hashes:
+            inputs = {}
             if cell_has_inputs(qry):
-                self.sequence_logger.info(
-                    "Create 'inputs' dictionary (as necessary)..."
+                for entry in qry["inputs"]:
+                    for key, value in entry.items():
+                        input_path = Path(self.data_dir / value)
+                        inputs[key] = (
+                            self._file_hash(input_path)
+                            if input_path.is_file()
+                            else content_hash(value)
+                        )
+
+            self._cell_hashes[qry["index"]] = {
+                "source": (
+                    content_hash(
+                        {
+                            path.name: self._file_hash(path)
+                            for path in self._shard_paths(qry)
+                        }
+                    )
+                    if self._shard_paths(qry) is not None
+                    else self._file_hash(self._source_path(qry))
+                ),
+                "inputs": inputs,
+            }
+            if self._types_csv(qry):
+                # Typed and untyped loads give different relations
+                self._cell_hashes[qry["index"]]["csv_types"] = True
+
+        return self._cell_hashes[qry["index"]]
+
+    def _complete_cell(
+        self,
+        qry: dict,
+        query_name: str,
+        result: Any,
+        logger: Union[SequenceLogger, BufferedLogger],
+    ) -> None:
+        """Write the result of a cell and record its metrics, then record the cell
+        in the checkpoint if it succeeded"""
+        metrics = self._metrics.pop(qry["index"])
+        result_path = log_result(
+            result,
+            qry["index"],
+            query_name,
+            logger,
+            self.result_compression,
+            self._result_format(qry),
+            metrics,
+        )
+
+        metrics.succeeded = transaction_succeeded(result)
+        if self.timing_store and metrics.succeeded and not metrics.cached:
+            self.timing_store.record(self._timing_key(qry), metrics.seconds())
+            self.timing_store.record(
+                self._timing_key(qry, remote=True), metrics.phases["remote"]
+            )
+        self._metrics_recorder.record_cell(self.schema.toml_path, metrics)
+        logger.info(f"{qry['index']}: {metrics.summary()}", fields=asdict(metrics))
+
+        if metrics.succeeded:
+            self._checkpoint.record(
+                self.schema.toml_path,
+                {
+                    "index": qry["index"],
+                    "name": query_name,
+                    "hashes": self._hashes(qry),
+                    "result_path": str(result_path) if result_path else None,
+                },
+            )
+
+        if self._handles:
+            for file_path in self._cell_files(qry):
+                self._handles.release(file_path)
+
+    def _result_format(self, qry: dict) -> str:
+        """Return the format of a cell's result files: the cell's `result_format`, else
+        `Sequence.result_format`, else the TOML file's `result_format`, else "json"."""
+        return (
+            qry.get("result_format")
+            or self.result_format
+            or self.schema.get_or("result_format", "json")
+        )
+
+    def _cache_key(self, qry: dict, source: str, inputs: Union[None, dict]) -> str:
+        """Return the `ResultCache` key of a readonly cell, or `None` when an
+        earlier write has yet to run (so the state of the database is unknown)"""
+        earlier_writes = [idx for idx in self._write_indices if idx < qry["index"]]
+        if any(idx not in self._write_hashes for idx in earlier_writes):
+            return None
+
+        return ResultCache.key(
+            self.database, source, inputs, self._fingerprint(earlier_writes)
+        )
+
+    def _fingerprint(self, write_indices: List[int]) -> str:
+        """Return the fingerprint of the database once the write cells at
+        `write_indices` have succeeded: the one recorded by the last run that
+        wrote to it when there are none, else a hash of those cells alone"""
+        if not write_indices:
+            return self._base_fingerprint
+
+        return content_hash([self._write_hashes[idx] for idx in write_indices])
+
+    def _cached_result(
+        self,
+        qry: dict,
+        source: str,
+        inputs: Union[None, dict],
+        logger: Union[SequenceLogger, BufferedLogger],
+    ) -> Tuple[Union[None, str], Any]:
+        """Return the `ResultCache` key of a readonly cell, and its cached result (or `None`)"""
+        if not self.result_cache:
+            return None, None
+
+        with self._metrics[qry["index"]].phase("prepare"):
+            cache_key = self._cache_key(qry, source, inputs)
+            cached = self.result_cache.get(cache_key) if cache_key else None
+
+        if cached is not None:
+            logger.info("Result found in cache, skipping query...")
+            self._metrics[qry["index"]].cached = True
+
+        return cache_key, cached
+
+    def _cell_groups(self) -> List[List[dict]]:
+        """Partition `schema.query` into groups of cells executed as one transaction"""
+        batch_types = (["INSTALL"] if self.batch_installs else []) + (
+            ["QUERY"] if self.batch_queries else []
+        )
+        return group_adjacent_cells(
+            self.schema.get("queries"), batch_types, self.max_batch_size
+        )
+
+    def _dependency_graph(
+        self,
+    ) -> Tuple[Dict[int, List[dict]], Dict[int, Set[int]]]:
+        """Return the groups of cells from `_cell_groups`, by the index of their first
+        cell, and the indices of the groups each group depends on"""
+        groups = {group[0]["index"]: group for group in self._cell_groups()}
+        dependencies = group_dependencies(
+            cell_dependencies([qry for group in groups.values() for qry in group]),
+            [[qry["index"] for qry in group] for group in groups.values()],
+        )
+        return groups, dependencies
+
+    def _cell_estimates(
+        self, cells: List[dict], remote: bool = False
+    ) -> Dict[int, float]:
+        """Return the estimated duration (or, if `remote`, time spent in remote
+        calls) of each cell with durations in `timing_store`"""
+        cell_hashes = {}
+        for qry in cells:
+            try:
+                cell_hashes[qry["index"]] = self._timing_key(qry, remote)
+            except FileNotFoundError:
+                continue
+
+        estimates = self.timing_store.estimates(cell_hashes.values())
+        return {
+            index: estimates[cell_hash]
+            for index, cell_hash in cell_hashes.items()
+            if cell_hash in estimates
+        }
+
+    def _group_durations(
+        self, groups: Dict[int, List[dict]], estimates: Dict[int, float]
+    ) -> Dict[int, float]:
+        """Return the estimated duration of each group of cells. Cells without
+        `estimates` are assumed to take the median of those with them."""
+        default = median(estimates.values()) if estimates else 0.0
+
+        # Cells batched into one transaction each record the whole transaction
+        return {
+            index: max(estimates.get(qry["index"], default) for qry in group)
+            for index, group in groups.items()
+        }
+
+    def _timing_key(self, qry: dict, remote: bool = False) -> str:
+        """Return the key of a cell's duration (or, if `remote`, time spent in
+        remote calls) in `timing_store`"""
+        if remote:
+            return content_hash("remote", qry["type"].upper(), self._hashes(qry))
+
+        return content_hash(qry["type"].upper(), self._hashes(qry))
+
+    def plan(self) -> dict:
+        """Predict how long `exec` will take from the durations in `timing_store`,
+        without executing anything. Returns the number of cells (and of those
+        with recorded durations), and the predicted run time when run one cell
+        at a time, along the longest chain of dependent cells, and with `max_workers`.
+        """
+        if not self.timing_store:
+            exit("EXECUTION STOPPED: `timing_store` must be set to plan a run")
+
+        self._cell_hashes = {}
+        groups, dependencies = self._dependency_graph()
+        cells = [qry for group in groups.values() for qry in group]
+        estimates = self._cell_estimates(cells)
+        durations = self._group_durations(groups, estimates)
+        priorities = critical_path_lengths(dependencies, durations)
+
+        return {
+            "cells": len(cells),
+            "estimated_cells": len(estimates),
+            "sequential_seconds": sum(durations.values()),
+            "critical_path_seconds": max(priorities.values(), default=0.0),
+            "predicted_seconds": simulate_schedule(
+                dependencies, durations, max(self.max_workers, 1), priorities
+            ),
+        }
+
+    def _exec_parallel(self) -> None:
+        """Execute cells in `schema.query` concurrently, respecting their dependencies.
+        With a `timing_store`, cells heading the longest (estimated) chains of
+        dependent cells start first."""
+        groups, dependencies = self._dependency_graph()
+        queries = {qry["index"]: qry for group in groups.values() for qry in group}
+
+        priorities = None
+        if self.timing_store:
+            priorities = critical_path_lengths(
+                dependencies,
+                self._group_durations(
+                    groups, self._cell_estimates(list(queries.values()))
+                ),
+            )
+
+        self.sequence_logger.info(
+            f"Executing {len(queries)} cells using (up to) {self.max_workers} workers"
+        )
+
+        loggers = {index: BufferedLogger(self.sequence_logger) for index in queries}
+        pending_flush = sorted(queries)
+        completed = set()
+
+        def flush_completed(index: int) -> None:
+            # Flush logs of completed cells in `index` order
+            completed.update(qry["index"] for qry in groups[index])
+            while pending_flush and pending_flush[0] in completed:
+                loggers[pending_flush.pop(0)].flush()
+
+        try:
+            run_dependency_graph(
+                dependencies,
+                lambda index: self._exec_group(
+                    groups[index], [loggers[qry["index"]] for qry in groups[index]]
+                ),
+                self.max_workers,
+                flush_completed,
+                priorities,
+            )
+        finally:
+            # Flush anything left behind by a failed or incomplete run
+            for index in pending_flush:
+                loggers[index].flush()
+
+    def _exec_group(
+        self, cells: List[dict], loggers: List[Union[SequenceLogger, BufferedLogger]]
+    ) -> None:
+        """Execute a group of cells from `_cell_groups`, writing messages for each cell to its logger"""
+        for qry, logger in zip(cells, loggers):
+            if qry["index"] in self._skipped:
+                entry = self._checkpoint.get(self.schema.toml_path, qry["index"])
+                logger.info(
+                    f"{qry['index']}: {entry['name']} ({qry['type'].upper()}) unchanged since checkpoint, skipping (result: '{entry['result_path']}')",
+                    fields={
+                        "index": qry["index"],
+                        "name": entry["name"],
+                        "type": qry["type"].upper(),
+                        "skipped": True,
+                    },
                 )
 
-                inputs = {
-                    key: open_file(Path(self.data_dir / value))
-                    if Path(self.data_dir / value).is_file()
-                    else value
-                    for entry in qry["inputs"]
-                    for key, value in entry.items()
-                }
-
-            # Variable to hold results of query operation
-            result = None
-
-            query_type_uppercase = qry["type"].upper()
-
-            # Dispatch based on query type
-            if query_type_uppercase in ["QUERY", "UPDATE"]:
-                self.sequence_logger.info(f"Running {qry['type']}...")
-                result = api.exec(
-                    self.context,
-                    self.database,
-                    self.engine,
+        loggers = [
+            logger
+            for qry, logger in zip(cells, loggers)
+            if qry["index"] not in self._skipped
+        ]
+        cells = [qry for qry in cells if qry["index"] not in self._skipped]
+
+        if not cells:
+            return
+        elif len(cells) > 1 and cells[0]["type"].upper() == "INSTALL":
+            self._exec_install_batch(cells, loggers)
+        elif len(cells) > 1 and cells[0]["type"].upper() == "QUERY":
+            self._exec_query_batch(cells, loggers)
+        else:
+            for qry, logger in zip(cells, loggers):
+                self._exec_cell(qry, logger)
+
+    def _cell_files(self, qry: dict) -> List[Path]:
+        """Return the paths of the files a cell reads whole, its source (unless
+        sharded or streamed) and any `inputs` that may be files"""
+        file_paths = []
+        if (
+            self._shard_paths(qry) is None
+            and not self._streams_data(qry)
+            and not self._loads_delta(qry)
+        ):
+            file_paths.append(self._source_path(qry))
+
+        if cell_has_inputs(qry):
+            file_paths.extend(
+                Path(self.data_dir / value)
+                for entry in qry["inputs"]
+                for value in entry.values()
+            )
+
+        return file_paths
+
+    def _file_hash(self, file_path: Path) -> str:
+        """Return the hash of the file at `file_path`, from `file_cache` if set"""
+        if self.file_cache:
+            return self.file_cache.hash(file_path)
+        elif self._handles:
+            return self._handles.hash(file_path)
+
+        return file_hash(file_path)
+
+    def _read_file(self, file_path: Path) -> str:
+        """Return the contents of the file at `file_path`, prefetched if possible"""
+        if self._prefetcher:
+            return self._prefetcher.get(file_path)
+        elif self.file_cache:
+            return self.file_cache.read(file_path)
+        elif self._handles:
+            return self._handles.read(file_path)
+
+        return open_file(file_path)
+
+    def _source_path(self, qry: dict) -> Path:
+        """Return the path of a cell's source file"""
+        if qry["type"] == "data" and ("inputs" not in qry):
+            return Path(self.data_dir / qry["file_path"])
+        else:
+            return Path(self.source_dir / qry["file_path"])
+
+    def _shard_paths(self, qry: dict) -> Union[None, List[Path]]:
+        """Return the files matched by a DATA cell whose `file_path` is a glob pattern,
+        or `None` for every other cell"""
+        if (
+            qry["type"].upper() != "DATA"
+            or cell_has_inputs(qry)
+            or not is_glob_pattern(qry["file_path"])
+        ):
+            return None
+
+        return sorted(self.data_dir.glob(qry["file_path"]))
+
+    def _loads_delta(self, qry: dict) -> bool:
+        """Return whether or not a cell loads only the changes to a data file (see
+        `delta_snapshots`)"""
+        return (
+            self.delta_snapshots is not None
+            and qry["type"].upper() == "DATA"
+            and not qry.get("chunked", False)
+            and not cell_has_inputs(qry)
+            and not is_glob_pattern(qry["file_path"])
+            and Path(qry["file_path"]).suffix in [".csv", ".json"]
+        )
+
+    def _types_csv(self, qry: dict) -> bool:
+        """Return whether or not a cell loads CSV files with inferred column types
+        (see `infer_csv_types`)"""
+        return (
+            self.infer_csv_types
+            and qry["type"].upper() == "DATA"
+            and not cell_has_inputs(qry)
+            and Path(qry["file_path"]).suffix == ".csv"
+        )
+
+    def _csv_schema(
+        self, qry: dict, logger: Union[SequenceLogger, BufferedLogger]
+    ) -> Union[None, Dict[str, str]]:
+        """Return the column types of the CSV file(s) loaded by a cell, from its
+        first file, or `None` if not inferred"""
+        if not self._types_csv(qry):
+            return None
+
+        shard_paths = self._shard_paths(qry)
+        data_path = shard_paths[0] if shard_paths else self._source_path(qry)
+        if self.cache_csv_schemas:
+            schema = cached_csv_schema(
+                data_path,
+                Path(self.log_dir() / CSV_SCHEMAS_DIR_NAME),
+                self.csv_sample_rows,
+            )
+        else:
+            schema = infer_csv_schema(data_path, self.csv_sample_rows)
+
+        if not schema_config(schema):
+            logger.warn(
+                f"Columns of '{data_path}' are not all Rel symbols, loading as strings..."
+            )
+            return None
+
+        logger.info(
+            f"Inferred column types of '{data_path}'",
+            fields={"csv_schema": schema},
+        )
+        return schema
+
+    def _streams_data(self, qry: dict) -> bool:
+        """Return whether or not a cell loads its data file in chunks of
+        `chunk_bytes`, i.e. sets `chunked = true`"""
+        return qry["type"].upper() == "DATA" and qry.get("chunked", False)
+
+    def _load_cell(
+        self, qry: dict, logger: Union[SequenceLogger, BufferedLogger]
+    ) -> Tuple[str, Path, str, Union[None, dict]]:
+        """Return the sanitized name, source path, source, and `inputs` of a cell"""
+        # Generate a 'sanitized' name for query
+        query_name = sanitize_query_name(qry)
+
+        logger.info(
+            f"{qry['index']}: {query_name} ({qry['type'].upper()})",
+            fields={
+                "index": qry["index"],
+                "name": query_name,
+                "type": qry["type"].upper(),
+            },
+        )
+
+        metrics = self._metrics.setdefault(
+            qry["index"], CellMetrics(qry["index"], query_name, qry["type"].upper())
+        )
+        source_path = self._source_path(qry)
+
+        if self._prefetcher:
+            # Start reading the files of upcoming cells
+            position = self._positions[qry["index"]]
+            self._prefetcher.prefetch(
+                file_path
+                for upcoming in self._ordered_cells[
+                    position + 1 : position + 1 + self.prefetch_depth
+                ]
+                if upcoming["index"] not in self._skipped
+                for file_path in self._cell_files(upcoming)
+            )
+
+        if self._shard_paths(qry) is not None:
+            # Read shard-by-shard at execution time
+            if not self._shard_paths(qry):
+                logger.err(f"No files match '{source_path}', exiting")
+                exit()
+
+            source = None
+            metrics.bytes_read += sum(
+                path.stat().st_size for path in self._shard_paths(qry)
+            )
+        elif self._streams_data(qry) or self._loads_delta(qry):
+            # Read chunk-by-chunk (or row-by-row) at execution time
+            if not source_path.is_file():
+                logger.err(f"'{source_path}' not found, exiting")
+                exit()
+
+            source = None
+            metrics.bytes_read += source_path.stat().st_size
+        else:
+            logger.info(f"Attempting to load '{source_path}'")
+            try:
+                with metrics.phase("read"):
+                    source = self._read_file(source_path)
+            except FileNotFoundError:
+                logger.err(f"'{source_path}' not found, exiting")
+                exit()
+
+            metrics.bytes_read += source_path.stat().st_size
+
+        inputs = None
+        if cell_has_inputs(qry):
+            logger.info("Create 'inputs' dictionary (as necessary)...")
+
+            inputs = {}
+            with metrics.phase("read"):
+                for entry in qry["inputs"]:
+                    for key, value in entry.items():
+                        input_path = Path(self.data_dir / value)
+                        try:
+                            inputs[key] = self._read_file(input_path)
+                        except (
+                            FileNotFoundError,
+                            IsADirectoryError,
+                            NotADirectoryError,
+                        ):
+                            # Not a file, use value as is
+                            inputs[key] = value
+                            continue
+
+                        metrics.bytes_read += input_path.stat().st_size
+
+        return query_name, source_path, source, inputs
+
+    def _exec_cell(
+        self, qry: dict, logger: Union[SequenceLogger, BufferedLogger]
+    ) -> None:
+        """Execute a single cell of `schema.query`, writing messages to `logger`"""
+        query_name, source_path, source, inputs = self._load_cell(qry, logger)
+        metrics = self._metrics[qry["index"]]
+
+        # Variable to hold results of query operation
+        result = None
+
+        query_type_uppercase = qry["type"].upper()
+
+        cache_key = None
+        if query_type_uppercase == "QUERY":
+            cache_key, result = self._cached_result(qry, source, inputs, logger)
+            if result is not None:
+                self._complete_cell(qry, query_name, result, logger)
+                return
+
+        # Dispatch based on query type
+        if query_type_uppercase in ["QUERY", "UPDATE"]:
+            metrics.bytes_uploaded += payload_bytes(source, inputs)
+            result = self._run_query(qry, source, logger, inputs, cache_key)
+        elif query_type_uppercase == "INSTALL":
+            logger.info("Bundling model(s)...")
+            with metrics.phase("prepare"):
+                model = {}
+                model[model_name(source_path)] = source
+
+            metrics.bytes_uploaded += payload_bytes(source, None)
+            result = self._run_install(qry, model, logger)
+        elif query_type_uppercase == "DATA":
+            logger.info(f"Loading data...")
+            file_path_suffix = Path(qry["file_path"]).suffix
+            # Files streamed in chunks or shards are read as they are uploaded
+            if not self._loads_delta(qry):
+                metrics.bytes_uploaded += (
+                    payload_bytes(source, inputs)
+                    if source is not None
+                    else metrics.bytes_read
+                )
+
+            with metrics.phase("prepare"):
+                csv_schema = self._csv_schema(qry, logger)
+
+            def load(engine: str) -> Any:
+                if self._loads_delta(qry):
+                    return delta_data_query(
+                        self.context,
+                        self.database,
+                        engine,
+                        source_path,
+                        query_name,
+                        logger,
+                        file_path_suffix,
+                        self.delta_snapshots,
+                        self.delta_max_change_ratio,
+                        csv_schema,
+                    )
+                elif self._shard_paths(qry) is not None:
+                    return sharded_data_query(
+                        self.context,
+                        self.database,
+                        engine,
+                        self._shard_paths(qry),
+                        query_name,
+                        logger,
+                        file_path_suffix,
+                        self.max_uploads,
+                        csv_schema,
+                    )
+                elif self._streams_data(qry):
+                    return chunked_data_query(
+                        self.context,
+                        self.database,
+                        engine,
+                        source_path,
+                        query_name,
+                        logger,
+                        file_path_suffix,
+                        self.chunk_bytes,
+                        self.max_uploads,
+                        csv_schema,
+                    )
+                else:
+                    return data_query(
+                        self.context,
+                        self.database,
+                        engine,
+                        inputs,
+                        source,
+                        query_name,
+                        logger,
+                        (
+                            file_path_suffix
+                            if (file_path_suffix in [".csv", ".json"])
+                            else None
+                        ),
+                        csv_schema,
+                    )
+
+            start = perf_counter()
+            metrics.engine, result = self._remote([qry], logger, load)
+            metrics.add("remote", perf_counter() - start)
+
+            if self._loads_delta(qry):
+                metrics.bytes_uploaded += result["delta"]["bytes_uploaded"]
+        else:
+            logger.warn(f"Query type {qry['type']} not recognized, skipping...")
+
+        if is_write_cell(qry) and transaction_succeeded(result):
+            self._write_hashes[qry["index"]] = content_hash(
+                query_type_uppercase, self._hashes(qry)
+            )
+
+        self._complete_cell(qry, query_name, result, logger)
+
+    def _exec_install_batch(
+        self, cells: List[dict], loggers: List[Union[SequenceLogger, BufferedLogger]]
+    ) -> None:
+        """Install the models of several INSTALL cells in a single transaction"""
+        from railib import api
+
+        query_names = []
+        models = {}
+
+        for qry, logger in zip(cells, loggers):
+            query_name, source_path, source, _ = self._load_cell(qry, logger)
+            query_names.append(query_name)
+            models[model_name(source_path)] = source
+            self._metrics[qry["index"]].bytes_uploaded += payload_bytes(source, None)
+
+            logger.info("Bundling model(s)...")
+
+        indices = [qry["index"] for qry in cells]
+        loggers[-1].info(f"Installing {len(models)} model(s) from cells {indices}...")
+        start = perf_counter()
+        engine, result = self._remote(
+            cells,
+            loggers[-1],
+            lambda engine: api.install_model(
+                self.context, self.database, engine, models
+            ),
+        )
+        self._add_batch_remote(cells, engine, perf_counter() - start)
+
+        if not transaction_succeeded(result):
+            loggers[-1].warn(
+                f"Batched install for cells {indices} failed, installing models one at a time..."
+            )
+            # Install the sources already loaded, rather than loading each cell again
+            for (name, source), qry, query_name, logger in zip(
+                models.items(), cells, query_names, loggers
+            ):
+                result = self._run_install(qry, {name: source}, logger)
+                if transaction_succeeded(result):
+                    self._write_hashes[qry["index"]] = content_hash(
+                        "INSTALL", self._hashes(qry)
+                    )
+                self._complete_cell(qry, query_name, result, logger)
+            return
+
+        for position, (qry, query_name, logger) in enumerate(
+            zip(cells, query_names, loggers)
+        ):
+            self._write_hashes[qry["index"]] = content_hash(
+                "INSTALL", self._hashes(qry)
+            )
+            self._complete_cell(
+                qry, query_name, split_install_result(result, position), logger
+            )
+
+    def _exec_query_batch(
+        self, cells: List[dict], loggers: List[Union[SequenceLogger, BufferedLogger]]
+    ) -> None:
+        """Run several readonly QUERY cells as a single transaction, falling back to
+        one transaction per cell when the combined transaction reports an error"""
+
+        query_names = []
+        sources = {}
+        cache_keys = {}
+
+        for qry, logger in zip(cells, loggers):
+            query_name, _, source, _ = self._load_cell(qry, logger)
+
+            cache_key, cached = self._cached_result(qry, source, None, logger)
+            if cached is not None:
+                self._complete_cell(qry, query_name, cached, logger)
+                continue
+
+            query_names.append(query_name)
+            sources[cell_namespace(qry["index"])] = source
+            cache_keys[qry["index"]] = cache_key
+            self._metrics[qry["index"]].bytes_uploaded += payload_bytes(source, None)
+
+        # Drop cells served from the cache
+        loggers = [
+            logger for qry, logger in zip(cells, loggers) if qry["index"] in cache_keys
+        ]
+        cells = [qry for qry in cells if qry["index"] in cache_keys]
+        if not cells:
+            return
+
+        indices = [qry["index"] for qry in cells]
+        loggers[-1].info(f"Running {len(cells)} queries from cells {indices}...")
+        start = perf_counter()
+        engine, result = self._remote(
+            cells,
+            loggers[-1],
+            lambda engine: self._exec(
+                engine, combine_query_sources(sources), readonly=True
+            ),
+            readonly=True,
+        )
+        self._add_batch_remote(cells, engine, perf_counter() - start)
+
+        if not transaction_succeeded(result):
+            loggers[-1].warn(
+                f"Batched transaction for cells {indices} failed, running cells one at a time..."
+            )
+            # Run the sources already loaded, rather than loading each cell again
+            for qry, query_name, logger in zip(cells, query_names, loggers):
+                result = self._run_query(
+                    qry,
+                    sources[cell_namespace(qry["index"])],
+                    logger,
+                    cache_key=cache_keys[qry["index"]],
+                )
+                self._complete_cell(qry, query_name, result, logger)
+            return
+
+        for qry, query_name, logger in zip(cells, query_names, loggers):
+            cell_result = split_query_result(result, cell_namespace(qry["index"]))
+
+            if cache_keys[qry["index"]]:
+                self.result_cache.put(cache_keys[qry["index"]], cell_result)
+
+            self._complete_cell(qry, query_name, cell_result, logger)
+
+    def _run_install(
+        self, qry: dict, models: dict, logger: Union[SequenceLogger, BufferedLogger]
+    ) -> dict:
+        """Return the result of installing the loaded `models` of an INSTALL cell"""
+        from railib import api
+
+        logger.info("Installing model(s)...")
+        metrics = self._metrics[qry["index"]]
+        with metrics.phase("remote"):
+            metrics.engine, result = self._remote(
+                [qry],
+                logger,
+                lambda engine: api.install_model(
+                    self.context, self.database, engine, models
+                ),
+            )
+
+        return result
+
+    def _run_query(
+        self,
+        qry: dict,
+        source: str,
+        logger: Union[SequenceLogger, BufferedLogger],
+        inputs: dict = None,
+        cache_key: str = None,
+    ) -> Any:
+        """Return the result of running the loaded `source` of a QUERY or UPDATE
+        cell, caching it under `cache_key` (if any) when it succeeds"""
+        query_type_uppercase = qry["type"].upper()
+
+        logger.info(f"Running {qry['type']}...")
+        metrics = self._metrics[qry["index"]]
+        with metrics.phase("remote"):
+            metrics.engine, result = self._remote(
+                [qry],
+                logger,
+                lambda engine: self._exec(
+                    engine,
                     source,
                     inputs=inputs,
                     # "UPDATE" != "UPDATE" => `False`
                     readonly=(query_type_uppercase != "UPDATE"),
+                ),
+                readonly=(query_type_uppercase == "QUERY"),
+            )
+
+        if cache_key and transaction_succeeded(result):
+            self.result_cache.put(cache_key, result)
+
+        return result
+
+    def _exec(
+        self,
+        engine: str,
+        command: str,
+        inputs: dict = None,
+        readonly: bool = True,
+    ) -> api.TransactionAsyncResponse:
+        """Run `command` with `api.exec`, or `result_spill.spilled_exec` when
+        `result_memory_bytes` is set"""
+        if self.result_memory_bytes is not None:
+            return spilled_exec(
+                self.context,
+                self.database,
+                engine,
+                command,
+                inputs=inputs,
+                readonly=readonly,
+                memory_bytes=self.result_memory_bytes,
+                spill_dir=self.result_spill_dir,
+            )
+
+        from railib import api
+
+        return api.exec(
+            self.context,
+            self.database,
+            engine,
+            command,
+            inputs=inputs,
+            readonly=readonly,
+        )
+
+    def _remote(
+        self,
+        cells: List[dict],
+        logger: Union[SequenceLogger, BufferedLogger],
+        call: Callable[[str], Any],
+        readonly: bool = False,
+    ) -> Tuple[str, Any]:
+        """Return the engine used by, and result of, `call(engine)` for the
+        transaction of `cells`, retrying, timing out, and hedging it as the
+        `retry_policies` of their type allow"""
+        cell_type = cells[0]["type"].upper()
+
+        def attempt() -> Tuple[str, Any]:
+            with self._engines.acquire(readonly=readonly) as engine:
+                return engine, call(engine)
+
+        policy = (self.retry_policies or {}).get(cell_type)
+        if policy and any(
+            is_write_cell(qry) and not qry.get("idempotent", False) for qry in cells
+        ):
+            # Writes are never retried unless marked idempotent
+            policy = None
+
+        start = perf_counter()
+        if not policy:
+            engine, result = attempt()
+        else:
+            timeout = None
+            # Abandoned attempts keep running, so writes never time out
+            if policy.timeout_multiplier and self.timing_store and readonly:
+                estimates = self._cell_estimates(cells, remote=True)
+                # Batched cells each record the whole transaction
+                if len(estimates) == len(cells):
+                    timeout = policy.timeout(max(estimates.values()))
+
+            hedge_after = None
+            if policy.hedge_percentile and readonly and cell_type == "QUERY":
+                hedge_after = self._latencies.percentile(
+                    cell_type, policy.hedge_percentile
                 )
-            elif query_type_uppercase == "INSTALL":
-                self.sequence_logger.info("Bundling model(s)...")
-                model = {}
-                model[f"{source_path.name.replace('.rel', '')}"] = source
 
-                self.sequence_logger.info("Installing model(s)...")
-                result = api.install_model(
-                    self.context, self.database, self.engine, model
+            attempts = {"count": 1}
+
+            def on_retry(number: int, exc: BaseException, delay: float) -> None:
+                attempts["count"] = number
+                logger.warn(
+                    f"Attempt {number - 1} of {policy.max_attempts} failed with {exc!r}, retrying in {delay:.2f}s...",
+                    fields={"attempt": number - 1, "error": repr(exc), "delay": delay},
                 )
-            elif query_type_uppercase == "DATA":
-                self.sequence_logger.info(f"Loading data...")
-                file_path_suffix = Path(qry["file_path"]).suffix
-
-                result = data_query(
-                    self.context,
-                    self.database,
-                    self.engine,
-                    inputs,
-                    source,
-                    query_name,
-                    self.sequence_logger,
-                    (
-                        file_path_suffix
-                        if (file_path_suffix in [".csv", ".json"])
-                        else None
-                    ),
+
+            def on_hedge() -> None:
+                for qry in cells:
+                    self._metrics[qry["index"]].hedged = True
+                logger.info(
+                    f"No response after {hedge_after:.3f}s, sending a hedged request...",
+                    fields={"hedge_after": hedge_after},
                 )
-            else:
-                self.sequence_logger.warn(
-                    f"Query type {qry['type']} not recognized, skipping..."
+
+            try:
+                engine, result = call_with_retries(
+                    attempt, policy, timeout, hedge_after, on_retry, on_hedge
                 )
+            finally:
+                for qry in cells:
+                    self._metrics[qry["index"]].attempts = attempts["count"]
+
+        self._latencies.record(cell_type, perf_counter() - start)
+        return engine, result
 
-            log_result(result, qry["index"], query_name, self.sequence_logger)
+    def _add_batch_remote(self, cells: List[dict], engine: str, seconds: float) -> None:
+        """Record the engine and `remote` time of a transaction shared by several cells"""
+        for qry in cells:
+            self._metrics[qry["index"]].add("remote", seconds)
+            self._metrics[qry["index"]].batch_size = len(cells)
+            self._metrics[qry["index"]].engine = engine
 
     def log_dir(self) -> Path:
         """Accessor function for `SequenceLogger.log_output_dir`"""
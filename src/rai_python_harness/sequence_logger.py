@@ -1,26 +1,46 @@
 from __future__ import annotations
 
+from atexit import register, unregister
 from dataclasses import dataclass, field
 from logging import Logger
+from logging.handlers import QueueListener
 from pathlib import Path
-from typing import ClassVar
+from sys import exc_info as current_exc_info
+from typing import ClassVar, List, Tuple
 
-from rai_python_harness.utils import formatted_time_now, init_logger
+from rai_python_harness.utils import (
+    close_logger,
+    formatted_time_now,
+    init_background_logger,
+    init_logger,
+)
 
 
 @dataclass
 class SequenceLogger:
+    """Writes log messages to `{time}.log` in `log_output_dir`.
+
+    With `structured`, every message is also written as a line of JSON to
+    `{time}.jsonl`, along with the `fields` passed to `info`, `warn`, and `err`.
+    With `background`, messages are queued and written in batches by a
+    background thread, so callers never wait on file I/O. Call `close()` once
+    done with a logger to stop the thread and close its files.
+    """
+
     _log_output_dir: Path
+    background: bool = False
+    structured: bool = False
     log_file_path: Path = field(init=False)
+    structured_log_path: Path = field(init=False, default=None)
     logger: Logger = field(init=False)
+    _listener: QueueListener = field(init=False, default=None)
 
     def __post_init__(self) -> None:
         if not self._log_output_dir.is_dir():
             exit(f"EXECUTION STOPPED: '{self.log_output_dir}' is not a directory")
 
         self.log_output_dir = self._log_output_dir
-        self.log_file_path = Path(self.log_output_dir / f"{formatted_time_now()}.log")
-        self.logger = init_logger(self.log_file_path)
+        self._init_logger()
 
     @property
     def log_output_dir(self) -> Path:
@@ -30,19 +50,97 @@ class SequenceLogger:
     def log_output_dir(self, path: Path) -> None:
         self._log_output_dir = path
 
-    def err(self, msg: str, exc_info: bool = True) -> None:
+    def close(self) -> None:
+        """Write any queued messages, then close the files of the current `logging.Logger`"""
+        if self._listener:
+            unregister(self.close)
+
+        close_logger(self.logger, self._listener)
+        self._listener = None
+
+    def err(self, msg: str, exc_info: bool = True, fields: dict = None) -> None:
         """Log error message"""
-        self.logger.error(msg, exc_info=exc_info)
+        self.logger.error(msg, exc_info=exc_info, extra={"fields": fields})
 
-    def info(self, msg: str, exc_info: bool = False) -> None:
+    def info(self, msg: str, exc_info: bool = False, fields: dict = None) -> None:
         """Log information message"""
-        self.logger.info(msg, exc_info=exc_info)
+        self.logger.info(msg, exc_info=exc_info, extra={"fields": fields})
 
     def refresh_log_file_path(self) -> None:
-        """Creates new `logging.Logger` with `log_file_path` set to (approximate) current time"""
-        self.log_file_path = Path(self.log_output_dir / f"{formatted_time_now()}.log")
-        self.logger = init_logger(self.log_file_path)
+        """Creates new `logging.Logger` with `log_file_path` set to (approximate) current time,
+        closing the previous one"""
+        self.close()
+        self._init_logger()
 
-    def warn(self, msg: str, exc_info: bool = False) -> None:
+    def warn(self, msg: str, exc_info: bool = False, fields: dict = None) -> None:
         """Log warning message"""
-        self.logger.warning(msg, exc_info=exc_info)
+        self.logger.warning(msg, exc_info=exc_info, extra={"fields": fields})
+
+    def _init_logger(self) -> None:
+        time_now = formatted_time_now()
+        self.log_file_path = Path(self.log_output_dir / f"{time_now}.log")
+        self.structured_log_path = (
+            Path(self.log_output_dir / f"{time_now}.jsonl") if self.structured else None
+        )
+
+        if self.background:
+            self.logger, self._listener = init_background_logger(
+                self.log_file_path, self.structured_log_path
+            )
+            # Write queued messages before the interpreter exits
+            register(self.close)
+        else:
+            self.logger = init_logger(self.log_file_path, self.structured_log_path)
+
+
+@dataclass
+class BufferedLogger:
+    """Holds messages for a single cell, then writes them to `sequence_logger`
+    on `flush()` so cells executed concurrently produce contiguous log entries."""
+
+    sequence_logger: SequenceLogger
+    records: List[Tuple] = field(default_factory=list)
+
+    @property
+    def log_output_dir(self) -> Path:
+        return self.sequence_logger.log_output_dir
+
+    def err(self, msg: str, exc_info: bool = True, fields: dict = None) -> None:
+        """Buffer error message"""
+        self.records.append(
+            (
+                self.sequence_logger.err,
+                msg,
+                current_exc_info() if exc_info else False,
+                fields,
+            )
+        )
+
+    def flush(self) -> None:
+        """Write buffered messages to `sequence_logger`"""
+        for log_fn, msg, exc_info, fields in self.records:
+            log_fn(msg, exc_info=exc_info, fields=fields)
+
+        self.records = []
+
+    def info(self, msg: str, exc_info: bool = False, fields: dict = None) -> None:
+        """Buffer information message"""
+        self.records.append(
+            (
+                self.sequence_logger.info,
+                msg,
+                current_exc_info() if exc_info else False,
+                fields,
+            )
+        )
+
+    def warn(self, msg: str, exc_info: bool = False, fields: dict = None) -> None:
+        """Buffer warning message"""
+        self.records.append(
+            (
+                self.sequence_logger.warn,
+                msg,
+                current_exc_info() if exc_info else False,
+                fields,
+            )
+        )
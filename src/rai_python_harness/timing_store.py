@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from sqlite3 import Connection, connect
+from statistics import median
+from threading import Lock
+from time import time
+from typing import Dict, Iterable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cell_timings (
+    cell_hash TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cell_timings_by_hash ON cell_timings (cell_hash, recorded_at);
+"""
+
+
+@dataclass
+class TimingStore:
+    """SQLite database, at `db_path`, of how long cells took to run, keyed by a
+    hash of each cell's type, source, and `inputs` (so an edited cell starts
+    afresh). A cell's estimated duration is the median of its last `window`
+    recorded durations. May be shared by several `Sequence`s and processes.
+    """
+
+    db_path: Path
+    window: int = 5
+    _connection: Connection = field(init=False)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __post_init__(self) -> None:
+        self._connection = connect(
+            str(self.db_path), check_same_thread=False, timeout=30
+        )
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the connection to the database"""
+        with self._lock:
+            self._connection.close()
+
+    def estimates(self, cell_hashes: Iterable[str]) -> Dict[str, float]:
+        """Return the estimated duration, in seconds, of each cell in `cell_hashes`
+        that has been recorded before"""
+        estimates = {}
+
+        with self._lock:
+            for cell_hash in set(cell_hashes):
+                rows = self._connection.execute(
+                    "SELECT seconds FROM cell_timings WHERE cell_hash = ? ORDER BY recorded_at DESC LIMIT ?",
+                    (cell_hash, self.window),
+                ).fetchall()
+
+                if rows:
+                    estimates[cell_hash] = median(row[0] for row in rows)
+
+        return estimates
+
+    def record(self, cell_hash: str, seconds: float) -> None:
+        """Record that the cell identified by `cell_hash` took `seconds` to run"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO cell_timings (cell_hash, seconds, recorded_at) VALUES (?, ?, ?)",
+                (cell_hash, seconds, time()),
+            )
+            # Only the last `window` durations are ever used
+            self._connection.execute(
+                "DELETE FROM cell_timings WHERE cell_hash = ? AND rowid NOT IN (SELECT rowid FROM cell_timings WHERE cell_hash = ? ORDER BY recorded_at DESC LIMIT ?)",
+                (cell_hash, cell_hash, self.window),
+            )
@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from gzip import compress as gzip_compress
+from http.client import (
+    BadStatusLine,
+    HTTPConnection,
+    HTTPMessage,
+    HTTPSConnection,
+)
+from shutil import copyfileobj
+from ssl import SSLContext, create_default_context
+from tempfile import SpooledTemporaryFile
+from threading import Lock
+from time import perf_counter
+from typing import IO, Dict, List, Tuple, Union
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import Request
+
+# Errors raised when an idle connection was closed by the server
+_STALE_ERRORS = (BadStatusLine, BrokenPipeError, ConnectionResetError)
+
+# Codecs of `ConnectionPool.compression`, named as their `Content-Encoding`
+UPLOAD_CODECS = ["gzip", "zstd"]
+
+
+def compress(body: bytes, codec: str) -> bytes:
+    """Return `body` compressed with `codec`, one of `UPLOAD_CODECS`"""
+    if codec == "gzip":
+        return gzip_compress(body, compresslevel=6)
+    elif codec == "zstd":
+        # Optional dependency
+        from zstandard import ZstdCompressor
+
+        return ZstdCompressor().compress(body)
+    else:
+        raise ValueError(f"Upload codec '{codec}' not supported")
+
+
+class PooledResponse:
+    """Fully read response of a `ConnectionPool` request, standing in for the
+    response of `urllib.request.urlopen`. The body is read from `body`, a
+    file positioned at its start."""
+
+    def __init__(
+        self, url: str, status: int, reason: str, headers: HTTPMessage, body: IO[bytes]
+    ) -> None:
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._body = body
+
+    def __enter__(self) -> PooledResponse:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._body.close()
+
+    def getcode(self) -> int:
+        return self.status
+
+    def getheader(self, name: str, default: str = None) -> str:
+        return self.headers.get(name, default)
+
+    def info(self) -> HTTPMessage:
+        return self.headers
+
+    def read(self, amt: int = -1) -> bytes:
+        return self._body.read(-1 if amt is None else amt)
+
+    def readinto(self, buffer) -> int:
+        return self._body.readinto(buffer)
+
+
+@dataclass
+class ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections, used in place of
+    `urllib.request.urlopen` (see `install_pool`).
+
+    Each request borrows an idle connection to its host, or opens a new one,
+    and returns it once the response has been read, keeping (at most)
+    `pool_size` idle connections per host. A request that fails because the
+    server closed an idle connection is retried once on a new connection.
+    Redirects are not followed. Response bodies larger than `spool_bytes` are
+    held in a temporary file rather than in memory.
+
+    With `compression`, request bodies of at least `compression_min_bytes` are
+    compressed with that codec (see `UPLOAD_CODECS`) and sent with a matching
+    `Content-Encoding`, except for requests signed with an access key, whose
+    signature covers the body as given.
+    """
+
+    pool_size: int = 10
+    timeout: float = None
+    compression: str = None
+    compression_min_bytes: int = 64 * 1024
+    spool_bytes: int = 64 * 1024**2
+    _idle: Dict[Tuple[str, str, int], List[HTTPConnection]] = field(
+        init=False, default_factory=dict
+    )
+    _ssl_context: SSLContext = field(init=False, default_factory=create_default_context)
+    _stats: Dict[str, int] = field(init=False)
+    _upload_stats: Dict[str, float] = field(init=False)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __post_init__(self) -> None:
+        self._stats = {"requests": 0, "opened": 0, "reused": 0, "stale": 0}
+        self._upload_stats = {
+            "compressed": 0,
+            "bytes_before": 0,
+            "bytes_after": 0,
+            "compress_seconds": 0.0,
+            "bytes_sent": 0,
+            "send_seconds": 0.0,
+        }
+
+    def close(self) -> None:
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def stats(self) -> dict:
+        """Return the number of requests made, connections opened, requests made on
+        a reused connection (and that fraction of all requests), and idle
+        connections found closed by the server"""
+        with self._lock:
+            return {
+                **self._stats,
+                "reuse_ratio": (
+                    self._stats["reused"] / self._stats["requests"]
+                    if self._stats["requests"]
+                    else 0.0
+                ),
+            }
+
+    def upload_stats(self) -> dict:
+        """Return the number of request bodies compressed, their size before and
+        after (and that ratio), the seconds spent compressing them, and an
+        estimate of the upload seconds saved, at the upload rate measured
+        across every request body sent"""
+        with self._lock:
+            stats = dict(self._upload_stats)
+
+        rate = (
+            stats["bytes_sent"] / stats["send_seconds"]
+            if stats["send_seconds"]
+            else None
+        )
+        return {
+            "compressed": stats["compressed"],
+            "bytes_before": stats["bytes_before"],
+            "bytes_after": stats["bytes_after"],
+            "ratio": (
+                stats["bytes_after"] / stats["bytes_before"]
+                if stats["bytes_before"]
+                else 1.0
+            ),
+            "compress_seconds": stats["compress_seconds"],
+            "seconds_saved": (
+                (stats["bytes_before"] - stats["bytes_after"]) / rate
+                - stats["compress_seconds"]
+                if rate
+                else 0.0
+            ),
+        }
+
+    def urlopen(
+        self, request: Union[str, Request], data: bytes = None, timeout: float = None
+    ) -> PooledResponse:
+        """Make `request`, as `urllib.request.urlopen` would, raising
+        `urllib.error.HTTPError` for error responses"""
+        if not isinstance(request, Request):
+            request = Request(request, data)
+
+        url = urlsplit(request.full_url)
+        key = (url.scheme, url.hostname, url.port)
+        path = url.path + (f"?{url.query}" if url.query else "")
+
+        with self._lock:
+            self._stats["requests"] += 1
+
+        body, headers = self._body(request)
+
+        connection, reused = self._connection(key, timeout)
+        try:
+            try:
+                response = self._send(connection, request, path, body, headers)
+            except _STALE_ERRORS:
+                if not reused:
+                    raise
+                # Closed while idle, the request was never processed
+                connection.close()
+                with self._lock:
+                    self._stats["stale"] += 1
+                    self._stats["reused"] -= 1
+                connection, reused = self._connection(key, timeout, fresh=True)
+                response = self._send(connection, request, path, body, headers)
+
+            body = SpooledTemporaryFile(max_size=self.spool_bytes)
+            copyfileobj(response, body)
+            body.seek(0)
+        except BaseException:
+            connection.close()
+            raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(key, connection)
+
+        if response.status >= 400:
+            raise HTTPError(
+                request.full_url,
+                response.status,
+                response.reason,
+                response.headers,
+                body,
+            )
+
+        return PooledResponse(
+            request.full_url, response.status, response.reason, response.headers, body
+        )
+
+    def _connection(
+        self, key: Tuple[str, str, int], timeout: float, fresh: bool = False
+    ) -> Tuple[HTTPConnection, bool]:
+        """Return an idle connection to `key` (or a new one), and whether it is reused"""
+        with self._lock:
+            if not fresh and self._idle.get(key):
+                self._stats["reused"] += 1
+                return self._idle[key].pop(), True
+
+            self._stats["opened"] += 1
+
+        scheme, host, port = key
+        if scheme == "https":
+            connection = HTTPSConnection(
+                host, port, timeout=timeout or self.timeout, context=self._ssl_context
+            )
+        else:
+            connection = HTTPConnection(host, port, timeout=timeout or self.timeout)
+
+        return connection, False
+
+    def _release(self, key: Tuple[str, str, int], connection: HTTPConnection) -> None:
+        """Return `connection` to the pool, or close it if the pool is full"""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(connection)
+                return
+
+        connection.close()
+
+    def _body(self, request: Request) -> Tuple[Union[None, bytes], Dict[str, str]]:
+        """Return the body and headers to send for `request`, compressed as
+        `compression` allows"""
+        # The SDK passes empty payloads as `{}`, sent by `urlopen` as an empty body
+        body = request.data or None
+        headers = dict(request.header_items())
+        names = {name.lower(): name for name in headers}
+
+        with self._lock:
+            # Read together, as `install_pool` may change them
+            codec, min_bytes = self.compression, self.compression_min_bytes
+
+        if (
+            codec is None
+            or body is None
+            or len(body) < min_bytes
+            or "content-encoding" in names
+            # Signed with an access key, see `railib.rest._sign`
+            or headers.get(names.get("authorization"), "").startswith("RAI01-")
+        ):
+            return body, headers
+
+        start = perf_counter()
+        compressed = compress(body, codec)
+        seconds = perf_counter() - start
+
+        with self._lock:
+            self._upload_stats["compressed"] += 1
+            self._upload_stats["bytes_before"] += len(body)
+            self._upload_stats["bytes_after"] += len(compressed)
+            self._upload_stats["compress_seconds"] += seconds
+
+        headers.pop(names.get("content-length"), None)
+        return compressed, {**headers, "Content-Encoding": codec}
+
+    def _send(
+        self,
+        connection: HTTPConnection,
+        request: Request,
+        path: str,
+        body: Union[None, bytes],
+        headers: Dict[str, str],
+    ):
+        start = perf_counter()
+        connection.request(request.get_method(), path, body=body, headers=headers)
+
+        if body:
+            # Time to hand the body to the socket, to estimate the upload rate
+            with self._lock:
+                self._upload_stats["bytes_sent"] += len(body)
+                self._upload_stats["send_seconds"] += perf_counter() - start
+
+        return connection.getresponse()
+
+
+# Transport shared by every `Sequence` in the process, see `install_pool`
+_shared_pool: ConnectionPool = None
+_shared_pool_lock = Lock()
+
+
+def install_pool(
+    pool_size: int = 10,
+    timeout: float = None,
+    compression: str = None,
+    compression_min_bytes: int = 64 * 1024,
+) -> ConnectionPool:
+    """Route every request made by the RAI SDK through a shared `ConnectionPool`,
+    returning it. The pool is created, with `pool_size` and `timeout`, by the
+    first call; every call (re)sets its `compression` and
+    `compression_min_bytes`, which apply to requests sent from then on.
+
+    The pool is a process-wide singleton, so these settings are not scoped to
+    the caller: requests sent by other threads (e.g. other `Sequence`s) use
+    whichever settings were installed last."""
+    global _shared_pool
+
+    if compression not in [None, *UPLOAD_CODECS]:
+        raise ValueError(f"Upload codec '{compression}' not supported")
+
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            from railib import rest
+
+            _shared_pool = ConnectionPool(
+                pool_size, timeout, compression, compression_min_bytes
+            )
+            rest.urlopen = _shared_pool.urlopen
+        else:
+            with _shared_pool._lock:
+                _shared_pool.compression = compression
+                _shared_pool.compression_min_bytes = compression_min_bytes
+
+        return _shared_pool
+
+
+def uninstall_pool() -> None:
+    """Restore the RAI SDK's own transport, and close the shared pool"""
+    global _shared_pool
+
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            from railib import rest
+            from urllib.request import urlopen
+
+            rest.urlopen = urlopen
+            _shared_pool.close()
+            _shared_pool = None
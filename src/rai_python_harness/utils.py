@@ -1,24 +1,156 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
+from hashlib import sha256
+from importlib.util import find_spec
+from json import dumps
+from logging.handlers import QueueListener
+from mmap import ACCESS_READ, mmap
+from os import fstat
 from pathlib import Path
+from queue import SimpleQueue
 from time import localtime, strftime
+from typing import Iterator, Tuple
 
 import logging
 import re
 
+from rai_python_harness.log_handlers import (
+    BatchFileHandler,
+    BatchQueueListener,
+    JsonLinesFormatter,
+    RecordQueueHandler,
+)
+
 
 def cell_has_inputs(cell: dict) -> bool:
     """Return whether or not 'inputs' key of `cell` is present and populated"""
     return True if ("inputs" in cell) and cell["inputs"] else False
 
 
+def content_hash(*parts) -> str:
+    """Return the SHA-256 hex digest of `parts`, each a `str` or JSON serializable value"""
+    digest = sha256()
+
+    for part in parts:
+        data = (part if isinstance(part, str) else dumps(part, sort_keys=True)).encode(
+            "utf-8"
+        )
+        # Prefix with length so (a, bc) and (ab, c) differ
+        digest.update(f"{len(data)}:".encode("utf-8"))
+        digest.update(data)
+
+    return digest.hexdigest()
+
+
+def buffer_hash(buffer: memoryview, chunk_size: int = 1024**2) -> str:
+    """Return the SHA-256 hex digest of `buffer`, hashed `chunk_size` bytes at a time
+    without copying"""
+    digest = sha256()
+
+    for start in range(0, len(buffer), chunk_size):
+        with buffer[start : start + chunk_size] as chunk:
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def decode_text(buffer: memoryview) -> str:
+    """Return `buffer` decoded as UTF-8, with newlines translated as `open` would"""
+    text = str(buffer, "utf-8")
+
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    return text
+
+
+def file_hash(file_path: Path, chunk_size: int = 1024**2) -> str:
+    """Return the SHA-256 hex digest of the file at `file_path`, hashed `chunk_size` bytes at a time"""
+    with mapped_file(file_path) as buffer:
+        return buffer_hash(buffer, chunk_size)
+
+
+@contextmanager
+def mapped_file(file_path: Path) -> Iterator[memoryview]:
+    """Yield a read-only `memoryview` of the file at `file_path`, mapped into memory
+    rather than read, so its pages are shared with the OS page cache"""
+    with open(file_path, "rb") as f:
+        if fstat(f.fileno()).st_size == 0:
+            # Empty files can not be mapped
+            yield memoryview(b"")
+            return
+
+        with mmap(f.fileno(), 0, access=ACCESS_READ) as mapping:
+            with memoryview(mapping) as buffer:
+                yield buffer
+
+
 def formatted_time_now() -> str:
     return strftime("%Y-%m-%dT%H%M%S", localtime())
 
 
-def init_logger(log_path: Path) -> logging.Logger:
-    """Initiate a `logging.Logger` object at `log_path`"""
-    logging.basicConfig(datefmt="%Y-%m-%dT%H%M%S.%.3f")
+def close_logger(logger: logging.Logger, listener: QueueListener = None) -> None:
+    """Stop `listener` (if any), then close and remove the handlers of `logger`
+    and forget it, so its files are closed and it can be garbage collected"""
+    if listener:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    logger_dict = logging.Logger.manager.loggerDict
+    logger_dict.pop(logger.name, None)
+
+    # Placeholders created for the "parents" of a name holding dots (e.g. `.log`)
+    name = logger.name
+    while "." in name:
+        name = name.rsplit(".", 1)[0]
+        placeholder = logger_dict.get(name)
+        if isinstance(placeholder, logging.PlaceHolder):
+            placeholder.loggerMap.pop(logger, None)
+            if not placeholder.loggerMap:
+                logger_dict.pop(name, None)
+
+
+def init_background_logger(
+    log_path: Path,
+    structured_log_path: Path = None,
+    batch_size: int = 100,
+    flush_interval: float = 1.0,
+) -> Tuple[logging.Logger, BatchQueueListener]:
+    """Initiate a `logging.Logger` object at `log_path` whose records are written by
+    a (started) `BatchQueueListener`, so logging never waits on file I/O.
+    Records are also written as JSON lines to `structured_log_path`, if given."""
+    _init_root_logger()
+
+    handlers = [BatchFileHandler(str(log_path))]
+    if structured_log_path:
+        handlers.append(BatchFileHandler(str(structured_log_path)))
+        handlers[-1].setFormatter(JsonLinesFormatter())
+
+    queue = SimpleQueue()
+    listener = BatchQueueListener(
+        queue, *handlers, batch_size=batch_size, flush_interval=flush_interval
+    )
+
+    logger = logging.getLogger(str(log_path))
+    logger.setLevel(logging.DEBUG)
+    # Passed to the root logger's handlers by `listener` instead
+    logger.propagate = False
+    logger.addHandler(RecordQueueHandler(queue))
+
+    listener.start()
+    return logger, listener
+
+
+def init_logger(log_path: Path, structured_log_path: Path = None) -> logging.Logger:
+    """Initiate a `logging.Logger` object at `log_path`, also writing records as
+    JSON lines to `structured_log_path`, if given"""
+    _init_root_logger()
 
     log_file_handler = logging.FileHandler(str(log_path))
     log_file_handler.setLevel(logging.DEBUG)
@@ -27,16 +159,43 @@ def init_logger(log_path: Path) -> logging.Logger:
     logger.setLevel(logging.DEBUG)
     logger.addHandler(log_file_handler)
 
+    if structured_log_path:
+        structured_handler = logging.FileHandler(str(structured_log_path))
+        structured_handler.setLevel(logging.DEBUG)
+        structured_handler.setFormatter(JsonLinesFormatter())
+        logger.addHandler(structured_handler)
+
     return logger
 
 
+def _init_root_logger() -> None:
+    """Configure the root logger, once per process"""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(datefmt="%Y-%m-%dT%H%M%S.%.3f")
+
+
+def is_glob_pattern(file_path: str) -> bool:
+    """Return whether or not `file_path` is a glob pattern (e.g. `events/part-*.csv`)"""
+    return any(char in file_path for char in "*?[")
+
+
+def is_installed(module: str) -> bool:
+    """Return whether or not (optional dependency) `module` can be imported, without importing it"""
+    return find_spec(module) is not None
+
+
+def model_name(source_path: Path) -> str:
+    """Return the name a model is installed under, its file name without `.rel`"""
+    return f"{source_path.name.replace('.rel', '')}"
+
+
 def open_file(file_path: Path) -> str:
-    """Open file at `file_path` or raise `FileNotFoundError`"""
+    """Open file at `file_path` or raise `FileNotFoundError`. The file is decoded
+    straight from a mapping of it (see `mapped_file`), never read into a
+    `bytes` copy first."""
     try:
-        f = open(file_path, "r")
-        contents = f.read()
-        f.close()
-        return contents
+        with mapped_file(file_path) as buffer:
+            return decode_text(buffer)
     except FileNotFoundError:
         raise FileNotFoundError(f"File Not Found at '{file_path}'")
 
@@ -1,7 +1,39 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from pathlib import Path
 from pytomlpp import load
+from threading import Lock
+from typing import List, Tuple
+
+from rai_python_harness.result_writer import RESULT_FORMATS
+from rai_python_harness.utils import is_glob_pattern
+
+REQUIRED_KEYS = {
+    "global": [
+        # "authors",
+        # "engine",
+        # "create_database",
+        "data_dir",
+        # "database",
+        # "description",
+        # "project",
+        "source_dir",
+    ],
+    "queries": [
+        "file_path",
+        "index",
+        "name",
+        "type",
+    ],
+}
+
+# Number of validated schemas kept by `valid_schema_or_exit`
+SCHEMA_CACHE_SIZE = 32
+
+# Validated schemas, by (resolved path, mtime, size) of their TOML file
+_schema_cache: OrderedDict[Tuple[str, int, int], dict] = OrderedDict()
+_cache_lock = Lock()
 
 
 def load_toml_or_exit(toml_path) -> dict:
@@ -22,81 +54,158 @@ def valid_file_extension_or_exit(schema_path: Path, ext) -> None:
         )
 
 
-def valid_schema_or_exit(schema_path: Path) -> dict:
-    """Validate TOML schema or fail trying."""
-
-    # File extension (suffix) is ".toml", or fail
-    valid_file_extension_or_exit(schema_path, ".toml")
-
-    # Load TOML file or fail
-    schema = load_toml_or_exit(schema_path)
-
-    REQUIRED_KEYS = {
-        "global": [
-            # "authors",
-            # "engine",
-            # "create_database",
-            "data_dir",
-            # "database",
-            # "description",
-            # "project",
-            "source_dir",
-        ],
-        "queries": [
-            "file_path",
-            "index",
-            "name",
-            "type",
-        ],
-    }
+def schema_errors(schema: dict, schema_path: Path) -> List[str]:
+    """Return a description of every problem with `schema`, walking `queries` once"""
+    errors = []
 
     # Check for presence of required keys
     for key in REQUIRED_KEYS["global"]:
         if key not in schema:
-            exit(f"EXECUTION STOPPED: Configuration file must have key '{key}'")
+            errors.append(f"Configuration file must have key '{key}'")
 
     # Validate 'version_control' Table
     # if "version_control" in schema:
     #    if "url" in schema["version_control"]:
     #        if len(schema["version_control"]["url"]) == 0:
-    #            exit("EXECUTION STOPPED: Version control URL may not be empty")
+    #            errors.append("Version control URL may not be empty")
     #    else:
-    #        exit(
-    #            f"EXECUTION STOPPED:The 'version_control' entry in '{schema_path}' must have 'url' key"
+    #        errors.append(
+    #            f"The 'version_control' entry in '{schema_path}' must have 'url' key"
     #        )
     # else:
-    #    exit(
-    #        f"EXECUTION STOPPED: '{schema_path}' must have 'version_control' entry (Table)"
-    #    )
+    #    errors.append(f"'{schema_path}' must have 'version_control' entry (Table)")
+
+    # Ensure 'result_format' is supported
+    if schema.get("result_format", "json") not in RESULT_FORMATS:
+        errors.append(
+            f"'result_format' must be one of {RESULT_FORMATS}, not '{schema['result_format']}'"
+        )
 
     # Ensure configuration file has 'queries' array, and it has
     # at least one (1) entry
-    if "queries" in schema:
-        if len(schema["queries"]) == 1 and schema["queries"][0] == {}:
-            exit("EXECUTION STOPPED: 'queries' array may not be empty")
-    else:
-        exit(f"EXECUTION STOPPED: '{schema_path}' must have a 'queries' array")
-
-    # Ensure indices of elements in 'queries' array are unique
-    indices = [qry["index"] for qry in schema["queries"]]
-
-    if len(indices) != len(set(indices)):
-        exit(f"EXECUTION STOPPED: Duplicate keys in '{schema_path}'")
-
-    # Ensure entries in 'queries' array have required keys
-    for query in schema["queries"]:
+    if "queries" not in schema:
+        errors.append(f"'{schema_path}' must have a 'queries' array")
+        return errors
+    elif len(schema["queries"]) == 1 and schema["queries"][0] == {}:
+        errors.append("'queries' array may not be empty")
+        return errors
+
+    indices = set()
+    # (index, dependency) of every 'depends_on' entry, checked once all indices are known
+    dependencies = []
+
+    for position, query in enumerate(schema["queries"]):
+        # Queries without a (valid) 'index' are named by position
+        label = query.get("index", f"at position {position}")
+
+        # Ensure entries in 'queries' array have required keys
         for key in REQUIRED_KEYS["queries"]:
             if key not in query:
-                exit(f"EXECUTION STOPPED: query {query['index']} must have key '{key}'")
+                errors.append(f"query {label} must have key '{key}'")
+
+        # Ensure indices of elements in 'queries' array are unique integers
+        if "index" in query:
+            if not isinstance(query["index"], int) or isinstance(query["index"], bool):
+                errors.append(f"query {label} 'index' must be an integer")
+            elif query["index"] in indices:
+                errors.append(f"Duplicate index {label} in '{schema_path}'")
+            else:
+                indices.add(query["index"])
+
+        if "depends_on" in query:
+            if not isinstance(query["depends_on"], list) or any(
+                not isinstance(dep, int) or isinstance(dep, bool)
+                for dep in query["depends_on"]
+            ):
+                errors.append(f"query {label} 'depends_on' must be an array of indices")
+            else:
+                dependencies.extend((label, dep) for dep in query["depends_on"])
+
+        if not isinstance(query.get("idempotent", False), bool):
+            errors.append(f"query {label} 'idempotent' must be a boolean")
+
+        if not isinstance(query.get("chunked", False), bool):
+            errors.append(f"query {label} 'chunked' must be a boolean")
+        elif query.get("chunked", False) and (
+            str(query.get("type", "")).upper() != "DATA"
+            or "inputs" in query
+            or is_glob_pattern(str(query.get("file_path", "")))
+            or Path(str(query.get("file_path", ""))).suffix not in [".csv", ".json"]
+        ):
+            errors.append(
+                f"query {label} 'chunked' only applies to DATA queries without 'inputs' that load a single '.csv' or '.json' file"
+            )
+
+        if query.get("result_format", "json") not in RESULT_FORMATS:
+            errors.append(
+                f"query {label} 'result_format' must be one of {RESULT_FORMATS}, not '{query['result_format']}'"
+            )
 
         # Ensure 'input' is populated in 'data' entries that list the key
-        if (query["type"].upper() == "DATA") and ("inputs" in query):
+        if (
+            str(query.get("type", "")).upper() == "DATA"
+            and ("inputs" in query)
             # Python's "Truth Value Testing" resolves `bool({}) => False`, so
             # `not bool({}) = True` indicates `query["inputs"]`, a `dict`, is empty
-            if not bool(query["inputs"]):
-                exit(
-                    f"EXECUTION STOPPED: query {query['index']} has empty 'inputs' key"
-                )
+            and not bool(query["inputs"])
+        ):
+            errors.append(f"query {label} has empty 'inputs' key")
+
+    # Ensure 'depends_on' only lists indices of earlier entries
+    for index, dep in dependencies:
+        if not isinstance(index, int) or isinstance(index, bool):
+            # Missing or invalid 'index', reported above
+            continue
+
+        if (dep not in indices) or (dep >= index):
+            errors.append(
+                f"query {index} may only depend on earlier queries, '{dep}' is not the index of one"
+            )
+
+    return errors
+
+
+def valid_schema_or_exit(schema_path: Path) -> dict:
+    """Validate TOML schema or fail trying, reporting every problem found.
+
+    The validated schema has its `queries` sorted by `index`, and is cached on the
+    path, modification time, and size of `schema_path`. Schemas loaded from an
+    unchanged file are therefore shared, and must not be modified.
+    """
+
+    # File extension (suffix) is ".toml", or fail
+    valid_file_extension_or_exit(schema_path, ".toml")
+
+    try:
+        stat = schema_path.stat()
+        cache_key = (str(schema_path.resolve()), stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        # Left to `load_toml_or_exit` to report
+        cache_key = None
+
+    with _cache_lock:
+        if cache_key in _schema_cache:
+            _schema_cache.move_to_end(cache_key)
+            return _schema_cache[cache_key]
+
+    # Load TOML file or fail
+    schema = load_toml_or_exit(schema_path)
+
+    errors = schema_errors(schema, schema_path)
+    if errors:
+        exit(
+            f"EXECUTION STOPPED: '{schema_path}' has {len(errors)} error(s)\n"
+            + "\n".join(f"  - {error}" for error in errors)
+        )
+
+    # Execute queries in `index` order, whatever their order in the file
+    schema["queries"] = sorted(schema["queries"], key=lambda qry: qry["index"])
 
     # Validation checks passed
+    if cache_key:
+        with _cache_lock:
+            _schema_cache[cache_key] = schema
+            while len(_schema_cache) > SCHEMA_CACHE_SIZE:
+                _schema_cache.popitem(last=False)
+
     return schema
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from time import sleep
+
+import pyarrow
+import pytest
+from railib import api
+
+
+class FakeAPI:
+    """Records the calls made to `railib.api`, answering each one as RAI Cloud
+    would. Queries whose source contains `abort_on` abort, and queries whose
+    source is a key of `delays` take that many seconds. `events` records when
+    each query starts and ends."""
+
+    def __init__(self, abort_on: str = None) -> None:
+        self.abort_on = abort_on
+        self.delays = {}
+        self.calls = []
+        self.events = []
+
+    def exec(self, context, database, engine, command, inputs=None, readonly=True):
+        self.calls.append(("exec", command))
+        self.events.append(("start", command))
+        sleep(self.delays.get(command, 0))
+        self.events.append(("end", command))
+        state = "ABORTED" if self.abort_on and self.abort_on in command else "COMPLETED"
+        return api.TransactionAsyncResponse(
+            {"id": f"txn{len(self.calls)}", "state": state},
+            None,
+            [{"relationId": "/:output/Int64", "table": pyarrow.table({"v1": [1]})}],
+            [],
+        )
+
+    def exec_v1(self, context, database, engine, command, inputs=None, readonly=True):
+        self.calls.append(("exec_v1", command, inputs))
+        return {"actions": [], "output": [], "problems": [], "aborted": False}
+
+    def load(self, context, database, engine, relation, data, syntax={}):
+        self.calls.append(("load", relation))
+        return {"actions": [], "output": [], "problems": [], "aborted": False}
+
+    def install_model(self, context, database, engine, models):
+        self.calls.append(("install_model", sorted(models)))
+        return {
+            "actions": [
+                {"name": f"action{i}", "result": {}} for i in range(len(models))
+            ],
+            "output": [],
+            "problems": [],
+            "aborted": False,
+        }
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    fake = FakeAPI()
+    monkeypatch.setattr(api, "exec", fake.exec)
+    monkeypatch.setattr(api, "exec_v1", fake.exec_v1)
+    monkeypatch.setattr(api, "load_csv", fake.load)
+    monkeypatch.setattr(api, "load_json", fake.load)
+    monkeypatch.setattr(api, "install_model", fake.install_model)
+    # Keep files written relative to the working directory out of the repository
+    monkeypatch.chdir(tmp_path)
+    return fake
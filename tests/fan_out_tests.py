@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from os import environ
+
+for var in ["RAI_PROFILE", "RAI_DBS", "RAI_ENGINE"]:
+    if var not in environ:
+        exit(f"Must set environment variable '{var}'")
+
+from pathlib import Path
+from railib import api, config
+
+from rai_python_harness.fan_out import FanOut
+from rai_python_harness.schema import Schema
+
+# Example of executing one sequence against several databases,
+# e.g. `RAI_DBS="tenant_a,tenant_b,tenant_c"`, using the same engine
+
+context = api.Context(**config.read(profile=environ["RAI_PROFILE"]))
+targets = [
+    (database, environ["RAI_ENGINE"]) for database in environ["RAI_DBS"].split(",")
+]
+
+for database, _ in targets:
+    print(f"Creating database '{database}'...")
+    if api.get_database(context, database):
+        api.delete_database(context, database)
+
+    api.create_database(context, database)
+
+fan_out = FanOut(
+    context,
+    Schema(Path("example/project/run_sequence.toml")),
+    Path.cwd(),
+    targets,
+    max_concurrency=2,
+)
+
+# Logs of each target are written to `{database}__{engine}/`
+for target, error in fan_out.exec().items():
+    print(target, "OK" if error is None else repr(error))
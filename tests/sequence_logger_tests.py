@@ -60,3 +60,20 @@ sequence_logger.err("ERROR - 2")
 sequence_logger.err("ERROR - 3")
 sequence_logger.info("MESSAGE - 2")
 sequence_logger.warn("WARNING - 2")
+
+sequence_logger.close()
+
+# Queue messages for a background thread, and write them as JSON lines too
+sequence_logger = SequenceLogger(
+    Path.cwd().absolute(), background=True, structured=True
+)
+
+sequence_logger.info(f"log_file_path: {sequence_logger.log_file_path}")
+sequence_logger.info(
+    f"structured_log_path: {sequence_logger.structured_log_path}",
+    fields={"index": 1, "type": "QUERY"},
+)
+sequence_logger.warn("WARNING - 1", fields={"index": 2})
+sequence_logger.err("ERROR - 1")
+
+sequence_logger.close()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from rai_python_harness.checkpoint import CHECKPOINT_FILE_NAME, Checkpoint
+
+
+def test_entries_are_kept_per_sequence_and_cell(tmp_path):
+    manifest_path = tmp_path / CHECKPOINT_FILE_NAME
+    first, second = tmp_path / "first.toml", tmp_path / "second.toml"
+
+    checkpoint = Checkpoint(manifest_path)
+    assert checkpoint.get(first, 0) is None
+
+    checkpoint.record(first, {"index": 0, "name": "a"})
+    checkpoint.record(second, {"index": 0, "name": "b"})
+
+    assert checkpoint.get(first, 0)["name"] == "a"
+    assert checkpoint.get(second, 0)["name"] == "b"
+    assert checkpoint.get(first, 1) is None
+
+
+def test_manifest_is_reread_and_the_last_entry_wins(tmp_path):
+    manifest_path = tmp_path / CHECKPOINT_FILE_NAME
+    toml_path = tmp_path / "sequence.toml"
+
+    checkpoint = Checkpoint(manifest_path)
+    checkpoint.record(toml_path, {"index": 0, "result": "old"})
+    checkpoint.record(toml_path, {"index": 0, "result": "new"})
+    checkpoint.record(toml_path, {"index": 1, "result": "other"})
+
+    reread = Checkpoint(manifest_path)
+    assert reread.get(toml_path, 0)["result"] == "new"
+    assert reread.get(toml_path, 1)["result"] == "other"
+
+
+def test_incomplete_lines_are_skipped(tmp_path):
+    manifest_path = tmp_path / CHECKPOINT_FILE_NAME
+    toml_path = tmp_path / "sequence.toml"
+
+    Checkpoint(manifest_path).record(toml_path, {"index": 0})
+    with open(manifest_path, "a") as f:
+        # Interrupted while writing the entry of cell 1
+        f.write('{"index": 1, "toml_pa')
+
+    checkpoint = Checkpoint(manifest_path)
+    assert checkpoint.get(toml_path, 0) is not None
+    assert checkpoint.get(toml_path, 1) is None
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from json import loads
+from pathlib import Path
+
+import pytest
+
+from rai_python_harness.cli import main
+from rai_python_harness.schema import Schema
+from rai_python_harness.sequence import Sequence
+from rai_python_harness.sequence_logger import SequenceLogger
+from rai_python_harness.timing_store import TimingStore
+
+PROJECT_DIR = Path(__file__).parent / "project"
+
+
+def test_validate(capsys):
+    main(["validate", str(PROJECT_DIR / "test_queries.toml")])
+
+    assert "test_queries.toml' is valid" in capsys.readouterr().out
+
+
+def test_validate_exits_on_invalid_files(tmp_path):
+    toml_path = tmp_path / "invalid.toml"
+    toml_path.write_text('[[queries]]\nname = "q"\ntype = "nonsense"\n')
+
+    with pytest.raises(SystemExit):
+        main(["validate", str(toml_path)])
+
+
+def test_plan_needs_a_timing_store(tmp_path):
+    with pytest.raises(SystemExit):
+        main(
+            ["plan", "--log-dir", str(tmp_path), str(PROJECT_DIR / "test_queries.toml")]
+        )
+
+
+def test_plan_batches_queries_like_run(fake_api, capsys, tmp_path):
+    toml_path = PROJECT_DIR / "test_queries.toml"
+    timing_store_path = tmp_path / "timings.db"
+
+    # Record the duration of each query
+    timing_store = TimingStore(timing_store_path)
+    sequence_logger = SequenceLogger(tmp_path)
+    sequence = Sequence(
+        None, Schema(toml_path), sequence_logger, timing_store=timing_store
+    )
+    sequence.database = "database"
+    sequence.engine = "engine"
+    sequence.exec()
+    sequence_logger.close()
+    timing_store.close()
+
+    plans = []
+    for batching in [[], ["--batch-queries"]]:
+        main(
+            [
+                "plan",
+                "--log-dir",
+                str(tmp_path),
+                "--timing-store",
+                str(timing_store_path),
+                *batching,
+                str(toml_path),
+            ]
+        )
+        plans.append(loads(capsys.readouterr().out))
+
+    unbatched, batched = plans
+    assert unbatched["cells"] == batched["cells"] == len(fake_api.calls)
+    assert unbatched["estimated_cells"] == unbatched["cells"]
+    # Batched queries run as one transaction, so take less time in sequence
+    assert batched["sequential_seconds"] < unbatched["sequential_seconds"]
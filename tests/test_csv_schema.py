@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from json import dumps, loads
+
+from rai_python_harness.csv_schema import (
+    cached_csv_schema,
+    infer_csv_schema,
+    schema_cache_path,
+    schema_config,
+)
+
+
+def test_infer_csv_schema(tmp_path):
+    data_path = tmp_path / "data.csv"
+    data_path.write_text(
+        "id,price,name,empty,mixed\n1,2.5,a,,1\n -2 ,3,b,,x\n+3,1e3,c,,2\n"
+    )
+
+    assert infer_csv_schema(data_path) == {
+        "id": "int",
+        "price": "float",
+        "name": "string",
+        "empty": "string",
+        "mixed": "string",
+    }
+    # Only the first row is sampled
+    assert infer_csv_schema(data_path, sample_rows=1)["mixed"] == "int"
+
+
+def test_zero_padded_columns_are_strings(tmp_path):
+    data_path = tmp_path / "data.csv"
+    data_path.write_text(
+        "zip,code,count,ratio,signed\n02134,1,0,0.5,-0\n10001,007.5,10,1.25,+3\n"
+    )
+
+    assert infer_csv_schema(data_path) == {
+        "zip": "string",
+        "code": "string",
+        "count": "int",
+        "ratio": "float",
+        "signed": "int",
+    }
+
+
+def test_cached_csv_schema_is_kept_outside_the_data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    cache_dir = tmp_path / "logs" / "csv_schemas"
+    data_dir.mkdir()
+    data_path = data_dir / "data.csv"
+    data_path.write_text("id,name\n1,a\n")
+
+    assert cached_csv_schema(data_path, cache_dir) == {"id": "int", "name": "string"}
+    assert list(data_dir.iterdir()) == [data_path]
+
+    cache_path = schema_cache_path(data_path, cache_dir)
+    assert cache_path.parent == cache_dir
+    assert cache_path.name.startswith("data-")
+    assert loads(cache_path.read_text())["header"] == "id,name"
+
+    # Edited types are used while the header is unchanged
+    cached = loads(cache_path.read_text())
+    cached["schema"]["id"] = "string"
+    cache_path.write_text(dumps(cached))
+    assert cached_csv_schema(data_path, cache_dir)["id"] == "string"
+
+    # A new header infers the types again
+    data_path.write_text("id,count\n1,2\n")
+    assert cached_csv_schema(data_path, cache_dir) == {"id": "int", "count": "int"}
+
+
+def test_files_with_the_same_name_are_cached_apart(tmp_path):
+    first, second = tmp_path / "a" / "data.csv", tmp_path / "b" / "data.csv"
+    for data_path, row in [(first, "1"), (second, "x")]:
+        data_path.parent.mkdir()
+        data_path.write_text(f"value\n{row}\n")
+
+    assert cached_csv_schema(first, tmp_path / "cache") == {"value": "int"}
+    assert cached_csv_schema(second, tmp_path / "cache") == {"value": "string"}
+
+
+def test_schema_config():
+    assert schema_config({"id": "int", "name": "string"}) == (
+        'def config:schema = {\n    :id, "int";\n    :name, "string"\n}\n'
+    )
+    assert schema_config({"unit price": "float"}) == ""
+    assert schema_config({}) == ""
+    assert schema_config(None) == ""
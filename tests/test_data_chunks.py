@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from csv import reader
+from io import StringIO
+from json import dumps, loads
+
+import pytest
+
+from rai_python_harness.data_chunks import (
+    csv_chunks,
+    csv_rows,
+    json_array_chunks,
+    json_array_elements,
+)
+
+CSV = (
+    "id,note\n"
+    '1,"plain"\n'
+    '2,"spans\nthree\nlines"\n'
+    '3,"quoted ""word"", then\na new line"\n'
+    "4,last\n"
+)
+
+# Strings holding every character `json_array_chunks` treats specially
+ELEMENTS = [
+    {"id": 1, "text": "brackets ] [ and braces } {"},
+    {"id": 2, "text": 'escaped \\" quote, and a comma'},
+    {"id": 3, "nested": [[1, [2]], {"a": {"b": ["]"]}}]},
+    'a \\\\ backslash, then a quote \\\\\\" and ]',
+    [],
+    3.5,
+    None,
+]
+
+
+def write(tmp_path, name: str, text: str):
+    file_path = tmp_path / name
+    file_path.write_text(text)
+    return file_path
+
+
+def test_csv_rows_keep_quoted_line_breaks_within_a_row(tmp_path):
+    rows = list(csv_rows(write(tmp_path, "data.csv", CSV)))
+
+    assert rows == [
+        "id,note\n",
+        '1,"plain"\n',
+        '2,"spans\nthree\nlines"\n',
+        '3,"quoted ""word"", then\na new line"\n',
+        "4,last\n",
+    ]
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 10, 20, 1000])
+def test_csv_chunks_split_on_row_boundaries(tmp_path, chunk_bytes):
+    chunks = list(csv_chunks(write(tmp_path, "data.csv", CSV), chunk_bytes))
+
+    # Each chunk parses on its own, with the header first
+    rows = []
+    for chunk in chunks:
+        parsed = list(reader(StringIO(chunk)))
+        assert parsed[0] == ["id", "note"]
+        rows.extend(parsed[1:])
+
+    assert rows == list(reader(StringIO(CSV)))[1:]
+    if chunk_bytes == 1:
+        assert len(chunks) == 4
+
+
+def test_csv_chunks_of_header_only_file(tmp_path):
+    assert list(csv_chunks(write(tmp_path, "data.csv", "id,note\n"), 10)) == []
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 40, 10**6])
+@pytest.mark.parametrize("block_size", [1, 2, 3, 7, 1024**2])
+def test_json_array_chunks_split_on_element_boundaries(
+    tmp_path, chunk_bytes, block_size
+):
+    # Strings are written as JSON, so backslashes and quotes land on every
+    # position of a block for some `block_size`
+    file_path = write(tmp_path, "data.json", "  \n" + dumps(ELEMENTS, indent=2))
+
+    chunks = list(json_array_chunks(file_path, chunk_bytes, block_size))
+
+    elements = []
+    for offset, chunk in chunks:
+        assert offset == len(elements)
+        elements.extend(loads(chunk))
+
+    assert elements == ELEMENTS
+    if chunk_bytes == 1:
+        assert len(chunks) == len(ELEMENTS)
+
+
+def test_json_array_elements(tmp_path):
+    file_path = write(tmp_path, "data.json", dumps(ELEMENTS))
+
+    assert [loads(text) for text in json_array_elements(file_path)] == ELEMENTS
+
+
+def test_json_array_chunks_of_empty_array(tmp_path):
+    assert list(json_array_chunks(write(tmp_path, "data.json", "[ ]"), 10)) == []
+
+
+@pytest.mark.parametrize("text", ['{"a": 1}', "[1, 2", ""])
+def test_json_array_chunks_reject_anything_but_an_array(tmp_path, text):
+    with pytest.raises(ValueError):
+        list(json_array_chunks(write(tmp_path, "data.json", text), 10))
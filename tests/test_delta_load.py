@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from csv import reader
+from io import StringIO
+from json import loads
+
+from rai_python_harness.delta_load import (
+    KEY_COLUMN,
+    DeltaSnapshots,
+    delta_command,
+    delta_data,
+    diff,
+    keyed_rows,
+)
+
+
+def write(tmp_path, name: str, text: str):
+    file_path = tmp_path / name
+    file_path.write_text(text)
+    return file_path
+
+
+def test_csv_rows_are_keyed_on_their_text(tmp_path):
+    first = dict(keyed_rows(write(tmp_path, "a.csv", "x,y\n1,2\n3,4\n1,2\n"), ".csv"))
+    moved = dict(keyed_rows(write(tmp_path, "b.csv", "x,y\n3,4\n1,2\n1,2\n"), ".csv"))
+
+    # Repeated rows get keys of their own, moving rows changes nothing
+    assert sorted(first.values()) == ["1,2", "1,2", "3,4"]
+    assert first == moved
+
+
+def test_json_elements_are_keyed_ignoring_formatting(tmp_path):
+    compact = write(tmp_path, "a.json", '[{"a":1,"b":[1,2]},"x"]')
+    formatted = write(tmp_path, "b.json", '[\n  "x",\n  { "b": [1, 2], "a": 1 }\n]')
+
+    assert set(dict(keyed_rows(compact, ".json"))) == set(
+        dict(keyed_rows(formatted, ".json"))
+    )
+
+
+def test_diff():
+    assert diff(["a", "b", "c"], ["b", "c", "d"]) == ({"d"}, {"a"})
+
+
+def test_delta_data_holds_only_the_given_keys(tmp_path):
+    data_path = write(tmp_path, "data.csv", 'x,y\n1,"a\nb"\n2,c\n')
+    keys = {key for key, text in keyed_rows(data_path, ".csv") if text == "2,c"}
+
+    rows = list(reader(StringIO(delta_data(data_path, ".csv", keys))))
+    assert rows == [[KEY_COLUMN, "x", "y"], [*keys, "2", "c"]]
+
+    rows = list(reader(StringIO(delta_data(data_path, ".csv"))))
+    assert [row[1:] for row in rows[1:]] == [["1", "a\nb"], ["2", "c"]]
+
+
+def test_delta_data_of_json(tmp_path):
+    data_path = write(tmp_path, "data.json", '[{"a": 1}, [2]]')
+
+    assert [element["value"] for element in loads(delta_data(data_path, ".json"))] == [
+        {"a": 1},
+        [2],
+    ]
+
+
+def test_delta_command():
+    partial = delta_command("sales", ".csv", full_reload=False)
+    deleted = "def delete:sales(col, key, v) = sales(col, key, v) and deleted_key(key)"
+    assert deleted in partial
+    assert "def delete:sales = sales" not in partial
+
+    full = delta_command("sales", ".csv", full_reload=True, schema={"x": "int"})
+    assert "def delete:sales = sales\n" in full
+    assert f':{KEY_COLUMN}, "string";\n    :x, "int"' in full
+
+    assert "def insert:events(key, x...)" in delta_command(
+        "events", ".json", full_reload=False
+    )
+
+
+def test_snapshots_are_kept_per_database_relation_and_file(tmp_path):
+    snapshots = DeltaSnapshots(tmp_path / "snapshots")
+    data_path = write(tmp_path, "data.csv", "x\n1\n")
+
+    assert snapshots.get("db", "rel", data_path) == (None, [])
+
+    snapshots.put("db", "rel", data_path, "hash", ["k1", "k2"])
+    assert snapshots.get("db", "rel", data_path) == ("hash", ["k1", "k2"])
+    assert snapshots.get("other_db", "rel", data_path) == (None, [])
+    assert DeltaSnapshots(tmp_path / "snapshots").get("db", "rel", data_path) == (
+        "hash",
+        ["k1", "k2"],
+    )
+
+    snapshots.clear()
+    assert snapshots.get("db", "rel", data_path) == (None, [])
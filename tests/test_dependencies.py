@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from pathlib import Path
+from threading import Lock
+from time import sleep
+
+import pytest
+
+from rai_python_harness.dependencies import (
+    cell_dependencies,
+    critical_path_lengths,
+    group_dependencies,
+    run_dependency_graph,
+    simulate_schedule,
+)
+from rai_python_harness.schema import Schema
+
+PROJECT_DIR = Path(__file__).parent / "project"
+
+
+def cell(index: int, type: str, **keys) -> dict:
+    return {"index": index, "type": type, **keys}
+
+
+def ancestors(dependencies: dict, index: int) -> set:
+    """Return every index `index` depends on, directly or not"""
+    found = set()
+    pending = list(dependencies[index])
+    while pending:
+        dep = pending.pop()
+        if dep not in found:
+            found.add(dep)
+            pending.extend(dependencies[dep])
+
+    return found
+
+
+def test_reads_depend_on_earlier_writes_and_writes_on_every_earlier_cell():
+    cells = [
+        cell(0, "data"),
+        cell(1, "install"),
+        cell(2, "query"),
+        cell(3, "query"),
+        cell(4, "update"),
+        cell(5, "query"),
+    ]
+    dependencies = cell_dependencies(cells)
+
+    assert dependencies[2] == {1}
+    assert dependencies[3] == {1}
+    assert dependencies[4] == {2, 3}
+    assert {index: ancestors(dependencies, index) for index in dependencies} == {
+        0: set(),
+        1: {0},
+        2: {0, 1},
+        3: {0, 1},
+        4: {0, 1, 2, 3},
+        5: {0, 1, 2, 3, 4},
+    }
+
+
+def test_depends_on_overrides_inferred_dependencies():
+    cells = [cell(0, "data"), cell(1, "data"), cell(2, "query", depends_on=[0])]
+
+    assert cell_dependencies(cells)[2] == {0}
+
+
+def test_readonly_sequence_has_no_dependencies():
+    queries = Schema(PROJECT_DIR / "test_queries.toml").get("queries")
+
+    assert all(not deps for deps in cell_dependencies(queries).values())
+
+
+def test_group_dependencies_collapses_groups_into_their_first_index():
+    dependencies = {0: set(), 1: {0}, 2: {0}, 3: {1, 2}}
+
+    assert group_dependencies(dependencies, [[0], [1, 2], [3]]) == {
+        0: set(),
+        1: {0},
+        3: {1},
+    }
+
+
+def test_critical_path_and_schedule():
+    dependencies = {0: set(), 1: {0}, 2: {0}, 3: {1}}
+    durations = {0: 1.0, 1: 2.0, 2: 5.0, 3: 2.0}
+
+    assert critical_path_lengths(dependencies, durations) == {
+        0: 6.0,
+        1: 4.0,
+        2: 5.0,
+        3: 2.0,
+    }
+    assert simulate_schedule(dependencies, durations, max_workers=1) == 10.0
+    assert simulate_schedule(dependencies, durations, max_workers=2) == 6.0
+
+
+def test_run_dependency_graph_starts_cells_once_their_dependencies_complete():
+    dependencies = {0: set(), 1: {0}, 2: {0}, 3: {1, 2}}
+    started, completed = [], []
+    lock = Lock()
+
+    def run_cell(index: int) -> None:
+        with lock:
+            assert dependencies[index] <= set(completed)
+            started.append(index)
+        sleep(0.01)
+
+    run_dependency_graph(dependencies, run_cell, 2, on_complete=completed.append)
+
+    assert started[0] == 0 and started[-1] == 3
+    assert sorted(completed) == [0, 1, 2, 3]
+
+
+def test_run_dependency_graph_stops_after_an_error():
+    dependencies = {0: set(), 1: {0}, 2: {1}}
+    started = []
+
+    def run_cell(index: int) -> None:
+        started.append(index)
+        if index == 1:
+            raise ValueError("cell 1 failed")
+
+    with pytest.raises(ValueError, match="cell 1 failed"):
+        run_dependency_graph(dependencies, run_cell, 2)
+
+    assert started == [0, 1]
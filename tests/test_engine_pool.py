@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from rai_python_harness.engine_pool import EnginePool
+
+
+def test_writes_always_run_on_the_primary_engine():
+    pool = EnginePool(["primary", "replica_1", "replica_2"])
+
+    with pool.acquire() as first, pool.acquire() as second:
+        assert first == second == "primary"
+
+    with pool.acquire(readonly=True) as engine:
+        assert engine != "primary"
+        with pool.acquire() as write_engine:
+            assert write_engine == "primary"
+
+
+def test_least_loaded_picks_the_engine_with_fewest_transactions_in_flight():
+    pool = EnginePool(["primary", "replica"])
+
+    with pool.acquire() as write_engine:
+        assert write_engine == "primary"
+        with pool.acquire(readonly=True) as first:
+            assert first == "replica"
+            # Both engines have one transaction in flight, so the least
+            # recently used one is picked
+            with pool.acquire(readonly=True) as second:
+                assert second == "primary"
+
+    # Nothing in flight, so ties are broken by least recent use
+    with pool.acquire(readonly=True) as engine:
+        assert engine == "replica"
+
+
+def test_least_recently_used_cycles_through_the_engines():
+    pool = EnginePool(["a", "b", "c"], "least_recently_used")
+
+    with pool.acquire(readonly=True) as first:
+        # Ignores load, unlike "least_loaded"
+        with pool.acquire(readonly=True) as second:
+            pass
+
+    engines = [first, second]
+    for _ in range(4):
+        with pool.acquire(readonly=True) as engine:
+            engines.append(engine)
+
+    assert engines == ["a", "b", "c", "a", "b", "c"]
+
+
+def test_utilization_counts_transactions_per_engine():
+    pool = EnginePool(["primary", "replica"])
+
+    for readonly in [False, False, True]:
+        with pool.acquire(readonly=readonly):
+            pass
+
+    utilization = pool.utilization(10.0)
+    assert utilization["primary"]["transactions"] == 2
+    assert utilization["replica"]["transactions"] == 1
+    assert 0.0 <= utilization["primary"]["utilization"] <= 1.0
+    assert pool.utilization(0.0)["primary"]["utilization"] == 0.0
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from railib import api
+
+from rai_python_harness.fan_out import FanOut, target_dir_name
+from rai_python_harness.schema import Schema
+
+PROJECT_DIR = Path(__file__).parent / "project"
+
+
+def test_target_dir_name():
+    assert target_dir_name("tenant/a", "engine 1") == "tenant_a__engine_1"
+
+
+def test_every_target_runs_the_sequence(fake_api, monkeypatch, tmp_path):
+    exec_cell = fake_api.exec
+    databases = []
+
+    def exec(context, database, *args, **kwargs):
+        databases.append(database)
+        if database == "tenant_b":
+            raise ConnectionRefusedError("tenant_b is down")
+        return exec_cell(context, database, *args, **kwargs)
+
+    monkeypatch.setattr(api, "exec", exec)
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    targets = [("tenant_a", "engine"), ("tenant_b", "engine"), ("tenant_c", "engine")]
+
+    errors = FanOut(
+        None,
+        Schema(PROJECT_DIR / "test_queries.toml"),
+        log_dir,
+        targets,
+        max_concurrency=2,
+    ).exec()
+
+    # A failed target does not stop the others
+    assert errors[("tenant_a", "engine")] is None
+    assert errors[("tenant_c", "engine")] is None
+    assert isinstance(errors[("tenant_b", "engine")], ConnectionRefusedError)
+    assert databases.count("tenant_a") == databases.count("tenant_c") == 5
+
+    for database, engine in targets:
+        assert (log_dir / target_dir_name(database, engine)).is_dir()
+    [summary] = log_dir.glob("*.log")
+    assert "tenant_b (engine): failed with" in summary.read_text()
+
+
+def test_targets_must_not_repeat(tmp_path):
+    with pytest.raises(SystemExit):
+        FanOut(
+            None,
+            Schema(PROJECT_DIR / "test_queries.toml"),
+            tmp_path,
+            [("tenant_a", "engine"), ("tenant_a", "engine")],
+        )
+
+
+def test_targets_must_not_share_a_log_directory(tmp_path):
+    with pytest.raises(SystemExit):
+        FanOut(
+            None,
+            Schema(PROJECT_DIR / "test_queries.toml"),
+            tmp_path,
+            [("tenant/a", "engine"), ("tenant_a", "engine")],
+        )
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import pytest
+
+from rai_python_harness.file_handles import FileHandles
+from rai_python_harness.utils import file_hash
+
+
+def test_files_are_mapped_once_and_released_after_the_last_reference(tmp_path):
+    file_path = tmp_path / "source.rel"
+    file_path.write_text("def output = 1")
+    handles = FileHandles({file_path: 2})
+
+    assert handles.read(file_path) == "def output = 1"
+    assert handles.hash(file_path) == file_hash(file_path)
+    [handle] = handles._handles.values()
+
+    # Served from the mapping, not the file
+    file_path.write_text("def output = 2")
+    assert handles.read(file_path) == "def output = 1"
+
+    handles.release(file_path)
+    assert not handle.closed
+    handles.release(file_path)
+    assert handle.closed and handles._handles == {}
+
+    # No longer referenced, so read directly
+    assert handles.read(file_path) == "def output = 2"
+    assert handles._handles == {}
+
+
+def test_unreferenced_files_are_read_directly(tmp_path):
+    file_path = tmp_path / "source.rel"
+    file_path.write_text("def output = 1")
+    handles = FileHandles({})
+
+    assert handles.read(file_path) == "def output = 1"
+    assert handles.hash(file_path) == file_hash(file_path)
+    handles.release(file_path)
+    assert handles._handles == {}
+
+
+def test_empty_and_missing_files(tmp_path):
+    empty, missing = tmp_path / "empty.rel", tmp_path / "missing.rel"
+    empty.write_text("")
+    handles = FileHandles({empty: 1, missing: 1})
+
+    assert handles.read(empty) == ""
+    assert handles.hash(empty) == file_hash(empty)
+    with pytest.raises(FileNotFoundError, match="missing.rel"):
+        handles.read(missing)
+
+
+def test_close_releases_every_file(tmp_path):
+    file_path = tmp_path / "source.rel"
+    file_path.write_text("def output = 1")
+    handles = FileHandles({file_path: 3})
+    handles.read(file_path)
+    [handle] = handles._handles.values()
+
+    handles.close()
+
+    assert handle.closed and handles._handles == {}
+    # Still referenced, so mapped again
+    file_path.write_text("def output = 2")
+    assert handles.read(file_path) == "def output = 2"
+    handles.close()
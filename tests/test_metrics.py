@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from rai_python_harness.metrics import (
+    CellMetrics,
+    MetricsRecorder,
+    payload_bytes,
+    prometheus_text,
+)
+
+
+def test_payload_bytes():
+    assert payload_bytes("def output = 1", None) == 14
+    assert payload_bytes("é", {"data": "ab", "n": 1}) == 5
+    assert payload_bytes(None, None) == 0
+
+
+def test_last_record_for_a_cell_wins(tmp_path):
+    recorder = MetricsRecorder(tmp_path / "metrics.jsonl")
+    toml_path = Path(tmp_path / "sequence.toml")
+
+    recorder.record_cell(toml_path, CellMetrics(0, "first", "QUERY", attempts=1))
+    recorder.record_cell(toml_path, CellMetrics(0, "first", "QUERY", attempts=3))
+    recorder.record_cell(toml_path, CellMetrics(1, "second", "QUERY"))
+    with open(tmp_path / "metrics.jsonl", "a") as f:
+        # Interrupted while appending a record
+        f.write('{"kind": "cell", "ind')
+
+    records = recorder.records()
+    assert [(record["index"], record["attempts"]) for record in records] == [
+        (0, 3),
+        (1, 1),
+    ]
+
+
+def test_label_values_are_escaped():
+    text = prometheus_text(
+        [{"kind": "sequence", "toml_path": 'C:\\a "b"\nc', "seconds": 1.5, "cells": 2}]
+    )
+
+    assert 'rai_harness_sequence_seconds{toml_path="C:\\\\a \\"b\\"\\nc"} 1.5' in text
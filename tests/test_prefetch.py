@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from threading import Event
+from time import monotonic, sleep
+
+import pytest
+
+from rai_python_harness.prefetch import Prefetcher
+
+
+def write_files(tmp_path, *names: str, size: int = 10) -> list:
+    file_paths = []
+    for name in names:
+        file_path = tmp_path / name
+        file_path.write_text(name[0] * size)
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = monotonic() + timeout
+    while not condition():
+        assert monotonic() < deadline, "timed out"
+        sleep(0.01)
+
+
+class CountingReader:
+    """Reads files, recording the path of each read"""
+
+    def __init__(self) -> None:
+        self.reads = []
+
+    def __call__(self, file_path):
+        self.reads.append(file_path.name)
+        return file_path.read_text()
+
+
+def test_files_are_read_once_in_order_and_released_after_last_use(tmp_path):
+    a, b, c = write_files(tmp_path, "a.rel", "b.rel", "c.rel")
+    read = CountingReader()
+    prefetcher = Prefetcher({a: 2, b: 1, c: 1}, max_workers=1, read=read)
+
+    prefetcher.prefetch([a, b, c])
+    wait_for(lambda: len(read.reads) == 3)
+    assert read.reads == ["a.rel", "b.rel", "c.rel"]
+
+    assert prefetcher.get(a) == "a" * 10
+    assert prefetcher.get(a) == "a" * 10
+    assert prefetcher.get(b) == "b" * 10
+    assert read.reads == ["a.rel", "b.rel", "c.rel"]
+
+    # Released after its last use, so read again
+    assert prefetcher.get(a) == "a" * 10
+    assert read.reads[-1] == "a.rel"
+    prefetcher.close()
+
+
+def test_prefetching_stops_at_the_first_file_over_max_bytes(tmp_path):
+    a, b, c = write_files(tmp_path, "a.rel", "b.rel", "c.rel")
+    read = CountingReader()
+    prefetcher = Prefetcher({a: 1, b: 1, c: 1}, max_bytes=25, read=read)
+
+    prefetcher.prefetch([a, b, c])
+    wait_for(lambda: len(read.reads) == 2)
+    sleep(0.05)
+    assert sorted(read.reads) == ["a.rel", "b.rel"]
+
+    # Releasing `a` makes room for `c`
+    prefetcher.get(a)
+    prefetcher.prefetch([c])
+    wait_for(lambda: "c.rel" in read.reads)
+    assert prefetcher.get(c) == "c" * 10
+    assert read.reads.count("c.rel") == 1
+    prefetcher.close()
+
+
+def test_failed_reads_are_raised_by_get(tmp_path):
+    [a] = write_files(tmp_path, "a.rel")
+    started = Event()
+
+    def read(file_path):
+        started.set()
+        raise PermissionError(f"can not read '{file_path.name}'")
+
+    prefetcher = Prefetcher({a: 1}, read=read)
+    prefetcher.prefetch([a])
+    assert started.wait(5)
+
+    with pytest.raises(PermissionError, match="a.rel"):
+        prefetcher.get(a)
+    prefetcher.close()
+
+
+def test_missing_files_are_not_prefetched(tmp_path):
+    missing = tmp_path / "missing.rel"
+    read = CountingReader()
+    prefetcher = Prefetcher({missing: 1}, read=read)
+
+    prefetcher.prefetch([missing])
+    sleep(0.05)
+    assert read.reads == []
+
+    with pytest.raises(FileNotFoundError):
+        prefetcher.get(missing)
+    prefetcher.close()
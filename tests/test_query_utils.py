@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+from json import loads
+
+import pyarrow
+import pytest
+from railib import api
+
+from rai_python_harness.delta_load import KEY_COLUMN, DeltaSnapshots, keyed_rows
+from rai_python_harness.query_utils import (
+    cell_namespace,
+    chunked_data_query,
+    combine_query_sources,
+    delta_data_query,
+    group_adjacent_cells,
+    sharded_data_query,
+    split_install_result,
+    split_query_result,
+    transaction_succeeded,
+)
+from rai_python_harness.sequence_logger import SequenceLogger
+
+
+def batched_response(relation_ids):
+    """Return an `api.exec` response holding a one-row relation per id"""
+    return api.TransactionAsyncResponse(
+        {"id": "txn", "state": "COMPLETED"},
+        None,
+        [
+            {"relationId": relation_id, "table": pyarrow.table({"v1": [position]})}
+            for position, relation_id in enumerate(relation_ids)
+        ],
+        [],
+    )
+
+
+def test_combine_query_sources_wraps_each_source_in_a_module():
+    combined = combine_query_sources(
+        {
+            cell_namespace(1): "def output = 1",
+            cell_namespace(2): 'def output = "two"',
+        }
+    )
+
+    assert combined == (
+        "module harness_cell_1\ndef output = 1\nend\n\n"
+        "def output:harness_cell_1 = harness_cell_1:output\n\n"
+        'module harness_cell_2\ndef output = "two"\nend\n\n'
+        "def output:harness_cell_2 = harness_cell_2:output"
+    )
+
+
+def test_split_query_result_keeps_relations_of_its_cell():
+    result = batched_response(
+        [
+            "/:output/:harness_cell_1/Int64",
+            "/:output/:harness_cell_1/:total/Float64",
+            "/:output/:harness_cell_12/Int64",
+            "/:output/:harness_cell_2/String",
+        ]
+    )
+
+    cell_result = split_query_result(result, cell_namespace(1))
+
+    assert [rel["relationId"] for rel in cell_result.results] == [
+        "/:output/Int64",
+        "/:output/:total/Float64",
+    ]
+    assert [rel["table"]["v1"][0].as_py() for rel in cell_result.results] == [0, 1]
+    assert cell_result.transaction is result.transaction
+    assert cell_result.problems is result.problems
+
+
+def test_split_query_result_matches_namespaces_without_a_colon():
+    result = batched_response(
+        ["/:output/harness_cell_3/Int64", "/:output/harness_cell_4/Int64"]
+    )
+
+    cell_result = split_query_result(result, cell_namespace(4))
+
+    assert [rel["relationId"] for rel in cell_result.results] == ["/:output/Int64"]
+    assert cell_result.results[0]["table"]["v1"][0].as_py() == 1
+
+
+def test_split_query_result_of_a_cell_without_output():
+    result = batched_response(["/:output/:harness_cell_1/Int64"])
+
+    assert split_query_result(result, cell_namespace(5)).results == []
+
+
+def test_split_query_result_passes_other_results_through():
+    result = {"aborted": False, "output": [], "problems": []}
+
+    assert split_query_result(result, cell_namespace(1)) is result
+
+
+def test_transaction_succeeded():
+    assert transaction_succeeded(batched_response([]))
+    assert not transaction_succeeded(
+        api.TransactionAsyncResponse({"state": "ABORTED"}, None, [], [])
+    )
+    assert not transaction_succeeded({"aborted": True, "problems": []})
+    assert not transaction_succeeded(None)
+
+
+def cell(index: int, type: str, file_path: str = None, **keys) -> dict:
+    return {
+        "index": index,
+        "type": type,
+        "file_path": file_path or f"cell_{index}.rel",
+        **keys,
+    }
+
+
+def grouped_indices(groups):
+    return [[qry["index"] for qry in group] for group in groups]
+
+
+def test_group_adjacent_cells():
+    cells = [
+        cell(0, "data"),
+        cell(1, "install"),
+        cell(2, "install"),
+        cell(3, "query"),
+        cell(4, "query", inputs=[{"x": "1"}]),
+        cell(5, "query"),
+        cell(6, "query"),
+    ]
+
+    assert grouped_indices(group_adjacent_cells(cells, ["INSTALL", "QUERY"])) == [
+        [0],
+        [1, 2],
+        [3],
+        [4],
+        [5, 6],
+    ]
+    assert grouped_indices(group_adjacent_cells(cells, ["INSTALL"])) == [
+        [0],
+        [1, 2],
+        [3],
+        [4],
+        [5],
+        [6],
+    ]
+
+
+def test_group_adjacent_cells_caps_group_size():
+    cells = [cell(index, "install") for index in range(5)]
+
+    assert grouped_indices(group_adjacent_cells(cells, ["INSTALL"], 2)) == [
+        [0, 1],
+        [2, 3],
+        [4],
+    ]
+
+
+def test_group_adjacent_cells_splits_installs_on_repeated_model_names():
+    cells = [
+        cell(0, "install", "a/model.rel"),
+        cell(1, "install", "other.rel"),
+        cell(2, "install", "b/model.rel"),
+        cell(3, "install", "last.rel"),
+    ]
+
+    assert grouped_indices(group_adjacent_cells(cells, ["INSTALL"])) == [
+        [0, 1],
+        [2, 3],
+    ]
+
+
+def test_split_install_result_keeps_the_action_of_its_model():
+    result = {
+        "actions": [{"name": f"action{i}", "result": {"i": i}} for i in range(3)],
+        "output": [],
+        "problems": [{"is_error": False, "message": "a warning"}],
+        "aborted": False,
+    }
+
+    assert split_install_result(result, 1) == {
+        **result,
+        "actions": [{"name": "action1", "result": {"i": 1}}],
+    }
+    assert split_install_result(None, 1) is None
+
+
+@pytest.fixture
+def logger(tmp_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    logger = SequenceLogger(log_dir)
+    yield logger
+    logger.close()
+
+
+def test_chunked_data_query_of_csv(fake_api, logger, tmp_path):
+    data_path = tmp_path / "sales.csv"
+    data_path.write_text('id,note\n1,"a\nb"\n2,c\n')
+
+    result = chunked_data_query(
+        None, "db", "engine", data_path, "sales", logger, ".csv", 1, 1, {"id": "int"}
+    )
+
+    assert fake_api.calls == [
+        (
+            "exec_v1",
+            "def config:data = data\n"
+            'def config:schema = {\n    :id, "int"\n}\n'
+            "def insert:sales(col, chunk, pos, v) = "
+            f"load_csv[config](col, pos, v) and chunk = {ordinal}",
+            {"data": data},
+        )
+        for ordinal, data in enumerate(['id,note\n1,"a\nb"\n', "id,note\n2,c\n"])
+    ]
+    assert not result["aborted"] and len(result["chunks"]) == 2
+
+
+def test_chunked_data_query_of_json(fake_api, logger, tmp_path):
+    data_path = tmp_path / "events.json"
+    data_path.write_text('[{"a": 1}, {"b": [2]}, "c"]')
+
+    chunked_data_query(None, "db", "engine", data_path, "events", logger, ".json", 1, 1)
+
+    commands = [command for _, command, _ in fake_api.calls]
+    assert commands == [
+        "def config:data = data\n"
+        "def insert:events(:[], i, x...) = "
+        f"load_json[config](:[], j, x...) and i = j + {offset}"
+        for offset in [0, 1, 2]
+    ]
+    assert [loads(inputs["data"]) for _, _, inputs in fake_api.calls] == [
+        [{"a": 1}],
+        [{"b": [2]}],
+        ["c"],
+    ]
+
+
+def test_sharded_data_query_of_csv(fake_api, logger, tmp_path):
+    shard_paths = [tmp_path / "part-1.csv", tmp_path / "part-2.csv"]
+    for position, shard_path in enumerate(shard_paths):
+        shard_path.write_text(f"id\n{position}\n")
+
+    result = sharded_data_query(
+        None, "db", "engine", shard_paths, "sales", logger, ".csv", 1, {"id": "int"}
+    )
+
+    assert fake_api.calls == [
+        (
+            "exec_v1",
+            "def config:data = data\n"
+            'def config:schema = {\n    :id, "int"\n}\n'
+            "def insert:sales(col, shard, pos, v) = "
+            f'load_csv[config](col, pos, v) and shard = "part-{position + 1}.csv"',
+            {"data": f"id\n{position}\n"},
+        )
+        for position in range(2)
+    ]
+    assert list(result["shards"]) == ["part-1.csv", "part-2.csv"]
+
+
+def test_sharded_data_query_of_json(fake_api, logger, tmp_path):
+    shard_path = tmp_path / "events.json"
+    shard_path.write_text('[{"a": 1}]')
+
+    sharded_data_query(None, "db", "engine", [shard_path], "events", logger, ".json")
+
+    assert fake_api.calls == [
+        (
+            "exec_v1",
+            "def config:data = data\n"
+            "def insert:events(shard, x...) = "
+            'load_json[config](x...) and shard = "events.json"',
+            {"data": '[{"a": 1}]'},
+        )
+    ]
+
+
+def test_delta_data_query_of_csv(fake_api, logger, tmp_path):
+    snapshots = DeltaSnapshots(tmp_path / "snapshots")
+    data_path = tmp_path / "sales.csv"
+    data_path.write_text("id,amount\n1,10\n2,20\n3,30\n4,40\n5,50\n")
+
+    first = delta_data_query(
+        None, "db", "engine", data_path, "sales", logger, ".csv", snapshots
+    )
+    [(_, command, inputs)] = fake_api.calls
+
+    assert first["delta"]["full_reload"] and first["delta"]["inserted"] == 5
+    assert command.startswith("def config:data = data\ndef delete:sales = sales\n")
+    assert f"rows(:{KEY_COLUMN}, pos, key)" in command
+    assert inputs["data"].splitlines()[0] == f"{KEY_COLUMN},id,amount"
+    assert len(inputs["data"].splitlines()) == 6
+
+    # Unchanged files are not uploaded
+    unchanged = delta_data_query(
+        None, "db", "engine", data_path, "sales", logger, ".csv", snapshots
+    )
+    assert unchanged["delta"]["bytes_uploaded"] == 0 and len(fake_api.calls) == 1
+
+    old_keys = dict((text, key) for key, text in keyed_rows(data_path, ".csv"))
+    data_path.write_text("id,amount\n1,10\n2,20\n3,30\n4,40\n6,60\n")
+    second = delta_data_query(
+        None, "db", "engine", data_path, "sales", logger, ".csv", snapshots, 0.5
+    )
+    _, command, inputs = fake_api.calls[-1]
+
+    assert second["delta"] == {
+        "inserted": 1,
+        "deleted": 1,
+        "full_reload": False,
+        "bytes_uploaded": second["delta"]["bytes_uploaded"],
+    }
+    assert "def delete:sales = sales" not in command
+    assert "deleted_key(key)" in command
+    [_, row] = inputs["data"].splitlines()
+    assert row.endswith(",6,60")
+    assert loads(inputs["deleted"]) == [old_keys["5,50"]]
+
+
+def test_delta_data_query_of_json(fake_api, logger, tmp_path):
+    snapshots = DeltaSnapshots(tmp_path / "snapshots")
+    data_path = tmp_path / "events.json"
+    data_path.write_text('[{"a": 1}, {"b": 2}, {"c": 3}]')
+
+    delta_data_query(
+        None, "db", "engine", data_path, "events", logger, ".json", snapshots
+    )
+    # Formatting changes nothing, so only {"d": 4} is inserted
+    data_path.write_text('[\n  {"a": 1},\n  {"b": 2},\n  {"c": 3},\n  {"d": 4}\n]')
+    result = delta_data_query(
+        None, "db", "engine", data_path, "events", logger, ".json", snapshots, 0.5
+    )
+
+    (_, full, full_inputs), (_, partial, partial_inputs) = fake_api.calls
+    assert "def delete:events = events" in full
+    assert "rows(:[], i, :key, key)" in full
+    assert [element["value"] for element in loads(full_inputs["data"])] == [
+        {"a": 1},
+        {"b": 2},
+        {"c": 3},
+    ]
+
+    assert "def delete:events = events" not in partial
+    assert [element["value"] for element in loads(partial_inputs["data"])] == [{"d": 4}]
+    assert loads(partial_inputs["deleted"]) == []
+    assert result["delta"]["inserted"] == 1 and not result["delta"]["full_reload"]
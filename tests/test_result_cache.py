@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from os import utime
+
+import pyarrow
+from railib import api
+from railib.pb.message_pb2 import MetadataInfo
+
+from rai_python_harness.result_cache import ENTRY_SUFFIX, ResultCache
+
+
+def response(rows: int = 3, metadata=None) -> api.TransactionAsyncResponse:
+    return api.TransactionAsyncResponse(
+        {"id": "txn", "state": "COMPLETED"},
+        metadata,
+        [
+            {
+                "relationId": "/:output/Int64",
+                "table": pyarrow.table({"v1": list(range(rows))}),
+            },
+            {
+                "relationId": "/:output/:names/String",
+                "table": pyarrow.table({"v1": ["a", 'quoted "b"', "c\r\nd"]}),
+            },
+        ],
+        [{"type": "ClientProblem", "is_error": False, "message": "a warning"}],
+    )
+
+
+def test_put_then_get(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put("key", response(metadata=MetadataInfo()))
+
+    cached = cache.get("key")
+
+    assert cached.transaction == {"id": "txn", "state": "COMPLETED"}
+    assert cached.problems == response().problems
+    assert isinstance(cached.metadata, MetadataInfo)
+    assert [
+        (relation["relationId"], relation["table"].to_pydict())
+        for relation in cached.results
+    ] == [
+        (relation["relationId"], relation["table"].to_pydict())
+        for relation in response().results
+    ]
+
+
+def test_miss(tmp_path):
+    assert ResultCache(tmp_path).get("key") is None
+
+
+def test_unreadable_entries_are_removed(tmp_path):
+    cache = ResultCache(tmp_path)
+    entry = tmp_path / f"key{ENTRY_SUFFIX}"
+
+    for contents in [b"", b"not an entry", b"--boundary\r\n"]:
+        entry.write_bytes(contents)
+        assert cache.get("key") is None
+        assert not entry.exists()
+
+
+def test_entries_are_not_pickles(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put("key", response())
+
+    body = (tmp_path / f"key{ENTRY_SUFFIX}").read_bytes()
+    assert body.startswith(b"--")
+    assert b'name="transaction"' in body
+    assert b"application/vnd.apache.arrow.stream" in body
+
+
+def test_other_results_are_not_cached(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put("key", {"output": [], "problems": []})
+
+    assert cache.get("key") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put("first", response())
+    entry_bytes = (tmp_path / f"first{ENTRY_SUFFIX}").stat().st_size
+    cache.max_bytes = 2 * entry_bytes
+
+    cache.put("second", response())
+    # Make "first" the most recently used
+    utime(tmp_path / f"second{ENTRY_SUFFIX}", (0, 0))
+    assert cache.get("first") is not None
+
+    cache.put("third", response())
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+
+def test_clear(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put("key", response())
+    cache.clear()
+
+    assert cache.get("key") is None
+
+
+def test_database_fingerprints_outlive_the_cache(tmp_path):
+    cache = ResultCache(tmp_path)
+    assert cache.database_fingerprint("db") == ""
+
+    cache.set_database_fingerprint("db", "abc")
+    cache.set_database_fingerprint("other_db", "def")
+
+    reopened = ResultCache(tmp_path)
+    assert reopened.database_fingerprint("db") == "abc"
+    assert reopened.database_fingerprint("other_db") == "def"
+
+    # Cleared entries keep the fingerprints
+    reopened.clear()
+    assert ResultCache(tmp_path).database_fingerprint("db") == "abc"
+
+
+def test_key_depends_on_every_part():
+    key = ResultCache.key("db", "def output = 1", None, "")
+
+    assert key == ResultCache.key("db", "def output = 1", None, "")
+    assert key != ResultCache.key("other_db", "def output = 1", None, "")
+    assert key != ResultCache.key("db", "def output = 2", None, "")
+    assert key != ResultCache.key("db", "def output = 1", {"x": "1"}, "")
+    assert key != ResultCache.key("db", "def output = 1", None, "abc")
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from io import BytesIO
+from mmap import mmap
+from types import SimpleNamespace
+
+import pyarrow
+import pytest
+from pyarrow import ipc
+from railib import rest
+from railib.pb.message_pb2 import MetadataInfo
+
+from rai_python_harness.result_spill import (
+    ARROW_STREAM,
+    multipart_parts,
+    parse_results,
+    spilled_exec,
+    spool,
+)
+
+BOUNDARY = "b0undary"
+CONTENT_TYPE = f'multipart/form-data; boundary="{BOUNDARY}"'
+
+
+def arrow_stream(table: pyarrow.Table) -> bytes:
+    sink = pyarrow.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def multipart(*parts) -> bytes:
+    """Return a multipart body of each (name, content type, contents) in `parts`"""
+    body = b""
+    for name, content_type, contents in parts:
+        body += (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        body += contents + b"\r\n"
+
+    return body + f"--{BOUNDARY}--\r\n".encode("utf-8")
+
+
+def test_small_bodies_are_kept_in_memory():
+    body = spool(BytesIO(b"x" * 100), memory_bytes=100, chunk_size=7)
+
+    assert body == b"x" * 100
+
+
+def test_large_bodies_are_spilled_to_disk(tmp_path):
+    body = spool(BytesIO(b"x" * 100), memory_bytes=10, spill_dir=tmp_path, chunk_size=7)
+
+    assert isinstance(body, mmap)
+    assert body[:] == b"x" * 100
+    # The temporary file is deleted once mapped
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_multipart_parts():
+    body = multipart(
+        ("transaction", "application/json", b'{"id": "txn"}'),
+        ("problems", "application/json", b"[]"),
+    )
+
+    parts = multipart_parts(body, CONTENT_TYPE)
+
+    assert [(name, part_type) for name, part_type, _, _ in parts] == [
+        ("transaction", "application/json"),
+        ("problems", "application/json"),
+    ]
+    assert [body[start:end] for _, _, start, end in parts] == [b'{"id": "txn"}', b"[]"]
+
+
+@pytest.mark.parametrize("spilled", [False, True])
+def test_parse_results(tmp_path, spilled):
+    table = pyarrow.table({"v1": [1, 2, 3], "v2": ["a", "b\r\n--", "c"]})
+    body = multipart(
+        ("transaction", "application/json", b'{"id": "txn"}'),
+        ("/:output/Int64/String", ARROW_STREAM, arrow_stream(table)),
+        ("problems", "application/json", b"[]"),
+    )
+    if spilled:
+        body = spool(BytesIO(body), memory_bytes=0, spill_dir=tmp_path)
+
+    parts = parse_results(body, CONTENT_TYPE)
+
+    assert parts["transaction"] == b'{"id": "txn"}'
+    assert parts["problems"] == b"[]"
+    [relation] = parts["results"]
+    assert relation["relationId"] == "/:output/Int64/String"
+    assert relation["table"].to_pydict() == table.to_pydict()
+
+
+class Response(BytesIO):
+    """A `rest.post` response, with its `headers`"""
+
+    def __init__(self, body: bytes, content_type: str) -> None:
+        super().__init__(body)
+        self.headers = {"content-type": content_type}
+
+
+@pytest.fixture
+def completed_transaction(monkeypatch):
+    """Answer `rest.post` with a completed transaction holding `table`, recording
+    each request's URL and data"""
+    table = pyarrow.table({"v1": list(range(1000))})
+    requests = []
+
+    def post(context, url, data):
+        requests.append((url, data))
+        return Response(
+            multipart(
+                (
+                    "transaction",
+                    "application/json",
+                    b'{"id": "txn", "state": "COMPLETED"}',
+                ),
+                (
+                    "metadata.proto",
+                    "application/x-protobuf",
+                    MetadataInfo().SerializeToString(),
+                ),
+                ("/:output/Int64", ARROW_STREAM, arrow_stream(table)),
+                ("problems", "application/json", b"[]"),
+            ),
+            CONTENT_TYPE,
+        )
+
+    monkeypatch.setattr(rest, "post", post)
+    return SimpleNamespace(table=table, requests=requests)
+
+
+def test_spilled_exec(completed_transaction, tmp_path):
+    context = SimpleNamespace(scheme="https", host="example.com", port=443)
+
+    result = spilled_exec(
+        context,
+        "db",
+        "engine",
+        "def output = x",
+        inputs={"x": "1"},
+        memory_bytes=0,
+        spill_dir=tmp_path,
+    )
+
+    [(url, data)] = completed_transaction.requests
+    assert url == "https://example.com:443/transactions"
+    assert data["query"] == "def output = x" and data["readonly"]
+    assert len(data["v1_inputs"]) == 1
+
+    assert result.transaction == {"id": "txn", "state": "COMPLETED"}
+    assert result.problems == []
+    [relation] = result.results
+    assert relation["relationId"] == "/:output/Int64"
+    assert relation["table"].to_pydict() == completed_transaction.table.to_pydict()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from gzip import open as gzip_open
+from json import loads
+
+import pyarrow
+import pytest
+from pyarrow import feather, parquet
+from railib import api
+
+from rai_python_harness.metrics import CellMetrics
+from rai_python_harness.result_writer import (
+    relation_tables,
+    write_columnar,
+    write_json,
+)
+
+
+def response() -> api.TransactionAsyncResponse:
+    return api.TransactionAsyncResponse(
+        {"id": "txn"},
+        None,
+        [
+            {
+                "relationId": "/:output/Int64/String",
+                "table": pyarrow.table({"v1": [1, 2], "v2": ["a", "b"]}),
+            }
+        ],
+        [],
+    )
+
+
+V1_RESPONSE = {
+    "output": [
+        {
+            "rel_key": {"name": "output", "keys": [":names"], "values": ["Int64"]},
+            "columns": [["names"], [7]],
+        }
+    ],
+    "problems": [],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 64 * 1024])
+def test_write_json_of_a_response(tmp_path, chunk_size):
+    metrics = CellMetrics(0, "query", "QUERY")
+    write_json(
+        response(), tmp_path / "result.json", chunk_size=chunk_size, metrics=metrics
+    )
+
+    assert loads((tmp_path / "result.json").read_text()) == {
+        "transaction": {"id": "txn"},
+        "metadata": None,
+        "results": [
+            {
+                "relationId": "/:output/Int64/String",
+                "table": {"columns": ["v1", "v2"], "rows": [[1, "a"], [2, "b"]]},
+            }
+        ],
+        "problems": [],
+    }
+    assert {"serialize", "write"} <= set(metrics.phases)
+
+
+def test_write_json_compressed(tmp_path):
+    write_json(V1_RESPONSE, tmp_path / "result.json.gz", compression="gzip")
+
+    with gzip_open(tmp_path / "result.json.gz", "rt") as f:
+        assert loads(f.read()) == V1_RESPONSE
+
+
+def test_write_json_rejects_unknown_compression(tmp_path):
+    with pytest.raises(ValueError):
+        write_json(V1_RESPONSE, tmp_path / "result.json", compression="lz4")
+
+
+def test_relation_tables_of_v1_responses():
+    [(relation_id, table)] = relation_tables(V1_RESPONSE)
+
+    assert relation_id == "/:output/:names/Int64"
+    assert table.to_dict("list") == {"v1": ["names"], "v2": [7]}
+    assert list(relation_tables({"problems": []})) == []
+
+
+@pytest.mark.parametrize(
+    "result_format, read",
+    [("parquet", parquet.read_table), ("feather", feather.read_table)],
+)
+def test_write_columnar(tmp_path, result_format, read):
+    file_path = tmp_path / "4-query.json"
+
+    [table_path] = write_columnar(response(), file_path, result_format)
+
+    assert table_path == tmp_path / f"4-query_output_Int64_String.{result_format}"
+    assert read(str(table_path)).to_pydict() == {"v1": [1, 2], "v2": ["a", "b"]}
+    assert loads(file_path.read_text())["results"] == [
+        {"relationId": "/:output/Int64/String", "path": str(table_path)}
+    ]
+
+
+def test_write_columnar_of_v1_responses(tmp_path):
+    file_path = tmp_path / "4-query.json"
+
+    [table_path] = write_columnar(V1_RESPONSE, file_path, "parquet")
+
+    assert parquet.read_table(str(table_path)).to_pydict() == {
+        "v1": ["names"],
+        "v2": [7],
+    }
+    summary = loads(file_path.read_text())
+    assert summary["output"] == [
+        {"relationId": "/:output/:names/Int64", "path": str(table_path)}
+    ]
+    assert summary["problems"] == []
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from io import BytesIO
+from threading import Lock
+from time import sleep
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+from rai_python_harness.retry import (
+    LatencyTracker,
+    RetryPolicy,
+    call_with_retries,
+    first_response,
+    is_transient,
+)
+
+
+def http_error(code: int) -> HTTPError:
+    return HTTPError("https://example.com", code, "", {}, BytesIO())
+
+
+@pytest.mark.parametrize(
+    "exc, transient",
+    [
+        (http_error(503), True),
+        (http_error(429), True),
+        (http_error(400), False),
+        (http_error(404), False),
+        (URLError("unreachable"), True),
+        (ConnectionResetError(), True),
+        (TimeoutError(), True),
+        (ValueError(), False),
+    ],
+)
+def test_is_transient(exc, transient):
+    assert is_transient(exc) == transient
+
+
+def test_delay_is_capped_full_jitter():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt) <= min(5.0, 2**attempt)
+
+
+def test_timeout():
+    assert RetryPolicy().timeout(10.0) is None
+    assert RetryPolicy(timeout_multiplier=3).timeout(None) is None
+    assert RetryPolicy(timeout_multiplier=3, min_timeout=60).timeout(10.0) == 60
+    assert RetryPolicy(timeout_multiplier=3, min_timeout=60).timeout(100.0) == 300
+
+
+def test_percentile_needs_enough_samples():
+    tracker = LatencyTracker(window=10, min_samples=5)
+    for seconds in range(4):
+        tracker.record("query", float(seconds))
+    assert tracker.percentile("query", 50) is None
+
+    # The window keeps the last 10 samples, 10 through 19
+    for seconds in range(4, 20):
+        tracker.record("query", float(seconds))
+    assert tracker.percentile("query", 50) == 15.0
+    assert tracker.percentile("query", 100) == 19.0
+    assert tracker.percentile("update", 50) is None
+
+
+def counted(*outcomes):
+    """Return a call returning (or raising) each of `outcomes` in turn, and its calls"""
+    calls = []
+    lock = Lock()
+
+    def call():
+        with lock:
+            calls.append(len(calls))
+            outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+
+        if isinstance(outcome, float):
+            sleep(outcome)
+            return outcome
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return call, calls
+
+
+def test_first_response_times_out():
+    call, _ = counted(1.0)
+
+    with pytest.raises(TimeoutError):
+        first_response(call, timeout=0.05)
+
+
+def test_first_response_hedges_slow_calls():
+    call, calls = counted(1.0, "hedged")
+    hedges = []
+
+    result = first_response(call, hedge_after=0.05, on_hedge=lambda: hedges.append(1))
+
+    assert result == "hedged"
+    assert len(calls) == 2 and hedges == [1]
+
+
+def test_first_response_reports_the_last_failure():
+    calls = []
+
+    def call():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            sleep(0.1)
+            raise ConnectionResetError("first")
+        raise ConnectionResetError("second")
+
+    with pytest.raises(ConnectionResetError, match="second"):
+        first_response(call, hedge_after=0.01)
+    assert len(calls) == 2
+
+
+def test_transient_errors_are_retried():
+    call, calls = counted(http_error(503), URLError("unreachable"), "done")
+    retries = []
+
+    result = call_with_retries(
+        call,
+        RetryPolicy(max_attempts=3, base_delay=0.0),
+        on_retry=lambda attempt, exc, delay: retries.append(attempt),
+    )
+
+    assert result == "done"
+    assert len(calls) == 3
+    assert retries == [2, 3]
+
+
+def test_retries_stop_after_max_attempts():
+    call, calls = counted(http_error(503))
+
+    with pytest.raises(HTTPError):
+        call_with_retries(call, RetryPolicy(max_attempts=2, base_delay=0.0))
+
+    assert len(calls) == 2
+
+
+def test_other_errors_are_not_retried():
+    call, calls = counted(http_error(400), "done")
+
+    with pytest.raises(HTTPError):
+        call_with_retries(call, RetryPolicy(max_attempts=3, base_delay=0.0))
+
+    assert len(calls) == 1
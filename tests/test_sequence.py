@@ -0,0 +1,526 @@
+from __future__ import annotations
+
+from io import BytesIO
+from json import dumps, loads
+from pathlib import Path
+from types import SimpleNamespace
+from time import sleep
+
+import pyarrow
+import pytest
+from pyarrow import ipc
+from railib import api, rest
+
+from rai_python_harness.delta_load import DeltaSnapshots
+from rai_python_harness.prefetch import Prefetcher
+from rai_python_harness.result_cache import ResultCache
+from rai_python_harness.retry import RetryPolicy
+from rai_python_harness.schema import Schema
+from rai_python_harness.sequence import Sequence
+from rai_python_harness.sequence_logger import SequenceLogger
+from rai_python_harness.timing_store import TimingStore
+
+PROJECT_DIR = Path(__file__).parent / "project"
+
+
+def run_sequence(log_dir: Path, toml_path: Path, **kwargs) -> Sequence:
+    """Run the sequence of `toml_path`, logging to `log_dir`"""
+    log_dir.mkdir()
+    sequence = Sequence(None, Schema(toml_path), SequenceLogger(log_dir), **kwargs)
+    sequence.database = "database"
+    sequence.engine = "engine"
+    sequence.exec()
+    return sequence
+
+
+def test_failed_query_batch_runs_each_cell_once(fake_api, tmp_path):
+    # Aborts the batch, as well as the cell running `fc_query_sum-w-max.rel` alone
+    fake_api.abort_on = Path(
+        PROJECT_DIR / "rel/fc_example/fc_query_sum-w-max.rel"
+    ).read_text()
+
+    sequence = run_sequence(
+        tmp_path / "logs", PROJECT_DIR / "test_queries.toml", batch_queries=True
+    )
+
+    batches = [c for c in fake_api.calls if "module harness_cell_" in c[1]]
+    singles = [c for c in fake_api.calls if "module harness_cell_" not in c[1]]
+    assert len(batches) == 1
+    assert len(singles) == 5
+
+    log = sequence.log_path().read_text()
+    for index, name in [
+        (1, "FC_player"),
+        (2, "FC_sum_w_max"),
+        (3, "FC_empty_relation_example"),
+        (4, "MI_mock_investments_by_company"),
+        (5, "MI_total_mock_investments"),
+    ]:
+        assert log.count(f"{index}: {name} (QUERY)") == 1
+
+    # Cells are logged (and their results written) in order
+    headers = [log.index(f"{index}: ") for index in range(1, 6)]
+    assert headers == sorted(headers)
+    assert len(list(sequence.log_dir().glob("*.json"))) == 5
+
+
+def write_project(project_dir: Path, *cells: dict) -> Path:
+    """Write a sequence of `cells`, each a `dict` of TOML keys plus its `source`,
+    returning the path of its TOML file"""
+    (project_dir / "data").mkdir(parents=True)
+    (project_dir / "rel").mkdir()
+    entries = []
+
+    for index, cell in enumerate(cells):
+        cell = dict(cell)
+        Path(project_dir / "rel" / f"cell_{index}.rel").write_text(cell.pop("source"))
+        keys = {"name": f"cell_{index}", "file_path": f"cell_{index}.rel", **cell}
+        entries.append(
+            "[[queries]]\n"
+            + "".join(f"{key} = {dumps(value)}\n" for key, value in keys.items())
+            + f"index = {index}\n"
+        )
+
+    toml_path = Path(project_dir / "sequence.toml")
+    toml_path.write_text(
+        'data_dir = "data/"\nsource_dir = "rel/"\n\n' + "\n".join(entries)
+    )
+    return toml_path
+
+
+@pytest.mark.parametrize(
+    "cell, calls",
+    [
+        # Times out (after its recorded remote time) and is retried
+        ({"type": "query"}, 2),
+        # Never times out, even when idempotent
+        ({"type": "update", "idempotent": True}, 1),
+    ],
+)
+def test_only_readonly_cells_time_out(fake_api, monkeypatch, tmp_path, cell, calls):
+    toml_path = write_project(
+        tmp_path / "project", {**cell, "source": "def output = 1"}
+    )
+    timing_store = TimingStore(tmp_path / "timings.sqlite")
+    policy = RetryPolicy(
+        max_attempts=2, base_delay=0, timeout_multiplier=1, min_timeout=0.2
+    )
+
+    def run(log_dir: Path) -> None:
+        run_sequence(
+            log_dir,
+            toml_path,
+            timing_store=timing_store,
+            retry_policies={cell["type"]: policy},
+        )
+
+    # Records a remote time of (about) zero
+    run(tmp_path / "first")
+    fake_api.calls.clear()
+
+    # First call outlasts the timeout
+    fast_exec = fake_api.exec
+    started = []
+
+    def slow_exec(*args, **kwargs):
+        started.append(True)
+        if len(started) == 1:
+            sleep(0.5)
+        return fast_exec(*args, **kwargs)
+
+    monkeypatch.setattr(api, "exec", slow_exec)
+    run(tmp_path / "second")
+
+    assert len(started) == calls
+
+
+def test_parallel_results_are_logged_in_cell_order(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        *({"type": "query", "source": f"def output = {index}"} for index in range(3)),
+    )
+    fake_api.delays = {"def output = 0": 0.2}
+
+    sequence = run_sequence(tmp_path / "logs", toml_path, max_workers=3)
+
+    # Cell 0 completes last, yet is logged first
+    assert fake_api.events[-1] == ("end", "def output = 0")
+    log = sequence.log_path().read_text()
+    headers = [log.index(f"{index}: cell_{index} (QUERY)") for index in range(3)]
+    assert headers == sorted(headers)
+
+
+def test_parallel_writes_wait_for_earlier_reads(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "query", "source": "def output = 0"},
+        {"type": "query", "source": "def output = 1"},
+        {"type": "update", "source": "def insert:x = 2"},
+        {"type": "query", "source": "def output = x"},
+    )
+    fake_api.delays = {"def output = 0": 0.2, "def output = 1": 0.1}
+
+    run_sequence(tmp_path / "logs", toml_path, max_workers=4)
+
+    events = fake_api.events
+    # Reads before the write run concurrently
+    assert events.index(("start", "def output = 1")) < events.index(
+        ("end", "def output = 0")
+    )
+    assert events.index(("start", "def insert:x = 2")) > max(
+        events.index(("end", "def output = 0")),
+        events.index(("end", "def output = 1")),
+    )
+    assert events.index(("start", "def output = x")) > events.index(
+        ("end", "def insert:x = 2")
+    )
+
+
+def test_parallel_failure_stops_dependent_cells(fake_api, monkeypatch, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "query", "source": "def output = 0"},
+        {"type": "update", "source": "def insert:x = 1"},
+        {"type": "query", "source": "def output = x"},
+    )
+    exec_cell = fake_api.exec
+
+    def exec(context, database, engine, command, *args, **kwargs):
+        if command == "def insert:x = 1":
+            raise ValueError("update failed")
+        return exec_cell(context, database, engine, command, *args, **kwargs)
+
+    monkeypatch.setattr(api, "exec", exec)
+
+    with pytest.raises(ValueError, match="update failed"):
+        run_sequence(tmp_path / "logs", toml_path, max_workers=2)
+
+    assert fake_api.calls == [("exec", "def output = 0")]
+
+
+def test_install_batches_fall_back_to_one_install_per_model(
+    fake_api, monkeypatch, tmp_path
+):
+    toml_path = write_project(
+        tmp_path / "project",
+        *({"type": "install", "source": f"def rel_{i} = {i}"} for i in range(5)),
+    )
+    install_model = fake_api.install_model
+
+    def failing_install_model(context, database, engine, models):
+        result = install_model(context, database, engine, models)
+        # One bad model aborts the whole transaction
+        return {**result, "aborted": "cell_1" in models}
+
+    monkeypatch.setattr(api, "install_model", failing_install_model)
+
+    sequence = run_sequence(
+        tmp_path / "logs", toml_path, batch_installs=True, max_batch_size=3
+    )
+
+    assert fake_api.calls == [
+        ("install_model", ["cell_0", "cell_1", "cell_2"]),
+        ("install_model", ["cell_0"]),
+        ("install_model", ["cell_1"]),
+        ("install_model", ["cell_2"]),
+        ("install_model", ["cell_3", "cell_4"]),
+    ]
+    log = sequence.log_path().read_text()
+    assert "Batched install for cells [0, 1, 2] failed" in log
+    assert len(list(sequence.log_dir().glob("*.json"))) == 5
+
+
+def test_reruns_of_readonly_cells_are_served_from_the_cache(fake_api, tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    toml_path = PROJECT_DIR / "test_queries.toml"
+
+    run_sequence(tmp_path / "first", toml_path, result_cache=cache)
+    assert len(fake_api.calls) == 5
+    fake_api.calls.clear()
+
+    for log_dir in ["second", "third"]:
+        run_sequence(tmp_path / log_dir, toml_path, result_cache=cache)
+        assert fake_api.calls == []
+
+
+def test_reruns_repeating_the_same_writes_are_served_from_the_cache(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "update", "source": "def insert:x = 1"},
+        {"type": "query", "source": "def output = x"},
+    )
+    cache = ResultCache(tmp_path / "cache")
+
+    run_sequence(tmp_path / "first", toml_path, result_cache=cache)
+    fake_api.calls.clear()
+    run_sequence(tmp_path / "second", toml_path, result_cache=cache)
+
+    assert fake_api.calls == [("exec", "def insert:x = 1")]
+
+
+def test_results_after_a_failed_write_are_not_cached(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "query", "source": "def output = 0"},
+        {"type": "update", "source": "def insert:x = 1"},
+        {"type": "query", "source": "def output = x"},
+    )
+    cache = ResultCache(tmp_path / "cache")
+    fake_api.abort_on = "def insert:x = 1"
+
+    run_sequence(tmp_path / "first", toml_path, result_cache=cache)
+    fake_api.calls.clear()
+    run_sequence(tmp_path / "second", toml_path, result_cache=cache)
+
+    # The failed write leaves the fingerprint unchanged
+    assert fake_api.calls == [
+        ("exec", "def insert:x = 1"),
+        ("exec", "def output = x"),
+    ]
+
+
+def test_resume_skips_cells_unchanged_since_the_checkpoint(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "query", "source": "def output = 1"},
+        {"type": "query", "source": "def output = 2"},
+        {"type": "query", "source": "def output = 3"},
+    )
+
+    first = run_sequence(tmp_path / "first", toml_path)
+    assert len(fake_api.calls) == 3
+    fake_api.calls.clear()
+
+    second = run_sequence(tmp_path / "second", toml_path, resume_from=first.log_dir())
+    assert fake_api.calls == []
+
+    # Entries are carried forward, so only the edited cell runs
+    Path(tmp_path / "project" / "rel" / "cell_1.rel").write_text("def output = 20")
+    run_sequence(tmp_path / "third", toml_path, resume_from=second.log_dir())
+    assert fake_api.calls == [("exec", "def output = 20")]
+
+
+def test_chunked_data_cells_load_in_chunks(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "data", "file_path": "sales.csv", "chunked": True, "source": ""},
+    )
+    Path(tmp_path / "project" / "data" / "sales.csv").write_text("id\n1\n2\n3\n")
+
+    run_sequence(tmp_path / "logs", toml_path, chunk_bytes=1, max_uploads=1)
+
+    assert [inputs["data"] for _, _, inputs in fake_api.calls] == [
+        "id\n1\n",
+        "id\n2\n",
+        "id\n3\n",
+    ]
+    assert all("def insert:cell_0(col, chunk, pos, v)" in c[1] for c in fake_api.calls)
+
+
+def test_data_cells_with_a_glob_pattern_load_each_shard(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "data", "file_path": "events/part-*.json", "source": ""},
+    )
+    shard_dir = Path(tmp_path / "project" / "data" / "events")
+    shard_dir.mkdir()
+    for position in range(3):
+        Path(shard_dir / f"part-{position}.json").write_text(f"[{position}]")
+
+    run_sequence(tmp_path / "logs", toml_path)
+
+    assert sorted(inputs["data"] for _, _, inputs in fake_api.calls) == [
+        "[0]",
+        "[1]",
+        "[2]",
+    ]
+    assert all("def insert:cell_0(shard, x...)" in c[1] for c in fake_api.calls)
+
+
+@pytest.mark.parametrize("option", ["result_compression", "upload_compression"])
+def test_zstd_compression_needs_zstandard(fake_api, monkeypatch, tmp_path, option):
+    monkeypatch.setattr(
+        "rai_python_harness.sequence.is_installed", lambda module: False
+    )
+
+    with pytest.raises(SystemExit, match="requires the `zstandard` package"):
+        run_sequence(
+            tmp_path / "logs", PROJECT_DIR / "test_queries.toml", **{option: "zstd"}
+        )
+
+    assert fake_api.calls == []
+
+
+def test_metrics_are_written_as_a_prometheus_textfile(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "query", "source": "def output = 0"},
+        {"type": "query", "source": "def output = 1"},
+    )
+    textfile_path = tmp_path / "harness.prom"
+
+    run_sequence(tmp_path / "logs", toml_path, metrics_textfile=textfile_path)
+
+    samples = {}
+    for line in textfile_path.read_text().splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+
+    toml_label = f'toml_path="{toml_path.resolve()}"'
+    for index in range(2):
+        cell = f'{toml_label},index="{index}",name="cell_{index}",type="QUERY"'
+        assert samples[f"rai_harness_cell_succeeded{{{cell}}}"] == 1
+        assert samples[f"rai_harness_cell_cached{{{cell}}}"] == 0
+        assert samples[f"rai_harness_cell_bytes_uploaded{{{cell}}}"] == len(
+            f"def output = {index}"
+        )
+        assert samples[f"rai_harness_cell_result_bytes{{{cell}}}"] > 0
+        assert samples[f'rai_harness_cell_phase_seconds{{{cell},phase="remote"}}'] >= 0
+    assert samples[f"rai_harness_sequence_cells{{{toml_label}}}"] == 2
+    assert "# TYPE rai_harness_cell_succeeded gauge" in textfile_path.read_text()
+
+
+def test_prefetching_reads_ahead_prefetch_depth_cells(fake_api, monkeypatch, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        *({"type": "query", "source": f"def output = {index}"} for index in range(4)),
+    )
+    requested = []
+    prefetch = Prefetcher.prefetch
+
+    def recorded_prefetch(self, file_paths):
+        file_paths = list(file_paths)
+        requested.append([file_path.name for file_path in file_paths])
+        prefetch(self, file_paths)
+
+    monkeypatch.setattr(Prefetcher, "prefetch", recorded_prefetch)
+
+    run_sequence(tmp_path / "logs", toml_path, prefetch_depth=2)
+
+    assert requested == [
+        ["cell_0.rel", "cell_1.rel"],
+        ["cell_1.rel", "cell_2.rel"],
+        ["cell_2.rel", "cell_3.rel"],
+        ["cell_3.rel"],
+        [],
+    ]
+    assert [command for _, command in fake_api.calls] == [
+        f"def output = {index}" for index in range(4)
+    ]
+
+
+def test_engine_pool_runs_writes_on_the_primary_engine(fake_api, monkeypatch, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "query", "source": "def output = 0"},
+        {"type": "query", "source": "def output = 1"},
+        {"type": "update", "source": "def insert:x = 2"},
+        {"type": "query", "source": "def output = x"},
+    )
+    exec_cell = fake_api.exec
+    engines = {}
+
+    def exec(context, database, engine, command, *args, **kwargs):
+        engines[command] = engine
+        return exec_cell(context, database, engine, command, *args, **kwargs)
+
+    monkeypatch.setattr(api, "exec", exec)
+
+    run_sequence(
+        tmp_path / "logs",
+        toml_path,
+        engine_pool=["replica"],
+        engine_policy="least_recently_used",
+    )
+
+    assert engines == {
+        "def output = 0": "engine",
+        "def output = 1": "replica",
+        "def insert:x = 2": "engine",
+        "def output = x": "replica",
+    }
+
+
+def test_delta_snapshots_load_only_changed_rows(fake_api, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project",
+        {"type": "data", "file_path": "sales.csv", "source": ""},
+    )
+    data_path = Path(tmp_path / "project" / "data" / "sales.csv")
+    data_path.write_text("id\n1\n2\n3\n4\n")
+    snapshots = DeltaSnapshots(tmp_path / "snapshots")
+
+    for run, rows in enumerate(["1\n2\n3\n4\n", "1\n2\n3\n4\n", "1\n2\n3\n5\n"]):
+        data_path.write_text(f"id\n{rows}")
+        run_sequence(
+            tmp_path / f"logs_{run}",
+            toml_path,
+            delta_snapshots=snapshots,
+            delta_max_change_ratio=0.5,
+        )
+
+    # The second run uploads nothing, the third only the changed rows
+    [(_, full, full_inputs), (_, partial, partial_inputs)] = fake_api.calls
+    assert "def delete:cell_0 = cell_0" in full
+    assert len(full_inputs["data"].splitlines()) == 5
+    assert "def delete:cell_0 = cell_0" not in partial
+    assert partial_inputs["data"].splitlines()[1].endswith(",5")
+    assert len(loads(partial_inputs["deleted"])) == 1
+
+
+def test_responses_over_result_memory_bytes_are_spilled(monkeypatch, tmp_path):
+    toml_path = write_project(
+        tmp_path / "project", {"type": "query", "source": "def output = x"}
+    )
+    table = pyarrow.table({"v1": list(range(1000))})
+    body = (
+        "--b0undary\r\n"
+        'Content-Disposition: form-data; name="transaction"\r\n\r\n'
+        '{"id": "txn", "state": "COMPLETED"}\r\n'
+        "--b0undary\r\n"
+        'Content-Disposition: form-data; name="metadata.proto"\r\n\r\n'
+        "\r\n"
+        "--b0undary\r\n"
+        'Content-Disposition: form-data; name="/:output/Int64"\r\n'
+        "Content-Type: application/vnd.apache.arrow.stream\r\n\r\n"
+    ).encode("utf-8")
+    sink = pyarrow.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    body += sink.getvalue().to_pybytes() + (
+        "\r\n--b0undary\r\n"
+        'Content-Disposition: form-data; name="problems"\r\n\r\n'
+        "[]\r\n"
+        "--b0undary--\r\n"
+    ).encode("utf-8")
+    queries = []
+
+    def post(context, url, data):
+        queries.append(data["query"])
+        response = BytesIO(body)
+        response.headers = {"content-type": 'multipart/form-data; boundary="b0undary"'}
+        return response
+
+    monkeypatch.setattr(rest, "post", post)
+    monkeypatch.chdir(tmp_path)
+
+    log_dir, spill_dir = tmp_path / "logs", tmp_path / "spill"
+    log_dir.mkdir()
+    spill_dir.mkdir()
+    sequence = Sequence(
+        SimpleNamespace(scheme="https", host="example.com", port=443),
+        Schema(toml_path),
+        SequenceLogger(log_dir),
+        result_memory_bytes=0,
+        result_spill_dir=spill_dir,
+    )
+    sequence.database = "database"
+    sequence.engine = "engine"
+    sequence.exec()
+
+    assert queries == ["def output = x"]
+    [result_path] = sequence.log_dir().glob("*.json")
+    assert "999" in result_path.read_text()
+    # Spilled responses are deleted once mapped
+    assert list(spill_dir.iterdir()) == []
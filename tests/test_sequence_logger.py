@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from json import loads
+
+import pytest
+
+from rai_python_harness.sequence_logger import BufferedLogger, SequenceLogger
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_messages_are_written_in_order(tmp_path, background):
+    logger = SequenceLogger(tmp_path, background=background, structured=True)
+
+    logger.info("MESSAGE - 1", fields={"index": 1, "type": "QUERY"})
+    logger.warn("WARNING - 1", fields={"index": 2})
+    logger.err("ERROR - 1", exc_info=False)
+    logger.close()
+
+    assert logger.log_file_path.parent == tmp_path
+    assert logger.log_file_path.read_text().splitlines() == [
+        "MESSAGE - 1",
+        "WARNING - 1",
+        "ERROR - 1",
+    ]
+
+    entries = [
+        loads(line) for line in logger.structured_log_path.read_text().splitlines()
+    ]
+    assert [
+        {key: value for key, value in entry.items() if key != "time"}
+        for entry in entries
+    ] == [
+        {"level": "INFO", "message": "MESSAGE - 1", "index": 1, "type": "QUERY"},
+        {"level": "WARNING", "message": "WARNING - 1", "index": 2},
+        {"level": "ERROR", "message": "ERROR - 1"},
+    ]
+
+
+def test_errors_are_logged_with_their_traceback(tmp_path):
+    logger = SequenceLogger(tmp_path, structured=True)
+
+    try:
+        raise ValueError("failed")
+    except ValueError:
+        logger.err("ERROR - 1")
+    logger.close()
+
+    assert "ValueError: failed" in logger.log_file_path.read_text()
+    [entry] = [
+        loads(line) for line in logger.structured_log_path.read_text().splitlines()
+    ]
+    assert "ValueError: failed" in entry["exc_info"]
+
+
+def test_unstructured_loggers_write_no_json(tmp_path):
+    logger = SequenceLogger(tmp_path)
+    logger.info("MESSAGE - 1")
+    logger.close()
+
+    assert logger.structured_log_path is None
+    assert list(tmp_path.iterdir()) == [logger.log_file_path]
+
+
+def test_refresh_log_file_path_switches_files(tmp_path, monkeypatch):
+    times = iter(["2026-01-01T000000", "2026-01-01T000001"])
+    monkeypatch.setattr(
+        "rai_python_harness.sequence_logger.formatted_time_now", lambda: next(times)
+    )
+    logger = SequenceLogger(tmp_path)
+    first = logger.log_file_path
+    logger.info("MESSAGE - 1")
+
+    logger.refresh_log_file_path()
+    logger.info("MESSAGE - 2")
+    logger.close()
+
+    assert first.read_text() == "MESSAGE - 1\n"
+    assert logger.log_file_path.read_text() == "MESSAGE - 2\n"
+
+
+def test_buffered_logger_writes_on_flush(tmp_path):
+    logger = SequenceLogger(tmp_path)
+    buffered = BufferedLogger(logger)
+
+    buffered.info("MESSAGE - 1")
+    logger.info("MESSAGE - 2")
+    buffered.warn("WARNING - 1")
+    buffered.flush()
+    logger.close()
+
+    assert logger.log_file_path.read_text().splitlines() == [
+        "MESSAGE - 2",
+        "MESSAGE - 1",
+        "WARNING - 1",
+    ]
+
+
+def test_log_output_dir_must_exist(tmp_path):
+    with pytest.raises(SystemExit):
+        SequenceLogger(tmp_path / "missing")
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from gzip import decompress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+from railib import rest
+
+from rai_python_harness.transport import ConnectionPool, install_pool, uninstall_pool
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Echoes each request's body, with its `Content-Encoding` and the port of
+    the connection it came in on"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status = 404 if self.path == "/missing" else 200
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Encoding", self.headers.get("Content-Encoding", ""))
+        self.send_header("X-Client-Port", str(self.client_address[1]))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(server_url):
+    pool = ConnectionPool()
+
+    ports = set()
+    for _ in range(3):
+        with pool.urlopen(Request(f"{server_url}/echo", b"body")) as response:
+            assert response.read() == b"body"
+            ports.add(response.getheader("X-Client-Port"))
+
+    assert len(ports) == 1
+    assert pool.stats() == {
+        "requests": 3,
+        "opened": 1,
+        "reused": 2,
+        "stale": 0,
+        "reuse_ratio": 2 / 3,
+    }
+    pool.close()
+
+
+def test_error_responses_raise(server_url):
+    pool = ConnectionPool()
+
+    with pytest.raises(HTTPError) as error:
+        pool.urlopen(Request(f"{server_url}/missing", b"body"))
+
+    assert error.value.code == 404
+    pool.close()
+
+
+def test_install_pool_shares_one_pool():
+    try:
+        pool = install_pool(pool_size=2)
+        assert rest.urlopen == pool.urlopen
+        assert install_pool(pool_size=5) is pool
+        assert pool.pool_size == 2
+    finally:
+        uninstall_pool()
+
+    assert rest.urlopen == urlopen
+
+
+def test_large_bodies_are_compressed(server_url):
+    pool = ConnectionPool(compression="gzip", compression_min_bytes=100)
+    body = b"x" * 1000
+
+    with pool.urlopen(Request(f"{server_url}/echo", body)) as response:
+        assert response.getheader("X-Encoding") == "gzip"
+        assert decompress(response.read()) == body
+
+    with pool.urlopen(Request(f"{server_url}/echo", b"small")) as response:
+        assert response.getheader("X-Encoding") == ""
+        assert response.read() == b"small"
+
+    stats = pool.upload_stats()
+    assert stats["compressed"] == 1
+    assert stats["bytes_before"] == 1000
+    assert stats["ratio"] < 0.1
+    pool.close()
+
+
+def test_bodies_signed_with_an_access_key_are_not_compressed(server_url):
+    pool = ConnectionPool(compression="gzip", compression_min_bytes=0)
+    request = Request(
+        f"{server_url}/echo", b"x" * 1000, {"Authorization": "RAI01-ED25519-SHA256 ..."}
+    )
+
+    with pool.urlopen(request) as response:
+        assert response.getheader("X-Encoding") == ""
+        assert response.read() == b"x" * 1000
+
+    assert pool.upload_stats()["compressed"] == 0
+    pool.close()
+
+
+def test_install_pool_updates_compression_of_the_shared_pool():
+    try:
+        pool = install_pool(compression=None)
+        assert rest.urlopen == pool.urlopen
+
+        assert install_pool(compression="gzip", compression_min_bytes=10) is pool
+        assert (pool.compression, pool.compression_min_bytes) == ("gzip", 10)
+
+        with pytest.raises(ValueError):
+            install_pool(compression="lz4")
+    finally:
+        uninstall_pool()
+
+    assert rest.urlopen == urlopen
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import pytest
+
+from rai_python_harness.utils import mapped_file
+
+
+def test_mapped_file(tmp_path):
+    file_path = tmp_path / "data.csv"
+    file_path.write_bytes(b"id\n1\n")
+
+    with mapped_file(file_path) as buffer:
+        assert buffer.readonly
+        assert bytes(buffer) == b"id\n1\n"
+
+    # Released when the block exits
+    with pytest.raises(ValueError):
+        bytes(buffer)
+
+
+def test_mapped_file_of_an_empty_file(tmp_path):
+    file_path = tmp_path / "empty.csv"
+    file_path.write_bytes(b"")
+
+    with mapped_file(file_path) as buffer:
+        assert bytes(buffer) == b""
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from rai_python_harness.validation import schema_errors
+
+SCHEMA_PATH = Path("test.toml")
+
+
+def schema(*queries: dict) -> dict:
+    return {"data_dir": "data/", "source_dir": "rel/", "queries": list(queries)}
+
+
+def query(index, **keys) -> dict:
+    return {
+        "name": f"query_{index}",
+        "type": "query",
+        "file_path": f"query_{index}.rel",
+        "index": index,
+        **keys,
+    }
+
+
+def test_valid_schema_has_no_errors():
+    assert schema_errors(schema(query(0), query(1, depends_on=[0])), SCHEMA_PATH) == []
+
+
+@pytest.mark.parametrize("depends_on", [0, None, "0", {"index": 0}, [0, "1"], [True]])
+def test_depends_on_must_be_an_array_of_indices(depends_on):
+    errors = schema_errors(
+        schema(query(0), query(1), query(2, depends_on=depends_on)), SCHEMA_PATH
+    )
+
+    assert errors == ["query 2 'depends_on' must be an array of indices"]
+
+
+def test_depends_on_must_list_earlier_queries():
+    errors = schema_errors(
+        schema(query(0, depends_on=[1]), query(1), query(2, depends_on=[7])),
+        SCHEMA_PATH,
+    )
+
+    assert errors == [
+        "query 0 may only depend on earlier queries, '1' is not the index of one",
+        "query 2 may only depend on earlier queries, '7' is not the index of one",
+    ]
+
+
+def test_depends_on_of_query_with_invalid_index():
+    errors = schema_errors(schema(query(0), query("1", depends_on=[0])), SCHEMA_PATH)
+
+    assert errors == ["query 1 'index' must be an integer"]
+
+
+def test_chunked_must_be_a_boolean_on_a_data_query():
+    data = {"type": "data", "file_path": "data.csv"}
+
+    assert schema_errors(schema(query(0, chunked=True, **data)), SCHEMA_PATH) == []
+    assert schema_errors(schema(query(0, chunked="yes", **data)), SCHEMA_PATH) == [
+        "query 0 'chunked' must be a boolean"
+    ]
+    assert schema_errors(schema(query(0, chunked=True)), SCHEMA_PATH) == [
+        "query 0 'chunked' only applies to DATA queries without 'inputs' that load a single '.csv' or '.json' file"
+    ]